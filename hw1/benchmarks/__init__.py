@@ -0,0 +1,9 @@
+"""Benchmarks of the fusion pipeline kernels.
+
+Run from the hw1 directory:
+
+    python -m benchmarks --quick --output benchmark.json
+
+Each case is run in its own process so that NUMBA_NUM_THREADS can be swept and
+peak RSS is measured per case. Timings exclude numba compilation and image decoding.
+"""
@@ -0,0 +1,161 @@
+"""Sweep the benchmark cases and report their metrics as JSON and a text summary.
+
+    python -m benchmarks [--cases integrate get_mesh] [--voxel-sizes 0.02 0.01]
+        [--extents 0.5 1] [--resolutions 320x240 640x480] [--threads 1 4]
+        [--frames 5] [--repeats 3] [--synthetic] [--quick] [--output benchmark.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numba
+import numpy as np
+
+from benchmarks.cases import CASES
+from ply import PLY_FORMATS
+
+HW1_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# columns of the text summary: metric name and header
+SUMMARY_COLUMNS = [('seconds', 'ms/call'), ('frames_per_s', 'frames/s'), ('voxels_per_s', 'Mvoxels/s'),
+                   ('points_per_s', 'Mpoints/s'), ('mb_per_s', 'MB/s'), ('peak_rss_mb', 'peak RSS MB')]
+
+
+def parse_args(argv=None):
+    """Parse the command line of the benchmark driver.
+
+    Args:
+        argv (list of str, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n')[0])
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES),
+                        help='cases to run (default: all)')
+    parser.add_argument('--voxel-sizes', nargs='+', type=float, default=[0.02, 0.01])
+    parser.add_argument('--extents', nargs='+', type=float, default=[0.5, 1.],
+                        help='scale factors of the volume bounds of the bundled sequence')
+    parser.add_argument('--resolutions', nargs='+', default=['320x240', '640x480'])
+    parser.add_argument('--threads', nargs='+', type=int, default=sorted({1, os.cpu_count() or 1}),
+                        help='values of NUMBA_NUM_THREADS')
+    parser.add_argument('--ply-formats', nargs='+', choices=list(PLY_FORMATS),
+                        default=['ascii', 'binary_little_endian'], help='body formats of the ply cases')
+    parser.add_argument('--frames', type=int, default=5, help='frames fused per volume')
+    parser.add_argument('--repeats', type=int, default=3, help='timed calls per case, after a warm up call')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='render synthetic frames instead of reading data/frame-*')
+    parser.add_argument('--quick', action='store_true',
+                        help='a single small configuration of every case, for smoke testing')
+    parser.add_argument('--output', help='path of the JSON report')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.voxel_sizes, args.extents, args.resolutions = [0.02], [1.], ['160x120']
+        args.threads, args.frames, args.repeats = [min(args.threads)], 2, 1
+    return args
+
+
+def get_sweep(args):
+    """Expand the sweep of the selected cases into a list of runs.
+
+    Args:
+        args (argparse.Namespace): Arguments of the driver.
+
+    Returns:
+        list of dict: case name and its parameters, including threads, for each run.
+    """
+    axes = {'voxel_size': args.voxel_sizes, 'extent': args.extents,
+            'resolution': args.resolutions, 'threads': args.threads, 'ply_format': args.ply_formats}
+    runs = []
+    for case in args.cases:
+        _, case_axes = CASES[case]
+        for values in itertools.product(*[axes[axis] for axis in case_axes]):
+            params = {'num_frames': args.frames, 'repeats': args.repeats, 'synthetic': args.synthetic}
+            params.update(zip(case_axes, values))
+            runs.append({'case': case, 'params': params})
+    return runs
+
+
+def run(case, params):
+    """Run a benchmark case in a new process with its number of numba threads.
+
+    Args:
+        case (str): Name of the case.
+        params (dict): Parameters of the case, including threads.
+
+    Returns:
+        dict: Metrics of the case, or the error it failed with.
+    """
+    params = dict(params)
+    env = dict(os.environ)
+    threads = params.pop('threads', None)
+    if threads is not None:
+        env['NUMBA_NUM_THREADS'] = str(threads)
+
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.worker', json.dumps({'case': case, 'params': params})],
+                            cwd=HW1_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().split('\n')[-1]}
+    return json.loads(result.stdout.strip().split('\n')[-1])
+
+
+def format_summary(results):
+    """Format benchmark results as a text table.
+
+    Args:
+        results (list of dict): case, params and metrics of each run.
+
+    Returns:
+        str: The table.
+    """
+    rows = [['case', 'params'] + [header for _, header in SUMMARY_COLUMNS]]
+    for result in results:
+        params = ' '.join('%s=%s' % (name, value) for name, value in result['params'].items()
+                          if name not in ('num_frames', 'repeats', 'synthetic'))
+        metrics = result['metrics']
+        if 'error' in metrics:
+            rows.append([result['case'], params, 'error: ' + metrics['error']])
+            continue
+        row = [result['case'], params]
+        for name, _ in SUMMARY_COLUMNS:
+            value = metrics.get(name)
+            if value is None:
+                row.append('-')
+            elif name == 'seconds':
+                row.append('%.2f' % (value * 1e3))
+            elif name in ('voxels_per_s', 'points_per_s'):
+                row.append('%.2f' % (value / 1e6))
+            else:
+                row.append('%.1f' % value)
+        rows.append(row)
+
+    widths = [max(len(row[i]) for row in rows if i < len(row)) for i in range(len(rows[0]))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for spec in get_sweep(args):
+        print('Running %s %s' % (spec['case'], spec['params']), file=sys.stderr)
+        results.append(dict(spec, metrics=run(spec['case'], spec['params'])))
+
+    report = {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'numba': numba.__version__, 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'results': results,
+    }
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(format_summary(results))
+
+
+if __name__ == '__main__':
+    main()
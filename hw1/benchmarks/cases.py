@@ -0,0 +1,274 @@
+import os
+import tempfile
+import time
+
+import cv2
+from frames import read_frame
+import numpy as np
+from ply import Ply
+from transforms import camera_to_image, depth_to_point_cloud, transform_point3s
+from tsdf import TSDFVolume
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# volume bounds of the bundled sequence, as in tsdf_run.py
+VOLUME_BOUNDS = np.array([[-0.75, 0.75], [-0.75, 0.75], [0., 0.8]])
+
+MB = 1024. * 1024.
+
+
+def time_call(function, repeats):
+    """Time a function after one untimed call, which compiles its numba kernels
+        or loads them from the on-disk cache.
+
+    Args:
+        function (callable): Function to time, called without arguments.
+        repeats (int): Number of timed calls.
+
+    Returns:
+        float: Median wall time of a call in seconds.
+    """
+    function()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def parse_resolution(resolution):
+    """Parse an image resolution.
+
+    Args:
+        resolution (str): Resolution given as 'WIDTHxHEIGHT', e.g. '640x480'.
+
+    Raises:
+        ValueError: If the resolution is not of the form 'WIDTHxHEIGHT'.
+
+    Returns:
+        int: Image width.
+        int: Image height.
+    """
+    try:
+        width, height = [int(size) for size in resolution.lower().split('x')]
+    except ValueError:
+        raise ValueError('resolution should be given as WIDTHxHEIGHT.')
+    return width, height
+
+
+def load_frames(num_frames, resolution, synthetic=False):
+    """Load the RGB-D frames to benchmark with, resized to the given resolution.
+
+    Args:
+        num_frames (int): Number of frames.
+        resolution (str): Image resolution given as 'WIDTHxHEIGHT'.
+        synthetic (bool, optional): Render a wavy surface below a camera moving over the
+            volume instead of reading the bundled data/frame-* sequence. Defaults to False.
+
+    Returns:
+        numpy.array [3, 3]: Camera intrinsics scaled to the resolution.
+        list of tuple: (color image, depth image, camera pose) of every frame.
+    """
+    width, height = parse_resolution(resolution)
+    camera_intrinsics = np.loadtxt(os.path.join(DATA_DIR, 'camera-intrinsics.txt'))
+
+    if synthetic:
+        camera_intrinsics = camera_intrinsics * [[width / 640.], [height / 480.], [1.]]
+        u, v = np.meshgrid(np.arange(width), np.arange(height))
+        rng = np.random.default_rng(0)
+        frames = []
+        for i in range(num_frames):
+            depth_image = 1.1 + 0.05 * np.sin(u / 20. + i) * np.cos(v / 20.)
+            color_image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            # looking down the world z axis from above the volume
+            camera_pose = np.diag([1., -1., -1., 1.])
+            camera_pose[:3, 3] = [0.02 * i, 0., 1.5]
+            frames.append((color_image, depth_image, camera_pose))
+        return camera_intrinsics, frames
+
+    frames = []
+    for i in range(num_frames):
+        color_image, depth_image, camera_pose = read_frame(DATA_DIR, i)
+        original_height, original_width = depth_image.shape
+        color_image = cv2.resize(color_image, (width, height), interpolation=cv2.INTER_LINEAR)
+        # averaging depths would create points between foreground and background
+        depth_image = cv2.resize(depth_image, (width, height), interpolation=cv2.INTER_NEAREST)
+        frames.append((color_image, depth_image, camera_pose))
+    camera_intrinsics = camera_intrinsics * [[width / original_width], [height / original_height], [1.]]
+    return camera_intrinsics, frames
+
+
+def get_volume_bounds(extent):
+    """Scale the volume bounds of the bundled sequence about their center.
+
+    Args:
+        extent (float): Scale factor of the side lengths.
+
+    Returns:
+        numpy.array [3, 2]: Scaled volume bounds.
+    """
+    center = VOLUME_BOUNDS.mean(axis=1, keepdims=True)
+    return center + (VOLUME_BOUNDS - center) * extent
+
+
+def fuse_frames(voxel_size, extent, camera_intrinsics, frames):
+    """Fuse frames into a new dense volume.
+
+    Args:
+        voxel_size (float): The side length of each voxel in meters.
+        extent (float): Scale factor of the volume bounds.
+        camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+        frames (list of tuple): (color image, depth image, camera pose) of every frame.
+
+    Returns:
+        TSDFVolume: The fused volume.
+    """
+    volume = TSDFVolume(get_volume_bounds(extent), voxel_size)
+    for color_image, depth_image, camera_pose in frames:
+        volume.integrate(color_image, depth_image, camera_intrinsics, camera_pose)
+    return volume
+
+
+def make_mesh(num_points):
+    """Make a synthetic mesh: a triangulated grid with random normals and colors.
+
+    Args:
+        num_points (int): Approximate number of vertices.
+
+    Returns:
+        Ply: The mesh.
+    """
+    side = max(2, int(np.sqrt(num_points)))
+    rng = np.random.default_rng(0)
+    x, y = np.meshgrid(np.arange(side), np.arange(side), indexing='ij')
+    points = np.stack([x.ravel(), y.ravel(), rng.random(side * side)], axis=1) * 0.01
+    normals = rng.normal(size=(side * side, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    colors = rng.integers(0, 256, (side * side, 3), dtype=np.uint8)
+
+    # two triangles per grid cell
+    corners = (x[:-1, :-1] * side + y[:-1, :-1]).ravel()
+    triangles = np.concatenate([
+        np.stack([corners, corners + side, corners + 1], axis=1),
+        np.stack([corners + 1, corners + side, corners + side + 1], axis=1)])
+    return Ply(triangles=triangles, points=points, normals=normals, colors=colors)
+
+
+def bench_transform_point3s(resolution, repeats=3, synthetic=False, **_):
+    """Benchmark transforms.transform_point3s on the back projection of a frame.
+
+    Returns:
+        dict: Median seconds per call, points/s and MB/s of input points.
+    """
+    camera_intrinsics, [(_, depth_image, camera_pose)] = load_frames(1, resolution, synthetic)
+    points = depth_to_point_cloud(camera_intrinsics, depth_image)
+    seconds = time_call(lambda: transform_point3s(camera_pose, points), repeats)
+    return {'seconds': seconds, 'points': len(points), 'points_per_s': len(points) / seconds,
+            'mb_per_s': points.nbytes / MB / seconds}
+
+
+def bench_camera_to_image(resolution, repeats=3, synthetic=False, **_):
+    """Benchmark transforms.camera_to_image on the back projection of a frame.
+
+    Returns:
+        dict: Median seconds per call, points/s and MB/s of input points.
+    """
+    camera_intrinsics, [(_, depth_image, _)] = load_frames(1, resolution, synthetic)
+    points = depth_to_point_cloud(camera_intrinsics, depth_image)
+    seconds = time_call(lambda: camera_to_image(camera_intrinsics, points), repeats)
+    return {'seconds': seconds, 'points': len(points), 'points_per_s': len(points) / seconds,
+            'mb_per_s': points.nbytes / MB / seconds}
+
+
+def bench_depth_to_point_cloud(resolution, repeats=3, synthetic=False, **_):
+    """Benchmark transforms.depth_to_point_cloud on a frame.
+
+    Returns:
+        dict: Median seconds per call, frames/s and MB/s of input depth.
+    """
+    camera_intrinsics, [(_, depth_image, _)] = load_frames(1, resolution, synthetic)
+    seconds = time_call(lambda: depth_to_point_cloud(camera_intrinsics, depth_image), repeats)
+    return {'seconds': seconds, 'frames_per_s': 1. / seconds, 'mb_per_s': depth_image.nbytes / MB / seconds}
+
+
+def bench_integrate(voxel_size, extent, resolution, num_frames=5, repeats=3, synthetic=False, **_):
+    """Benchmark TSDFVolume.integrate, fusing a sequence of frames into a new volume.
+
+    Returns:
+        dict: Median seconds per frame, frames/s, voxels/s of the voxels in visible
+            blocks and MB/s of input images.
+    """
+    camera_intrinsics, frames = load_frames(num_frames, resolution, synthetic)
+    TSDFVolume.warmup()
+
+    volume = fuse_frames(voxel_size, extent, camera_intrinsics, frames)
+    visible_voxels = sum(len(volume.get_visible_blocks(depth_image, camera_intrinsics, camera_pose))
+                         for _, depth_image, camera_pose in frames) * volume._block_size ** 3
+    image_bytes = sum(color_image.nbytes + depth_image.nbytes for color_image, depth_image, _ in frames)
+
+    seconds = time_call(lambda: fuse_frames(voxel_size, extent, camera_intrinsics, frames), repeats)
+    return {'seconds': seconds / num_frames, 'frames_per_s': num_frames / seconds,
+            'voxels': int(np.prod(volume._voxel_bounds)), 'voxels_per_s': visible_voxels / seconds,
+            'mb_per_s': image_bytes / MB / seconds}
+
+
+def bench_get_mesh(voxel_size, extent, resolution='640x480', num_frames=5, repeats=3, synthetic=False, **_):
+    """Benchmark TSDFVolume.get_mesh, a full extraction over a fused volume.
+
+    Returns:
+        dict: Median seconds per call, voxels/s of the whole volume and MB/s of the tsdf.
+    """
+    camera_intrinsics, frames = load_frames(num_frames, resolution, synthetic)
+    volume = fuse_frames(voxel_size, extent, camera_intrinsics, frames)
+    points, triangles, _, _ = volume.get_mesh()
+
+    voxels = int(np.prod(volume._voxel_bounds))
+    seconds = time_call(volume.get_mesh, repeats)
+    return {'seconds': seconds, 'voxels': voxels, 'voxels_per_s': voxels / seconds,
+            'points': len(points), 'triangles': len(triangles),
+            'mb_per_s': volume._tsdf_volume.nbytes / MB / seconds}
+
+
+def bench_ply_write(resolution, ply_format='ascii', repeats=3, **_):
+    """Benchmark Ply.write on a synthetic mesh with a vertex per pixel.
+
+    Returns:
+        dict: Median seconds per call and MB/s of the written file.
+    """
+    width, height = parse_resolution(resolution)
+    mesh = make_mesh(width * height)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        ply_path = os.path.join(temporary_dir, 'mesh.ply')
+        seconds = time_call(lambda: mesh.write(ply_path, ply_format), repeats)
+        file_bytes = os.path.getsize(ply_path)
+    return {'seconds': seconds, 'points': len(mesh.points), 'mb_per_s': file_bytes / MB / seconds}
+
+
+def bench_ply_read(resolution, ply_format='ascii', repeats=3, **_):
+    """Benchmark Ply.read on a synthetic mesh with a vertex per pixel.
+
+    Returns:
+        dict: Median seconds per call and MB/s of the read file.
+    """
+    width, height = parse_resolution(resolution)
+    mesh = make_mesh(width * height)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        ply_path = os.path.join(temporary_dir, 'mesh.ply')
+        mesh.write(ply_path, ply_format)
+        seconds = time_call(lambda: Ply(ply_path), repeats)
+        file_bytes = os.path.getsize(ply_path)
+    return {'seconds': seconds, 'points': len(mesh.points), 'triangles': len(mesh.triangles),
+            'mb_per_s': file_bytes / MB / seconds}
+
+
+# benchmark function and the sweep parameters it depends on, by case name
+CASES = {
+    'transform_point3s': (bench_transform_point3s, ['resolution']),
+    'camera_to_image': (bench_camera_to_image, ['resolution', 'threads']),
+    'depth_to_point_cloud': (bench_depth_to_point_cloud, ['resolution']),
+    'integrate': (bench_integrate, ['voxel_size', 'extent', 'resolution', 'threads']),
+    'get_mesh': (bench_get_mesh, ['voxel_size', 'extent', 'threads']),
+    'ply_write': (bench_ply_write, ['resolution', 'ply_format']),
+    'ply_read': (bench_ply_read, ['resolution', 'ply_format']),
+}
@@ -0,0 +1,47 @@
+"""Run a single benchmark case and print its metrics as JSON.
+
+    python -m benchmarks.worker '{"case": "integrate", "params": {...}}'
+
+NUMBA_NUM_THREADS must be set in the environment before numba is imported, so
+the driver in benchmarks/__main__.py starts a new process for every case.
+"""
+import contextlib
+import json
+import resource
+import sys
+
+import numba
+
+from benchmarks.cases import CASES
+
+
+def run_case(case, params):
+    """Run a benchmark case in this process.
+
+    Args:
+        case (str): Name of the case in benchmarks.cases.CASES.
+        params (dict): Keyword arguments of the case.
+
+    Raises:
+        ValueError: If the case does not exist.
+
+    Returns:
+        dict: Metrics of the case, the number of numba threads and the peak RSS
+            of this process in MB.
+    """
+    if case not in CASES:
+        raise ValueError('unknown benchmark case %s.' % case)
+    bench, _ = CASES[case]
+
+    # volumes print their size, which must not mix with the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        metrics = bench(**params)
+    metrics['threads'] = numba.config.NUMBA_NUM_THREADS
+    # ru_maxrss is in kilobytes on Linux
+    metrics['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+    return metrics
+
+
+if __name__ == '__main__':
+    spec = json.loads(sys.argv[1])
+    print(json.dumps(run_case(spec['case'], spec['params'])))
@@ -0,0 +1,94 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import tempfile
+
+from frames import prefetch_frames
+import numpy as np
+from tsdf import TSDFVolume
+
+
+def fuse_frames(volume_type, volume_args, read, frame_ids, camera_intrinsics, path, observation_weight=1.):
+    """Map step: fuse a share of the frames into a new volume and save it.
+
+    Args:
+        volume_type (type): TSDFVolume or a subclass.
+        volume_args (dict): Keyword arguments of the volume constructor.
+        read (callable): Reads the frame with the given id as (color image, depth image,
+            camera pose), e.g. functools.partial(frames.read_frame, data_dir).
+        frame_ids (list of int): Frames to fuse.
+        camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+        path (str): Directory to save the volume to.
+        observation_weight (float, optional): The weight to assign for each observation. Defaults to 1.
+
+    Returns:
+        str: The directory the volume was saved to.
+    """
+    volume = volume_type(**volume_args)
+    for color_image, depth_image, camera_pose in prefetch_frames(read, frame_ids):
+        volume.integrate(color_image, depth_image, camera_intrinsics, camera_pose, observation_weight)
+    volume.save(path)
+    return path
+
+
+def merge_saved_volumes(volume_type, paths):
+    """Reduce step: merge saved volumes into the first one, streaming the others from disk.
+
+    Args:
+        volume_type (type): TSDFVolume or a subclass the volumes were saved as.
+        paths (list of str): Directories written by TSDFVolume.save.
+
+    Returns:
+        TSDFVolume: The merged volume, held in memory.
+    """
+    volume = volume_type.load(paths[0], mmap_mode=None)
+    for path in paths[1:]:
+        volume.merge(volume_type.load(path, mmap_mode='r'))
+    return volume
+
+
+def fuse_distributed(volume_args, read, frame_ids, camera_intrinsics, num_workers=None,
+                     volume_type=TSDFVolume, work_dir=None, observation_weight=1.):
+    """Fuse a trajectory with map-reduce: split the frames into contiguous shares, fuse
+        each share into its own volume in a worker process, then merge the volumes
+        by weight. A local process pool stands in for the nodes of a cluster, and the
+        partial volumes are passed through save and load on a shared directory. Colors
+        only match fusing every frame into one volume with the 'mean' color policy, see
+        TSDFVolume.merge.
+
+    Args:
+        volume_args (dict): Keyword arguments of the volume constructor.
+        read (callable): Reads the frame with the given id as (color image, depth image,
+            camera pose). It must be picklable, e.g. functools.partial(frames.read_frame, data_dir).
+        frame_ids (list of int): Frames to fuse.
+        camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+        num_workers (int, optional): Number of worker processes and shares. Defaults to the
+            number of CPUs.
+        volume_type (type, optional): TSDFVolume or a subclass whose load reads the volume
+            into memory; a TiledTSDFVolume would keep using the removed partial volumes as its
+            tile store. Defaults to TSDFVolume.
+        work_dir (str, optional): Directory for the partial volumes. Defaults to a temporary
+            directory that is removed afterwards.
+        observation_weight (float, optional): The weight to assign for each observation. Defaults to 1.
+
+    Raises:
+        ValueError: If the number of workers is not positive.
+
+    Returns:
+        TSDFVolume: The fused volume.
+    """
+    num_workers = os.cpu_count() if num_workers is None else num_workers
+    if num_workers <= 0:
+        raise ValueError('number of workers must be positive.')
+
+    shares = [share.tolist() for share in np.array_split(list(frame_ids), num_workers) if len(share) > 0]
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix='tsdf_fusion_') as temporary_dir:
+        paths = [os.path.join(temporary_dir, 'share-%03d' % i) for i in range(len(shares))]
+
+        # spawned workers do not inherit numba's threading runtime, which is not fork safe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(shares), mp_context=context) as executor:
+            paths = list(executor.map(
+                fuse_frames, [volume_type] * len(shares), [volume_args] * len(shares), [read] * len(shares),
+                shares, [camera_intrinsics] * len(shares), paths, [observation_weight] * len(shares)))
+        return merge_saved_volumes(volume_type, paths)
@@ -0,0 +1,37 @@
+import functools
+import unittest
+import numpy as np
+from distributed_fusion import *
+from frames import read_frame
+from sparse_tsdf import SparseTSDFVolume
+
+
+class TestDistributedFusion(unittest.TestCase):
+    """Unit test distributed_fusion.py.
+    """
+
+    def test_fuse_distributed(self):
+        """Test distributed_fusion.fuse_distributed against fusing every frame in one process.
+        """
+        camera_intrinsics = np.loadtxt('data/camera-intrinsics.txt')
+        volume_args = {'volume_bounds': np.array([[-0.75, 0.75], [-0.75, 0.75], [0., 0.8]]),
+                       'voxel_size': 0.04}
+        read = functools.partial(read_frame, 'data')
+
+        for volume_type in [TSDFVolume, SparseTSDFVolume]:
+            sequential = volume_type(**volume_args)
+            for frame_id in range(4):
+                color_image, depth_image, camera_pose = read(frame_id)
+                sequential.integrate(color_image, depth_image, camera_intrinsics, camera_pose)
+
+            merged = fuse_distributed(volume_args, read, range(4), camera_intrinsics,
+                                      num_workers=2, volume_type=volume_type)
+            self.assertIsInstance(merged, volume_type)
+            sequential_tsdf, sequential_color = sequential.get_volume()
+            merged_tsdf, merged_color = merged.get_volume()
+            self.assertTrue(np.allclose(sequential_tsdf, merged_tsdf, atol=1e-5))
+            self.assertTrue(np.all(np.abs(sequential_color - merged_color) <= 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from image import read_rgb, read_depth
+import numpy as np
+
+
+def read_frame(data_dir, frame_id):
+    """Read an RGB-D frame and its camera pose.
+
+    Args:
+        data_dir (str): Directory holding frame-%06d.color.png, frame-%06d.depth.png
+            and frame-%06d.pose.txt files.
+        frame_id (int): Frame number.
+
+    Returns:
+        numpy.array [h, w, 3]: An rgb image.
+        numpy.array [h, w]: A z depth image.
+        numpy.array [4, 4]: SE3 transform representing pose (camera to world)
+    """
+    prefix = os.path.join(data_dir, 'frame-%06d' % frame_id)
+    color_image = read_rgb(prefix + '.color.png')
+    depth_image = read_depth(prefix + '.depth.png')
+    camera_pose = np.loadtxt(prefix + '.pose.txt')
+    return color_image, depth_image, camera_pose
+
+
+def prefetch_frames(read, frame_ids, prefetch_depth=4, num_workers=2):
+    """Read frames ahead of their consumer on a thread pool.
+        cv2 decoding releases the GIL, so reading overlaps with integration.
+
+    Args:
+        read (callable): Reads the frame with the given id, e.g. functools.partial(read_frame, data_dir).
+        frame_ids (iterable of int): Frames to read, in order.
+        prefetch_depth (int, optional): Number of frames read ahead of the consumer,
+            which bounds the decoded frames held in memory. Defaults to 4.
+        num_workers (int, optional): Number of reader threads. Defaults to 2.
+
+    Raises:
+        ValueError: If prefetch depth or number of workers is not positive.
+
+    Yields:
+        The frames returned by read, in the order of frame_ids. Errors raised by
+            read are raised when their frame is reached.
+    """
+    if prefetch_depth <= 0:
+        raise ValueError('prefetch depth must be positive.')
+    if num_workers <= 0:
+        raise ValueError('number of workers must be positive.')
+
+    frame_ids = iter(frame_ids)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        pending = deque()
+        try:
+            for frame_id in frame_ids:
+                pending.append(executor.submit(read, frame_id))
+                if len(pending) == prefetch_depth:
+                    break
+            while pending:
+                frame = pending.popleft().result()
+                for frame_id in frame_ids:
+                    pending.append(executor.submit(read, frame_id))
+                    break
+                yield frame
+        finally:
+            # a consumer that stops early does not wait for frames it will never use
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,60 @@
+import functools
+import threading
+import unittest
+import numpy as np
+from frames import *
+
+
+class TestFrames(unittest.TestCase):
+    """Unit test frames.py.
+    """
+
+    def test_read_frame(self):
+        """Test frames.read_frame.
+        """
+        color_image, depth_image, camera_pose = read_frame('data', 3)
+        self.assertEqual(color_image.shape, depth_image.shape + (3,))
+        self.assertTrue(np.array_equal(camera_pose, np.loadtxt('data/frame-000003.pose.txt')))
+
+    def test_prefetch_frames(self):
+        """Test frames.prefetch_frames keeps frame order and bounds the read ahead.
+        """
+        lock = threading.Lock()
+        started = []
+
+        def read(frame_id):
+            with lock:
+                started.append(frame_id)
+            return frame_id * 2
+
+        consumed = []
+        for frame in prefetch_frames(read, range(20), prefetch_depth=3, num_workers=2):
+            with lock:
+                # the frame being consumed and at most prefetch_depth frames after it
+                self.assertLessEqual(len(started), len(consumed) + 1 + 3)
+            consumed.append(frame)
+        self.assertEqual(consumed, [i * 2 for i in range(20)])
+
+        frames = list(prefetch_frames(functools.partial(read_frame, 'data'), range(2)))
+        self.assertTrue(np.array_equal(frames[1][1], read_frame('data', 1)[1]))
+
+    def test_prefetch_frames_errors(self):
+        """Test frames.prefetch_frames raises reader errors at their frame.
+        """
+        def read(frame_id):
+            if frame_id == 2:
+                raise IOError('missing frame')
+            return frame_id
+
+        frames = prefetch_frames(read, range(5))
+        self.assertEqual(next(frames), 0)
+        self.assertEqual(next(frames), 1)
+        with self.assertRaises(IOError):
+            next(frames)
+
+        with self.assertRaises(ValueError):
+            next(prefetch_frames(read, range(5), prefetch_depth=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+from collections import deque
+from contextlib import contextmanager
+import time
+
+import numpy as np
+
+
+class IntegrationStats:
+    """Wall time per stage, voxel counters and per-frame latencies recorded by TSDFVolume.integrate.
+    """
+
+    def __init__(self, history_size=1000):
+        """Initialize empty stats.
+
+        Args:
+            history_size (int, optional): Number of most recent frame latencies kept
+                for the percentiles. Defaults to 1000.
+
+        Raises:
+            ValueError: If history size is not positive.
+        """
+        if history_size <= 0:
+            raise ValueError('history size must be positive.')
+
+        self.num_frames = 0
+        self.stage_seconds = {}
+        self.counters = {}
+        self.latencies = deque(maxlen=history_size)
+
+    @contextmanager
+    def time_stage(self, stage):
+        """Add the wall time of a block of code to the total of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.) + time.perf_counter() - start
+
+    @contextmanager
+    def time_frame(self):
+        """Record the wall time of a block of code as the latency of a frame.
+            Frames that raise are not recorded.
+        """
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+        self.num_frames += 1
+
+    def count(self, counter, n):
+        """Add to a counter.
+
+        Args:
+            counter (str): Name of the counter.
+            n (int): Amount to add.
+        """
+        self.counters[counter] = self.counters.get(counter, 0) + int(n)
+
+    def get_latency_percentiles(self, percentiles=(50, 95, 99)):
+        """Get percentiles of the recent frame latencies.
+
+        Args:
+            percentiles (tuple of float, optional): Percentiles to compute. Defaults to (50, 95, 99).
+
+        Returns:
+            dict: Latency in seconds keyed by 'p50', 'p95', ... Empty if no frame was recorded.
+        """
+        if len(self.latencies) == 0:
+            return {}
+        values = np.percentile(np.array(self.latencies), percentiles)
+        return {'p%g' % p: float(value) for p, value in zip(percentiles, values)}
+
+    def get_summary(self):
+        """Get a snapshot of the stats.
+
+        Returns:
+            dict: Number of frames, total seconds per stage, counters, and latency
+                percentiles in seconds.
+        """
+        return {'frames': self.num_frames,
+                'stage_seconds': dict(self.stage_seconds),
+                'counters': dict(self.counters),
+                'latency': self.get_latency_percentiles()}
@@ -0,0 +1,290 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import weakref
+
+import numba
+
+from tsdf import *
+
+# the volume attached to the shared memory in a worker process
+_worker_volume = None
+
+
+def _init_worker(volume, num_threads):
+    """Pool initializer: keep the volume unpickled in this worker and limit its numba threads.
+    """
+    global _worker_volume
+    _worker_volume = volume
+    numba.set_num_threads(min(num_threads, numba.config.NUMBA_NUM_THREADS))
+
+
+def _integrate_slab(block_coords, camera_intrinsics, camera_pose, observation_weight):
+    """Pool task: integrate the observation in the shared frame buffer into the blocks of one slab.
+
+    Returns:
+        int: Number of voxels updated.
+    """
+    return _worker_volume._integrate_blocks(block_coords, _worker_volume._color_frame, _worker_volume._depth_frame,
+                                            camera_intrinsics, camera_pose, observation_weight)
+
+
+def _release(pools, shared_blocks):
+    """Stop the worker pools and free the shared memory of a volume.
+    """
+    for pool in pools:
+        pool.terminate()
+        pool.join()
+    for shared_block in shared_blocks:
+        shared_block.close()
+        shared_block.unlink()
+
+
+class SharedTSDFVolume(TSDFVolume):
+    """Volumetric TSDF Fusion of RGB-D Images with multi-process slab-parallel integration.
+
+    The tsdf, weight and color volumes live in shared memory and the voxel grid is
+    split into num_workers slabs of voxel blocks along x. Each frame is copied into a
+    shared frame buffer, and a pool of worker processes integrates the visible blocks
+    of every slab concurrently. Slabs do not overlap, so no locking is needed.
+    """
+
+    def __init__(self, volume_bounds, voxel_size, fused=True, block_size=8,
+                 tsdf_dtype=np.float32, weight_dtype=np.float32, color_dtype=np.float32,
+                 num_workers=None, memory_budget=None, color_policy='mean', color_alpha=0.2):
+        """Initialize shared tsdf volume instance variables. The worker pool starts with
+            the first frame.
+
+        Args:
+            volume_bounds (numpy.array [3, 2]): rows index [x, y, z] and cols index [min_bound, max_bound].
+                Note: units are in meters.
+            voxel_size (float): The side length of each voxel in meters. None to use the
+                finest voxel size that fits in the memory budget.
+            fused (bool, optional): Integrate with the single-pass numba kernel. If False,
+                use the step-by-step numpy pipeline. Defaults to True.
+            block_size (int, optional): The side length in voxels of the blocks that are
+                culled against the camera frustum together. Defaults to 8.
+            tsdf_dtype (numpy.dtype, optional): Storage type of the tsdf: float32, float16,
+                or int16 fixed point. Defaults to float32.
+            weight_dtype (numpy.dtype, optional): Storage type of the weights: float32, or
+                uint8 or uint16 saturating at their maximum. Defaults to float32.
+            color_dtype (numpy.dtype, optional): Storage type of the colors: float32 or uint8.
+                Defaults to float32.
+            num_workers (int, optional): Number of worker processes and slabs. Defaults to
+                the number of CPUs.
+            memory_budget (int, optional): Maximum bytes of voxel storage, see
+                TSDFVolume.estimate_storage_bytes. Defaults to None for no budget.
+            color_policy (str, optional): How observed colors are blended into voxels:
+                'mean', 'max_weight' or 'ema', see TSDFVolume. Defaults to 'mean'.
+            color_alpha (float, optional): Weight of each observation in the exponential
+                moving average, in (0, 1]. Defaults to 0.2.
+
+        Raises:
+            ValueError: If volume bounds are not the correct shape.
+            ValueError: If voxel size is not positive, or None without a memory budget.
+            ValueError: If block size or number of workers is not positive.
+            ValueError: If a storage type is not supported.
+            ValueError: If the storage does not fit in the memory budget.
+            ValueError: If the color policy or alpha is not supported.
+        """
+        num_workers = os.cpu_count() if num_workers is None else num_workers
+        if num_workers <= 0:
+            raise ValueError('number of workers must be positive.')
+
+        self._num_workers = int(num_workers)
+        super().__init__(volume_bounds, voxel_size, fused=fused, block_size=block_size,
+                         tsdf_dtype=tsdf_dtype, weight_dtype=weight_dtype, color_dtype=color_dtype,
+                         memory_budget=memory_budget, color_policy=color_policy, color_alpha=color_alpha)
+        self._is_worker = False
+
+    @classmethod
+    def warmup(cls, mesh=False, raycast=False, **kwargs):
+        """Compile the numba kernels a dense volume uses in this process. Worker processes
+            load the kernels from numba's on-disk cache when they start.
+
+        Args:
+            mesh (bool, optional): Also warm up incremental mesh extraction. Defaults to False.
+            raycast (bool, optional): Also warm up raycasting. Defaults to False.
+            **kwargs: Constructor arguments of the volumes to warm up for, except num_workers.
+        """
+        kwargs.pop('num_workers', None)
+        TSDFVolume.warmup(mesh=mesh, raycast=raycast, **kwargs)
+
+    def _allocate_volumes(self):
+        """Allocate the voxel storage for the whole volume bounds in shared memory.
+        """
+        self._check_dense_allocation()
+        color_bounds = tuple(self._voxel_bounds) + (3,)
+        self._shared_blocks = []
+        self._tsdf_volume = self._new_shared_array(tuple(self._voxel_bounds), self._tsdf_dtype)
+        self._weight_volume = self._new_shared_array(tuple(self._voxel_bounds), self._weight_dtype)
+        self._color_volume = self._new_shared_array(color_bounds, self._color_dtype)
+        self._tsdf_volume[...] = encode_tsdf(1., self._tsdf_dtype)
+        self._weight_volume[...] = 0
+        self._color_volume[...] = 0
+
+        # blocks updated since their mesh was last extracted, and the cached block meshes
+        self._dirty_blocks = np.zeros(self._block_bounds, dtype=bool)
+        self._block_meshes = {}
+
+        # the frame buffer the workers read observations from, allocated for the first frame,
+        # and the worker pool attached to it, in a list that the finalizer sees updated
+        self._frame_blocks = []
+        self._color_frame, self._depth_frame = None, None
+        self._pools = []
+        self._finalizer = weakref.finalize(self, _release, self._pools, self._shared_blocks)
+
+        # the slab of voxel blocks along x that each worker integrates
+        self._slab_bounds = np.linspace(0, self._block_bounds[0], self._num_workers + 1).round().astype(int)
+
+    def _new_shared_array(self, shape, dtype):
+        """Allocate an array in a new shared memory block owned by this volume.
+
+        Args:
+            shape (tuple): Array shape.
+            dtype (numpy.dtype): Array type.
+
+        Returns:
+            numpy.array: The shared array.
+        """
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        shared_block = shared_memory.SharedMemory(create=True, size=size)
+        self._shared_blocks.append(shared_block)
+        return np.ndarray(shape, dtype=dtype, buffer=shared_block.buf)
+
+    def _set_frame(self, color_image, depth_image):
+        """Copy an observation into the shared frame buffer. The first frame, and frames
+            of another size or type, allocate a new buffer and restart the worker pool,
+            which attaches to it.
+
+        Args:
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            depth_image (numpy.array [h, w]): A z depth image.
+        """
+        color_image, depth_image = np.asarray(color_image), np.asarray(depth_image)
+        if (self._color_frame is None or self._color_frame.shape != color_image.shape
+                or self._color_frame.dtype != color_image.dtype or self._depth_frame.shape != depth_image.shape
+                or self._depth_frame.dtype != depth_image.dtype):
+            self._stop_workers()
+            self._color_frame, self._depth_frame = None, None
+            for shared_block in self._frame_blocks:
+                self._shared_blocks.remove(shared_block)
+                shared_block.close()
+                shared_block.unlink()
+            self._color_frame = self._new_shared_array(color_image.shape, color_image.dtype)
+            self._depth_frame = self._new_shared_array(depth_image.shape, depth_image.dtype)
+            self._frame_blocks = self._shared_blocks[-2:]
+            self._start_workers()
+        self._color_frame[...] = color_image
+        self._depth_frame[...] = depth_image
+
+    def _start_workers(self):
+        """Start the worker pool, splitting the CPUs between the workers' numba threads.
+        """
+        # spawned workers do not inherit numba's threading runtime, which is not fork safe
+        context = multiprocessing.get_context('spawn')
+        num_threads = max(1, (os.cpu_count() or 1) // self._num_workers)
+        self._pools.append(context.Pool(self._num_workers, initializer=_init_worker, initargs=(self, num_threads)))
+
+    def _stop_workers(self):
+        """Stop the worker pool, if it is running.
+        """
+        _release(self._pools, [])
+        self._pools.clear()
+
+    def close(self):
+        """Stop the worker pool and free the shared memory. The volume cannot be used afterwards.
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        """Pickle the volume as a handle to its shared memory, without the pool or mesh cache.
+        """
+        state = self.__dict__.copy()
+        for name in ['_pools', '_finalizer', '_shared_blocks', '_frame_blocks', '_block_meshes', '_dirty_blocks',
+                     '_tsdf_volume', '_weight_volume', '_color_volume', '_color_frame', '_depth_frame']:
+            state.pop(name, None)
+        state['_shared_names'] = [shared_block.name for shared_block in self._shared_blocks]
+        state['_frame_layout'] = [(frame.shape, frame.dtype) for frame in [self._color_frame, self._depth_frame]
+                                  if frame is not None]
+        return state
+
+    def __setstate__(self, state):
+        """Attach to the shared memory of a pickled volume.
+        """
+        shared_names = state.pop('_shared_names')
+        frame_layout = state.pop('_frame_layout')
+        self.__dict__.update(state)
+        self._shared_blocks = [shared_memory.SharedMemory(name=name) for name in shared_names]
+        color_bounds = tuple(self._voxel_bounds) + (3,)
+        self._tsdf_volume, self._weight_volume, self._color_volume = [
+            np.ndarray(shape, dtype=dtype, buffer=shared_block.buf) for shape, dtype, shared_block in zip(
+                [tuple(self._voxel_bounds), tuple(self._voxel_bounds), color_bounds],
+                [self._tsdf_dtype, self._weight_dtype, self._color_dtype],
+                self._shared_blocks)]
+        self._color_frame, self._depth_frame = [
+            np.ndarray(shape, dtype=dtype, buffer=shared_block.buf)
+            for (shape, dtype), shared_block in zip(frame_layout, self._shared_blocks[3:])] or [None, None]
+        self._is_worker = True
+
+    def _integrate_blocks(self, block_coords, color_image, depth_image, camera_intrinsics,
+                          camera_pose, observation_weight):
+        """Integrate an RGB-D observation into a set of voxel blocks, one slab per worker.
+            The frame goes to the workers through the shared frame buffer, and the tasks
+            only hold the camera and the blocks of each slab. In the worker processes, this
+            integrates a single slab in place.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks to update.
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            observation_weight (float): The weight to assign for the current observation.
+
+        Returns:
+            int: Number of voxels updated.
+        """
+        if self._is_worker:
+            return super()._integrate_blocks(block_coords, color_image, depth_image, camera_intrinsics,
+                                             camera_pose, observation_weight)
+
+        with self._time_stage('frame_copy'):
+            self._set_frame(color_image, depth_image)
+        slab_index = np.searchsorted(self._slab_bounds, block_coords[:, 0], side='right') - 1
+        tasks = []
+        for slab in range(self._num_workers):
+            slab_blocks = block_coords[slab_index == slab]
+            if len(slab_blocks) > 0:
+                tasks.append((slab_blocks, camera_intrinsics, camera_pose, observation_weight))
+        with self._time_stage('slab_workers'):
+            num_updated = sum(self._pools[0].starmap(_integrate_slab, tasks))
+        self._count_block_voxels(block_coords, num_updated)
+        return num_updated
+
+    def _load_volumes(self, path, meta, mmap_mode):
+        """Copy the voxel storage saved by _save_volumes into shared memory. mmap_mode
+            only applies while copying.
+        """
+        self._num_workers = meta.get('num_workers', os.cpu_count())
+        self._allocate_volumes()
+        self._tsdf_volume[...] = load_voxel_array(os.path.join(path, 'tsdf.npy'), mmap_mode)
+        self._weight_volume[...] = load_voxel_array(os.path.join(path, 'weight.npy'), mmap_mode)
+        self._color_volume[...] = load_voxel_array(os.path.join(path, 'color.npy'), mmap_mode)
+        self._dirty_blocks[...] = True
+        self._is_worker = False
+
+    def _get_metadata(self):
+        """Get the description of the volume that save writes to meta.json.
+
+        Returns:
+            dict: Volume type, grid geometry, storage types and number of workers.
+        """
+        meta = super()._get_metadata()
+        meta['num_workers'] = self._num_workers
+        return meta
@@ -1,17 +1,41 @@
 import numpy as np
 import os
+import shutil
+import tempfile
+
+from ply_ascii import *
+from ply_lists import *
+
+# numpy types of the ply property types
+PLY_TYPES = {
+    'char': np.int8, 'uchar': np.uint8, 'short': np.int16, 'ushort': np.uint16,
+    'int': np.int32, 'uint': np.uint32, 'float': np.float32, 'double': np.float64,
+    'int8': np.int8, 'uint8': np.uint8, 'int16': np.int16, 'uint16': np.uint16,
+    'int32': np.int32, 'uint32': np.uint32, 'float32': np.float32, 'float64': np.float64,
+}
+
+# supported ply body formats and their numpy byte order
+PLY_FORMATS = {'ascii': '=', 'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+# vertex properties of the attributes, by their names in common ply files
+POINT_PROPERTIES = [['x', 'y', 'z']]
+NORMAL_PROPERTIES = [['nx', 'ny', 'nz']]
+COLOR_PROPERTIES = [['red', 'green', 'blue'], ['diffuse_red', 'diffuse_green', 'diffuse_blue'], ['r', 'g', 'b']]
+
+# face list properties, by their names in common ply files
+FACE_PROPERTIES = ['vertex_index', 'vertex_indices']
 
 
 class Ply(object):
     """Class to represent a ply in memory, read plys, and write plys.
     """
 
-    def __init__(self, ply_path=None, triangles=None, points=None, normals=None, colors=None):
+    def __init__(self, ply_path=None, triangles=None, points=None, normals=None, colors=None, mmap_mode=None):
         """Initialize the in memory ply representation.
 
         Args:
-            ply_path (str, optional): Path to .ply file to read (note only
-                supports text mode, not binary mode). Defaults to None.
+            ply_path (str, optional): Path to .ply file to read, in ascii or binary
+                format. Defaults to None.
             triangles (numpy.array [k, 3], optional): each row is a list of point indices used to
                 render triangles. Defaults to None.
             points (numpy.array [n, 3], optional): each row represents a 3D point. Defaults to None.
@@ -19,6 +43,8 @@ class Ply(object):
                 corresponding 3D point. Defaults to None.
             colors (numpy.array [n, 3], optional): each row represents the color of the
                 corresponding 3D point. Defaults to None.
+            mmap_mode (str, optional): numpy.memmap mode to map binary bodies from ply_path
+                with, see Ply.read. Defaults to None.
         """
         super().__init__()
         # TODO: If ply path is None, load in triangles, point, normals, colors.
@@ -32,113 +58,656 @@ class Ply(object):
             self.points = points
             self.normals = normals
             self.colors = colors
+            self.elements = None
         else:
-            self.read(ply_path)
+            self.read(ply_path, mmap_mode)
         #pass
 
-    def write(self, ply_path):
+    def write(self, ply_path, ply_format='ascii'):
         """Write mesh, point cloud, or oriented point cloud to ply file.
+            Normals, colors and faces are only written if they exist.
 
         Args:
             ply_path (str): Output ply path.
+            ply_format (str, optional): Body format, one of PLY_FORMATS. Binary bodies are written
+                in one shot through a numpy structured dtype. Defaults to 'ascii'.
+
+        Raises:
+            ValueError: If the format is not supported.
         """
-        # TODO: Write header depending on existance of normals, colors, and triangles.
-        # TODO: Write points.
-        # TODO: Write normals if they exist.
-        # TODO: Write colors if they exist.
-        # TODO: Write face list if needed.
-        with open(ply_path, 'w') as f:
-
-            f.write("ply\n")
-            f.write("format ascii 1.0\n")
-            #(f'element vertex {len(self.points)}\n')
-            f.write("element vertex %d\n" % (self.points.shape[0]))
-            f.write("property float x\n")
-            f.write("property float y\n")
-            f.write("property float z\n")
-            f.write("property float nx\n")
-            f.write("property float ny\n")
-            f.write("property float nz\n")
-            f.write("property uchar red\n")
-            f.write("property uchar green\n")
-            f.write("property uchar blue\n")
-            if(type(self.triangles) is None):
-                f.write("element face %d\n" % (self.triangles.shape[0]))
-                f.write("property list uchar int vertex_index\n")
-            f.write("end_header\n")
-            
-            for i in range(self.points.shape[0]):                
-                f.write("%f %f %f %f %f %f %d %d %d\n" % (self.points[i, 0], self.points[i, 1], self.points[i, 2], self.normals[i, 0], self.normals[i, 1], self.normals[i, 2], self.colors[i, 0], self.colors[i, 1], self.colors[i, 2],))
-            
-            if(type(self.triangles) is None):
-                for i in range(self.triangles.shape[0]):
-                    f.write("3 %d %d %d\n" % (self.triangles[i, 0], self.triangles[i, 1], self.triangles[i, 2]))
-        #pass
+        _check_ply_format(ply_format)
+        vertex_properties = get_vertex_properties(self.normals is not None, self.colors is not None)
+        with open(ply_path, 'wb') as f:
+            _write_header(f, ply_format, vertex_properties, self.points.shape[0],
+                          None if self.triangles is None else self.triangles.shape[0])
+            _write_vertices(f, ply_format, vertex_properties, self.points, self.normals, self.colors)
+            if self.triangles is not None:
+                _write_triangles(f, ply_format, self.triangles)
 
-    def read(self, ply_path):
-        """Read a ply into memory.
+    def read(self, ply_path, mmap_mode=None):
+        """Read a ply into memory, or map its binary body. Elements are decoded with the types and
+            layout of the header: vertex attributes may be missing, polygon faces are split into
+            triangles, float colors in [0, 1] are converted to uchar, and all decoded elements,
+            including extra ones and properties, are kept in the elements attribute.
 
         Args:
             ply_path (str): ply to read in.
+            mmap_mode (str, optional): numpy.memmap mode: if set, only the header is read, and
+                the attributes of a binary ply are views into the file that read from it on
+                access; 'r' is read-only, 'c' keeps writes in memory and 'r+' writes them through
+                to the file. Bodies with faces other than triangles are scanned, and ascii bodies
+                are always read into memory. Defaults to None.
+
+        Raises:
+            ValueError: If the header or body is malformed.
         """
-        # TODO: Read in ply.
-
-        with open(ply_path, 'r') as f:
-            lines = f.readlines()
-        count=0
-        for line in lines:
-            if line.startswith('ply'):
-                count=count+1
-                continue
-            elif line.startswith('format'):
-                count=count+1
-                continue
-            elif line.startswith('element vertex'):
-                num_vertices = int(line.split()[2])
-                count=count+1
-                continue
-            elif line.startswith('property'):
-                count=count+1
-                continue
-            elif line.startswith('element face'):
-                num_triangles = int(line.split()[2])
-                count=count+1
-                continue
-            elif line.startswith('end_header'):
-                count=count+1
-                continue
-
-        points = []
-        normals = []
-        colors = []
-        triangles = []
-
-        for i in range(num_vertices):
-            point = lines[count].split()
-            points.append([float(point[0]), float(point[1]), float(point[2])])
-            normals.append([float(point[3]), float(point[4]), float(point[5])])
-            colors.append([int(point[6]), int(point[7]), int(point[8])])
-            count=count+1
-
-        self.points = np.asarray(points)
-        self.normals = np.asarray(normals)
-        self.colors = np.asarray(colors)
-
-        for i in range(num_triangles):
-            triangle = lines[count].split()
-            triangles.append([int(triangle[1]), int(triangle[2]), int(triangle[3])])
-            count = count+1
-
-        self.triangles = np.asarray(triangles)
-        
-        #pass
+        with open(ply_path, 'rb') as f:
+            ply_format, elements = read_header(f)
+
+            if ply_format == 'ascii':
+                reader = AsciiTokenReader(f)
+                self.elements = {name: _read_ascii_element(reader, num_rows, properties)
+                                 for name, num_rows, properties in elements}
+            else:
+                self.elements = _read_binary_elements(ply_path, f.tell(), elements, PLY_FORMATS[ply_format],
+                                                      mmap_mode)
+
+        vertices = self.elements.get('vertex')
+        self.points = None if vertices is None else get_attribute(vertices, POINT_PROPERTIES)
+        self.normals = None if vertices is None else get_attribute(vertices, NORMAL_PROPERTIES)
+        self.colors = None if vertices is None else get_attribute(vertices, COLOR_PROPERTIES)
+        if self.colors is not None and self.colors.dtype.kind == 'f':
+            self.colors = np.round(np.clip(self.colors, 0., 1.) * 255.).astype(np.uint8)
+        self.triangles = None if 'face' not in self.elements else get_triangles(self.elements['face'])
+
+
+class PlyWriter(object):
+    """Write a ply from chunks of vertices and triangles as they are produced, e.g. per voxel
+        block, without holding the whole mesh in memory. Vertices are written to the ply as they
+        come and triangles to a temporary file in the same directory, which is appended to the
+        ply on close. The element counts of the header are written zero padded, and patched
+        on close.
+    """
+
+    # digits of the element counts in the header
+    COUNT_WIDTH = 20
+
+    def __init__(self, ply_path, ply_format='ascii', has_normals=True, has_colors=True, has_triangles=True):
+        """Open a ply for writing and write its header.
+
+        Args:
+            ply_path (str): Output ply path.
+            ply_format (str, optional): Body format, one of PLY_FORMATS. Defaults to 'ascii'.
+            has_normals (bool, optional): Whether vertices have normals. Defaults to True.
+            has_colors (bool, optional): Whether vertices have colors. Defaults to True.
+            has_triangles (bool, optional): Whether to write a face element. Defaults to True.
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        _check_ply_format(ply_format)
+        self.ply_path = ply_path
+        self.num_vertices = 0
+        self.num_triangles = 0
+        self._ply_format = ply_format
+        self._has_normals = has_normals
+        self._has_colors = has_colors
+        self._vertex_properties = get_vertex_properties(has_normals, has_colors)
+
+        self._f = open(ply_path, 'wb')
+        self._triangle_file = None
+        if has_triangles:
+            self._triangle_file = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(ply_path)))
+        self._count_offsets = _write_header(self._f, ply_format, self._vertex_properties, 0,
+                                            0 if has_triangles else None, self.COUNT_WIDTH)
+
+    def write(self, points, triangles=None, normals=None, colors=None):
+        """Write a chunk of the mesh.
+
+        Args:
+            points (numpy.array [n, 3]): each row represents a 3D point.
+            triangles (numpy.array [k, 3], optional): each row is a list of indices of points of
+                this chunk used to render triangles. They are offset by the vertices written
+                before. Defaults to None.
+            normals (numpy.array [n, 3], optional): each row represents the normal vector for the
+                corresponding 3D point. Required if the writer has normals. Defaults to None.
+            colors (numpy.array [n, 3], optional): each row represents the color of the
+                corresponding 3D point. Required if the writer has colors. Defaults to None.
+
+        Raises:
+            ValueError: If the attributes do not match the header, or triangles index points
+                outside of the chunk.
+        """
+        if (normals is not None) != self._has_normals or (colors is not None) != self._has_colors:
+            raise ValueError('normals and colors must be given exactly if the writer has them.')
+        if triangles is not None and len(triangles) > 0:
+            if self._triangle_file is None:
+                raise ValueError('the writer has no face element.')
+            if triangles.min() < 0 or triangles.max() >= len(points):
+                raise ValueError('triangles must index points of their chunk.')
+
+        _write_vertices(self._f, self._ply_format, self._vertex_properties, points, normals, colors)
+        self.num_vertices += len(points)
+        if triangles is not None and len(triangles) > 0:
+            self.write_triangles(triangles + self.num_vertices - len(points))
+
+    def write_triangles(self, triangles):
+        """Write triangles between any of the vertices written so far, e.g. to connect a
+            chunk to vertices that an earlier chunk wrote.
+
+        Args:
+            triangles (numpy.array [k, 3]): each row is a list of indices of points written
+                so far used to render triangles.
+
+        Raises:
+            ValueError: If the writer has no face element, or triangles index points that
+                were not written.
+        """
+        if len(triangles) == 0:
+            return
+        if self._triangle_file is None:
+            raise ValueError('the writer has no face element.')
+        if triangles.min() < 0 or triangles.max() >= self.num_vertices:
+            raise ValueError('triangles must index points written so far.')
+        _write_triangles(self._triangle_file, self._ply_format, triangles)
+        self.num_triangles += len(triangles)
 
+    def close(self):
+        """Append the triangles, patch the element counts of the header, and close the ply.
+        """
+        if self._f.closed:
+            return
+        counts = [self.num_vertices, self.num_triangles]
+        if self._triangle_file is not None:
+            self._triangle_file.seek(0)
+            shutil.copyfileobj(self._triangle_file, self._f, ASCII_CHUNK_BYTES)
+            self._triangle_file.close()
+        for offset, count in zip(self._count_offsets, counts):
+            self._f.seek(offset)
+            self._f.write(b'%0*d' % (self.COUNT_WIDTH, count))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # do not leave a ply whose header does not match its body
+        self._f.close()
+        if self._triangle_file is not None:
+            self._triangle_file.close()
+        os.remove(self.ply_path)
+
+
+def get_vertex_properties(has_normals, has_colors):
+    """Get the vertex properties that are written, depending on the existing attributes.
+
+    Args:
+        has_normals (bool): Whether vertices have normals.
+        has_colors (bool): Whether vertices have colors.
+
+    Returns:
+        list of (str, str): Name and ply type of each vertex property.
+    """
+    properties = [('x', 'float'), ('y', 'float'), ('z', 'float')]
+    if has_normals:
+        properties += [('nx', 'float'), ('ny', 'float'), ('nz', 'float')]
+    if has_colors:
+        properties += [('red', 'uchar'), ('green', 'uchar'), ('blue', 'uchar')]
+    return properties
+
+
+def _check_ply_format(ply_format):
+    """Raise a ValueError if a body format is not one of PLY_FORMATS.
+    """
+    if ply_format not in PLY_FORMATS:
+        raise ValueError('ply format must be one of {}.'.format(', '.join(PLY_FORMATS)))
+
+
+def _write_header(f, ply_format, vertex_properties, num_vertices, num_triangles=None, count_width=0):
+    """Write the header of a mesh or point cloud.
+
+    Args:
+        f (file): File opened in binary mode.
+        ply_format (str): Body format, one of PLY_FORMATS.
+        vertex_properties (list of (str, str)): Name and ply type of each vertex property.
+        num_vertices (int): Number of vertices.
+        num_triangles (int, optional): Number of triangles, None to write no face element.
+            Defaults to None.
+        count_width (int, optional): Minimum number of digits of the counts, zero padded.
+            Defaults to 0.
+
+    Returns:
+        list of int: File offsets of the vertex count, and of the triangle count if any.
+    """
+    count_offsets = []
+    f.write(b"ply\n")
+    f.write(("format %s 1.0\n" % ply_format).encode('ascii'))
+    f.write(b"element vertex ")
+    count_offsets.append(f.tell())
+    f.write(b"%0*d\n" % (count_width, num_vertices))
+    for name, ply_type in vertex_properties:
+        f.write(("property %s %s\n" % (ply_type, name)).encode('ascii'))
+    if num_triangles is not None:
+        f.write(b"element face ")
+        count_offsets.append(f.tell())
+        f.write(b"%0*d\n" % (count_width, num_triangles))
+        f.write(b"property list uchar int vertex_index\n")
+    f.write(b"end_header\n")
+    return count_offsets
+
+
+def _write_vertices(f, ply_format, vertex_properties, points, normals=None, colors=None):
+    """Write vertex rows. Binary rows are written in one shot through a numpy structured dtype,
+        ascii rows are formatted in chunks.
+
+    Args:
+        f (file): File opened in binary mode.
+        ply_format (str): Body format, one of PLY_FORMATS.
+        vertex_properties (list of (str, str)): Name and ply type of each vertex property.
+        points (numpy.array [n, 3]): each row represents a 3D point.
+        normals (numpy.array [n, 3], optional): Normals, if vertex_properties has them. Defaults to None.
+        colors (numpy.array [n, 3], optional): Colors, if vertex_properties has them. Defaults to None.
+    """
+    attributes = [attribute for attribute in [points, normals, colors] if attribute is not None]
+    if ply_format == 'ascii':
+        formats = ['%d' if ply_type == 'uchar' else '%f' for _, ply_type in vertex_properties]
+        for start in range(0, points.shape[0], ASCII_CHUNK_ROWS):
+            f.write(format_rows(np.hstack([attribute[start:start + ASCII_CHUNK_ROWS]
+                                           for attribute in attributes]), formats))
+        return
+
+    vertices = np.empty(points.shape[0], dtype=get_element_dtype(vertex_properties, PLY_FORMATS[ply_format]))
+    names = [name for name, _ in vertex_properties]
+    for i, attribute in enumerate(attributes):
+        for j in range(3):
+            vertices[names[3 * i + j]] = attribute[:, j]
+    vertices.tofile(f)
+
+
+def _write_triangles(f, ply_format, triangles):
+    """Write face rows of triangles, see _write_vertices.
+
+    Args:
+        f (file): File opened in binary mode.
+        ply_format (str): Body format, one of PLY_FORMATS.
+        triangles (numpy.array [k, 3]): each row is a list of point indices used to render triangles.
+    """
+    if ply_format == 'ascii':
+        for start in range(0, triangles.shape[0], ASCII_CHUNK_ROWS):
+            chunk = triangles[start:start + ASCII_CHUNK_ROWS]
+            f.write(format_rows(np.hstack([np.full((len(chunk), 1), 3), chunk]), ['%d'] * 4))
+        return
+
+    faces = np.empty(triangles.shape[0], dtype=get_triangle_dtype('uchar', 'int', PLY_FORMATS[ply_format]))
+    faces['count'] = 3
+    faces['vertex_index'] = triangles
+    faces.tofile(f)
+
+
+def read_header(f):
+    """Read a ply header, leaving the file at the start of the body.
+
+    Args:
+        f (file): ply file opened in binary mode.
+
+    Raises:
+        ValueError: If the header is malformed or uses unsupported types or formats.
+
+    Returns:
+        str: Body format, one of PLY_FORMATS.
+        list of (str, int, list): Name, number of rows and properties of each element. A property
+            is a (name, type) pair, where the type of a list property is a (count type, item type) pair.
+    """
+    if f.readline().strip() != b'ply':
+        raise ValueError('not a ply file.')
+
+    ply_format = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError('ply header has no end_header.')
+        words = line.decode('ascii').split()
+        if not words or words[0] in ['comment', 'obj_info']:
+            continue
+        if words[0] == 'end_header':
+            break
+        if words[0] == 'format':
+            if len(words) != 3 or words[1] not in PLY_FORMATS:
+                raise ValueError('ply format must be one of {}.'.format(', '.join(PLY_FORMATS)))
+            ply_format = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property':
+            if not elements:
+                raise ValueError('ply property before any element.')
+            if len(words) != (5 if words[1] == 'list' else 3):
+                raise ValueError('malformed ply property: {}'.format(line.decode('ascii').strip()))
+            if words[1] == 'list':
+                ply_types = words[2:4]
+                elements[-1][2].append((words[4], tuple(ply_types)))
+            else:
+                ply_types = words[1:2]
+                elements[-1][2].append((words[2], words[1]))
+            for ply_type in ply_types:
+                if ply_type not in PLY_TYPES:
+                    raise ValueError('unsupported ply property type {}.'.format(ply_type))
+        else:
+            raise ValueError('unexpected ply header line: {}'.format(line.decode('ascii').strip()))
 
-#to check the working of the class, uncomment below lines
-#ply = Ply()
-#ply.read('data/triangle_sample.ply')
-#print(ply.points)
-#print(ply.normals)
-#print(ply.colors)
-#print(ply.triangles)
-#ply.write('data/triangle_sample_test.ply')
+    if ply_format is None:
+        raise ValueError('ply header has no format.')
+    return ply_format, elements
+
+
+def get_element_dtype(properties, byte_order='='):
+    """Get the numpy structured dtype of an element with scalar properties.
+
+    Args:
+        properties (list of (str, str)): Name and ply type of each property.
+        byte_order (str, optional): numpy byte order character. Defaults to '='.
+
+    Returns:
+        numpy.dtype: Packed structured dtype with a field per property.
+    """
+    return np.dtype([(name, np.dtype(PLY_TYPES[ply_type]).newbyteorder(byte_order))
+                     for name, ply_type in properties])
+
+
+def get_triangle_dtype(count_type, index_type, byte_order='=', name='vertex_index'):
+    """Get the numpy structured dtype of a face element whose faces are all triangles.
+
+    Args:
+        count_type (str): ply type of the vertex count of a face.
+        index_type (str): ply type of the vertex indices.
+        byte_order (str, optional): numpy byte order character. Defaults to '='.
+        name (str, optional): Name of the list property. Defaults to 'vertex_index'.
+
+    Returns:
+        numpy.dtype: Packed structured dtype with 'count' and [3] name fields.
+    """
+    return np.dtype([('count', np.dtype(PLY_TYPES[count_type]).newbyteorder(byte_order)),
+                     (name, np.dtype(PLY_TYPES[index_type]).newbyteorder(byte_order), (3,))])
+
+
+def get_columns(element, fields):
+    """Get properties of a decoded element as the columns of a 2D array. Consecutive fields of
+        the same type of a structured array are returned as a strided view, so the columns of a
+        memory-mapped element are still read from the file on access.
+
+    Args:
+        element (numpy.array [n] or dict): Structured array, or dict of the columns of an element
+            with list properties.
+        fields (list of str): Names of the scalar properties.
+
+    Returns:
+        numpy.array [n, len(fields)]: The columns, or None if a property is missing.
+    """
+    names = element.dtype.names if isinstance(element, np.ndarray) else list(element)
+    if not all(field in names for field in fields):
+        return None
+    if not isinstance(element, np.ndarray):
+        return np.stack([element[field] for field in fields], axis=1)
+
+    field_types = [element.dtype.fields[field][0] for field in fields]
+    offsets = [element.dtype.fields[field][1] for field in fields]
+    if (all(field_type == field_types[0] for field_type in field_types)
+            and offsets == [offsets[0] + i * field_types[0].itemsize for i in range(len(fields))]):
+        columns_dtype = np.dtype({'names': ['columns'], 'formats': [(field_types[0], (len(fields),))],
+                                  'offsets': [offsets[0]], 'itemsize': element.dtype.itemsize})
+        return element.view(columns_dtype)['columns']
+    return np.stack([element[field] for field in fields], axis=1)
+
+
+def get_attribute(vertices, names):
+    """Get a vertex attribute from the first set of properties it is stored as.
+
+    Args:
+        vertices (numpy.array [n] or dict): Decoded vertex element.
+        names (list of list of str): Property names the attribute may be stored as.
+
+    Returns:
+        numpy.array [n, k]: The attribute, or None if it is missing.
+    """
+    for fields in names:
+        columns = get_columns(vertices, fields)
+        if columns is not None:
+            return columns
+    return None
+
+
+def get_triangles(faces):
+    """Get the triangles of a decoded face element, splitting polygons into triangle fans.
+
+    Args:
+        faces (numpy.array [k] or dict): Decoded face element.
+
+    Raises:
+        ValueError: If the element has no list of vertex indices.
+
+    Returns:
+        numpy.array [t, 3]: Vertex indices of each triangle.
+    """
+    names = faces.dtype.names if isinstance(faces, np.ndarray) else list(faces)
+    for name in FACE_PROPERTIES:
+        if name not in names:
+            continue
+        if isinstance(faces, np.ndarray):
+            return faces[name]
+        counts, indices = faces[name]
+        return triangulate_polygons(counts, indices)
+    raise ValueError('ply face element has no {} list.'.format(' or '.join(FACE_PROPERTIES)))
+
+
+def _is_list(ply_type):
+    """Check if a property type returned by read_header is a list type.
+    """
+    return isinstance(ply_type, tuple)
+
+
+def _get_triangle_layout(properties, byte_order):
+    """Get the fixed row dtype of an element if its properties are a single list of triangles.
+
+    Args:
+        properties (list): Properties of the element as returned by read_header.
+        byte_order (str): numpy byte order character.
+
+    Returns:
+        numpy.dtype: Structured dtype of a triangle row, or None if the element is not a
+            single list property.
+    """
+    if len(properties) != 1 or not _is_list(properties[0][1]):
+        return None
+    name, (count_type, index_type) = properties[0]
+    return get_triangle_dtype(count_type, index_type, byte_order, name)
+
+
+def _read_binary_elements(ply_path, offset, elements, byte_order, mmap_mode):
+    """Read or map the binary body of a ply.
+        Elements with scalar properties are structured arrays over the body. If mmap_mode is
+        set and every list element fits a triangle layout, list elements are mapped as
+        triangles too; only the vertex count of their first face is checked, the others are
+        implied by the file size. Otherwise list elements are scanned and decoded in memory.
+
+    Args:
+        ply_path (str): Path of the ply.
+        offset (int): Byte offset of the body.
+        elements (list): Elements as returned by read_header.
+        byte_order (str): numpy byte order character.
+        mmap_mode (str): numpy.memmap mode, or None to read the body into memory.
+
+    Raises:
+        ValueError: If the body does not match the header.
+
+    Returns:
+        dict: Decoded element by name, a structured array or a dict of columns, see
+            _decode_binary_element.
+    """
+    body_size = os.path.getsize(ply_path) - offset
+    if body_size > 0:
+        body = np.memmap(ply_path, dtype=np.uint8, mode=mmap_mode or 'r', offset=offset, shape=(body_size,))
+    else:
+        body = np.empty(0, dtype=np.uint8)
+
+    if mmap_mode is not None:
+        bodies = {}
+        position = 0
+        for name, num_rows, properties in elements:
+            dtype = _get_triangle_layout(properties, byte_order)
+            if dtype is None:
+                if any(_is_list(ply_type) for _, ply_type in properties):
+                    break
+                dtype = get_element_dtype(properties, byte_order)
+            elif num_rows > 0 and (position + dtype.itemsize > body_size
+                                   or body[position:position + dtype.itemsize].view(dtype)['count'][0] != 3):
+                break
+            if position + num_rows * dtype.itemsize > body_size:
+                raise ValueError('ply body is truncated.')
+            bodies[name] = body[position:position + num_rows * dtype.itemsize].view(dtype)
+            position += num_rows * dtype.itemsize
+        else:
+            if position == body_size:
+                return bodies
+
+    bodies = {}
+    position = 0
+    for name, num_rows, properties in elements:
+        bodies[name], position = _decode_binary_element(body, position, num_rows, properties, byte_order,
+                                                        mmap_mode is None)
+    if position != body_size:
+        raise ValueError('ply body size does not match its header.')
+    return bodies
+
+
+def _decode_binary_element(body, position, num_rows, properties, byte_order, copy):
+    """Decode the binary rows of an element.
+
+    Args:
+        body (numpy.array [m]): uint8 body of the ply.
+        position (int): Position of the element in the body.
+        num_rows (int): Number of rows of the element.
+        properties (list): Properties of the element as returned by read_header.
+        byte_order (str): numpy byte order character.
+        copy (bool): Whether structured arrays are copied into memory, rather than views of the body.
+
+    Raises:
+        ValueError: If the body is truncated or has negative list counts.
+
+    Returns:
+        numpy.array [num_rows] or dict: Structured array of elements with scalar properties or
+            whose rows are all triangles. Otherwise a dict of [num_rows] arrays of scalar
+            properties, and of (counts [num_rows], items [sum(counts)]) of list properties.
+        int: Position after the element.
+    """
+    if not any(_is_list(ply_type) for _, ply_type in properties):
+        dtype = get_element_dtype(properties, byte_order)
+    else:
+        dtype = _get_triangle_layout(properties, byte_order)
+        end = position + num_rows * dtype.itemsize if dtype is not None else -1
+        if dtype is not None and end <= len(body) and not np.all(body[position:end].view(dtype)['count'] == 3):
+            dtype = None
+    if dtype is not None:
+        end = position + num_rows * dtype.itemsize
+        if end > len(body):
+            raise ValueError('ply body is truncated.')
+        element = body[position:end].view(dtype)
+        return (np.array(element) if copy else element), end
+
+    # scan the variable length rows, then gather each property
+    item_types = [np.dtype(PLY_TYPES[ply_type[1] if _is_list(ply_type) else ply_type]).newbyteorder(byte_order)
+                  for _, ply_type in properties]
+    count_types = [np.dtype(PLY_TYPES[ply_type[0]]) if _is_list(ply_type) else None for _, ply_type in properties]
+    starts, counts, end = scan_binary_rows(
+        np.asarray(body), position, num_rows, np.array([item_type.itemsize for item_type in item_types]),
+        np.array([0 if count_type is None else count_type.itemsize for count_type in count_types]),
+        np.array([count_type is not None and count_type.kind == 'i' for count_type in count_types]),
+        byte_order == '>')
+    if end < 0:
+        raise ValueError('ply body is truncated or has negative list counts.')
+
+    element = {}
+    for j, (name, ply_type) in enumerate(properties):
+        items = gather_runs(np.asarray(body), starts[:, j], counts[:, j] * item_types[j].itemsize)
+        items = items.view(item_types[j]).astype(item_types[j].newbyteorder('='))
+        element[name] = (counts[:, j], items) if _is_list(ply_type) else items
+    return element, end
+
+
+def _read_ascii_element(reader, num_rows, properties):
+    """Read the ascii body of an element, in chunks.
+
+    Args:
+        reader (AsciiTokenReader): Reader at the start of the element body.
+        num_rows (int): Number of rows of the element.
+        properties (list): Properties of the element as returned by read_header.
+
+    Raises:
+        ValueError: If the body is truncated or malformed.
+
+    Returns:
+        numpy.array [num_rows] or dict: Structured array of elements with scalar properties.
+            Otherwise a dict of [num_rows] arrays of scalar properties, and of
+            (counts [num_rows], items [sum(counts)]) of list properties.
+    """
+    if any(_is_list(ply_type) for _, ply_type in properties):
+        return _read_ascii_list_element(reader, num_rows, properties)
+
+    element = np.empty(num_rows, dtype=get_element_dtype(properties))
+    for start in range(0, num_rows, ASCII_CHUNK_ROWS):
+        stop = min(start + ASCII_CHUNK_ROWS, num_rows)
+        rows = reader.read((stop - start) * len(properties)).reshape(stop - start, len(properties))
+        for j, (name, _) in enumerate(properties):
+            element[name][start:stop] = rows[:, j]
+    return element
+
+
+def _read_ascii_list_element(reader, num_rows, properties):
+    """Read the ascii body of an element with list properties. Chunks of numbers are scanned
+        for complete rows, and the numbers read past the last complete row are read again
+        with the next chunk.
+
+    Args:
+        reader (AsciiTokenReader): Reader at the start of the element body.
+        num_rows (int): Number of rows of the element.
+        properties (list): Properties of the element as returned by read_header.
+
+    Raises:
+        ValueError: If the body is truncated or malformed.
+
+    Returns:
+        dict: [num_rows] arrays of scalar properties, and (counts [num_rows], items [sum(counts)])
+            of list properties.
+    """
+    is_list = np.array([_is_list(ply_type) for _, ply_type in properties])
+    columns = [[] for _ in properties]
+    num_read = 0
+    pending = np.empty(0, dtype=np.float64)
+    while num_read < num_rows:
+        chunk = reader.read(ASCII_CHUNK_TOKENS, allow_partial=True)
+        tokens = np.concatenate([pending, chunk])
+        starts, counts, num_complete, num_used = scan_token_rows(
+            tokens, min(num_rows - num_read, len(tokens)), is_list)
+        if num_complete < 0:
+            raise ValueError('ply list counts must be non-negative integers.')
+        if len(chunk) < ASCII_CHUNK_TOKENS and num_read + num_complete < num_rows:
+            raise ValueError('ply body is truncated.')
+
+        for j in range(len(properties)):
+            columns[j].append((gather_runs(tokens, starts[:num_complete, j], counts[:num_complete, j]),
+                               counts[:num_complete, j]))
+        num_read += num_complete
+        pending = tokens[num_used:]
+    reader.unread(pending)
+
+    element = {}
+    for j, (name, ply_type) in enumerate(properties):
+        item_type = PLY_TYPES[ply_type[1] if _is_list(ply_type) else ply_type]
+        items = np.concatenate([items for items, _ in columns[j]]).astype(item_type)
+        if _is_list(ply_type):
+            element[name] = (np.concatenate([counts for _, counts in columns[j]]), items)
+        else:
+            element[name] = items
+    return element
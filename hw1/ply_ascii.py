@@ -0,0 +1,357 @@
+from numba import njit, prange
+import numpy as np
+
+# rows formatted, bytes read, and numbers scanned for list properties, per chunk of an ascii ply body
+ASCII_CHUNK_ROWS = 1 << 16
+ASCII_CHUNK_BYTES = 1 << 24
+ASCII_CHUNK_TOKENS = 1 << 20
+
+# maximum length of a value formatted by format_value: a sign and 18 digits, or a
+# sign, 9 integer digits, a point and 6 decimals
+MAX_VALUE_LENGTH = 20
+
+# exact powers of ten, mantissa / 10 ** k is correctly rounded for k <= 22
+POWERS_OF_TEN = np.array([10. ** k for k in range(23)])
+
+# mantissas up to 2 ** 53 are exact in float64
+MAX_MANTISSA = 2 ** 53
+
+
+@njit(cache=True)
+def two_product(a, b):
+    """Multiply two floats, with the rounding error of the product (Dekker's algorithm).
+
+    Args:
+        a (float): First factor.
+        b (float): Second factor.
+
+    Returns:
+        float: Rounded product.
+        float: Error, a * b = product + error exactly.
+    """
+    product = a * b
+    a_split = 134217729. * a
+    a_high = a_split - (a_split - a)
+    a_low = a - a_high
+    b_split = 134217729. * b
+    b_high = b_split - (b_split - b)
+    b_low = b - b_high
+    error = ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+    return product, error
+
+
+@njit(cache=True)
+def write_digits(out, position, value, min_digits):
+    """Write the decimal digits of a non-negative integer.
+
+    Args:
+        out (numpy.array [m]): uint8 output buffer.
+        position (int): Position of the first digit.
+        value (int): Value to write.
+        min_digits (int): Minimum number of digits, zero padded.
+
+    Returns:
+        int: Position after the last digit.
+    """
+    # unsigned division by a constant compiles to a multiplication
+    value = np.uint64(value)
+    ten = np.uint64(10)
+    num_digits = 1
+    bound = ten
+    while num_digits < 19 and value >= bound:
+        num_digits += 1
+        bound *= ten
+    num_digits = max(num_digits, min_digits)
+    for i in range(num_digits - 1, -1, -1):
+        out[position + i] = np.uint8(48 + value % ten)
+        value //= ten
+    return position + num_digits
+
+
+@njit(cache=True)
+def format_value(out, position, value, is_int):
+    """Write a value as python formats it with '%d' or '%f'. '%f' rounds the exact binary
+        value half to even, like printf.
+
+    Args:
+        out (numpy.array [m]): uint8 output buffer, with MAX_VALUE_LENGTH bytes from position.
+        position (int): Position of the first character.
+        value (float): Value to write.
+        is_int (bool): Whether to format with '%d', truncating, or with '%f'.
+
+    Returns:
+        int: Position after the last character, or -1 if the value is not finite or too large,
+            and must be formatted by python.
+    """
+    if not np.isfinite(value):
+        return -1
+    if is_int:
+        if abs(value) >= 1e18:
+            return -1
+        integer = int(value)
+        if integer < 0:
+            out[position] = 45
+            position += 1
+        return write_digits(out, position, abs(integer), 1)
+
+    # below 1e9, the product has a spacing of at most 1/8 and integer + 0.5 is exact
+    magnitude = abs(value)
+    if magnitude >= 1e9:
+        return -1
+    # round magnitude * 1e6 half to even, deciding ties on the exact product
+    product, error = two_product(magnitude, 1e6)
+    integer = np.floor(product)
+    difference = product - (integer + 0.5)
+    scaled = int(integer)
+    if difference > 0 or (difference == 0 and (error > 0 or (error == 0 and scaled % 2 == 1))):
+        scaled += 1
+
+    if value < 0 or (value == 0 and np.copysign(1., value) < 0):
+        out[position] = 45
+        position += 1
+    position = write_digits(out, position, scaled // 1000000, 1)
+    out[position] = 46
+    return write_digits(out, position + 1, scaled % 1000000, 6)
+
+
+@njit(parallel=True, cache=True)
+def format_rows_kernel(values, is_int, rows, lengths):
+    """Format the rows of a table into fixed size slots, one row per line.
+
+    Args:
+        values (numpy.array [n, c]): Values of the table.
+        is_int (numpy.array [c]): Whether each column is formatted with '%d' or '%f'.
+        rows (numpy.array [n, c * (MAX_VALUE_LENGTH + 1)]): uint8 output slot of each row.
+        lengths (numpy.array [n]): Output length of each row, or -1 if it must be
+            formatted by python.
+
+    Returns:
+        int: Number of rows that must be formatted by python.
+    """
+    num_failed = 0
+    for i in prange(values.shape[0]):
+        row = rows[i]
+        position = 0
+        for j in range(values.shape[1]):
+            if j > 0:
+                row[position] = 32
+                position += 1
+            position = format_value(row, position, values[i, j], is_int[j])
+            if position < 0:
+                break
+        if position >= 0:
+            row[position] = 10
+            lengths[i] = position + 1
+        else:
+            lengths[i] = -1
+            num_failed += 1
+    return num_failed
+
+
+@njit(parallel=True, cache=True)
+def concatenate_rows_kernel(rows, lengths, offsets, out):
+    """Copy the formatted rows of their slots into a contiguous buffer.
+
+    Args:
+        rows (numpy.array [n, m]): uint8 slot of each row.
+        lengths (numpy.array [n]): Length of each row, rows of length -1 are skipped.
+        offsets (numpy.array [n]): Output position of each row.
+        out (numpy.array): uint8 output buffer.
+    """
+    for i in prange(rows.shape[0]):
+        if lengths[i] >= 0:
+            out[offsets[i]:offsets[i] + lengths[i]] = rows[i, :lengths[i]]
+
+
+def format_rows(values, formats):
+    """Format the rows of a table as python does with a '%f' / '%d' format per column.
+
+    Args:
+        values (numpy.array [n, c]): Values of the table.
+        formats (list of str): '%f' or '%d' for each column.
+
+    Returns:
+        numpy.array: uint8 ascii text of the rows, one per line.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    is_int = np.array([column_format == '%d' for column_format in formats])
+    rows = np.empty((len(values), len(formats) * (MAX_VALUE_LENGTH + 1)), dtype=np.uint8)
+    lengths = np.empty(len(values), dtype=np.int64)
+    sizes = lengths
+    failed_texts = []
+    if format_rows_kernel(values, is_int, rows, lengths) > 0:
+        # rows with nan, inf or huge values are formatted by python
+        row_format = ' '.join(formats) + '\n'
+        failed_rows = np.flatnonzero(lengths < 0)
+        failed_texts = [(row_format % tuple(row)).encode('ascii') for row in values[failed_rows].tolist()]
+        sizes = lengths.copy()
+        sizes[failed_rows] = [len(text) for text in failed_texts]
+
+    offsets = np.cumsum(sizes) - sizes
+    out = np.empty(sizes.sum(), dtype=np.uint8)
+    concatenate_rows_kernel(rows, lengths, offsets, out)
+    for i, text in zip(np.flatnonzero(lengths < 0), failed_texts):
+        out[offsets[i]:offsets[i] + len(text)] = np.frombuffer(text, dtype=np.uint8)
+    return out
+
+
+@njit(cache=True)
+def is_space(character):
+    """Check if a byte is ascii whitespace.
+    """
+    return character == 32 or (9 <= character <= 13)
+
+
+@njit(cache=True)
+def parse_tokens_kernel(buffer, position, tokens, is_final):
+    """Parse whitespace separated decimal numbers without exponents, stopping at the first
+        token outside of that fast path.
+
+    Args:
+        buffer (numpy.array [m]): uint8 text.
+        position (int): Position to start parsing at.
+        tokens (numpy.array [k]): float64 output; parsing stops when it is full.
+        is_final (bool): Whether the buffer ends the text. Otherwise a token that runs to the
+            end of the buffer may be incomplete, and is left unparsed.
+
+    Returns:
+        int: Number of tokens parsed.
+        int: Position after the last parsed token.
+        bool: False if parsing stopped at a token outside the fast path, like exponents,
+            nan, inf, too many digits or malformed numbers.
+    """
+    count = 0
+    n = len(buffer)
+    while count < len(tokens):
+        while position < n and is_space(buffer[position]):
+            position += 1
+        if position == n:
+            break
+
+        start = position
+        negative = buffer[position] == 45
+        if negative or buffer[position] == 43:
+            position += 1
+        mantissa = 0
+        num_digits = 0
+        num_decimals = 0
+        has_point = False
+        is_exact = True
+        while position < n:
+            character = buffer[position]
+            if 48 <= character <= 57:
+                mantissa = mantissa * 10 + character - 48
+                num_digits += 1
+                num_decimals += has_point
+                if mantissa > MAX_MANTISSA:
+                    is_exact = False
+                    break
+            elif character == 46 and not has_point:
+                has_point = True
+            else:
+                break
+            position += 1
+
+        if position == n and not is_final:
+            return count, start, True
+        if (num_digits == 0 or not is_exact or num_decimals >= len(POWERS_OF_TEN)
+                or (position < n and not is_space(buffer[position]))):
+            return count, start, False
+        value = mantissa / POWERS_OF_TEN[num_decimals]
+        tokens[count] = -value if negative else value
+        count += 1
+    return count, position, True
+
+
+class AsciiTokenReader(object):
+    """Read the numbers of an ascii ply body in chunks.
+    """
+
+    def __init__(self, f, chunk_bytes=ASCII_CHUNK_BYTES):
+        """Initialize a reader at the current position of a file.
+
+        Args:
+            f (file): File opened in binary mode.
+            chunk_bytes (int, optional): Bytes read at a time. Defaults to ASCII_CHUNK_BYTES.
+        """
+        self._f = f
+        self._chunk_bytes = chunk_bytes
+        self._buffer = b''
+        self._position = 0
+        self._is_final = False
+        self._unread = np.empty(0, dtype=np.float64)
+
+    def read(self, num_tokens, allow_partial=False):
+        """Read the next numbers.
+
+        Args:
+            num_tokens (int): Number of numbers to read.
+            allow_partial (bool, optional): Whether to return fewer numbers if the text ends
+                first. Defaults to False.
+
+        Raises:
+            ValueError: If the text ends first and allow_partial is False, or a token is not a number.
+
+        Returns:
+            numpy.array [num_tokens]: The numbers as float64.
+        """
+        tokens = np.empty(num_tokens, dtype=np.float64)
+        count = min(num_tokens, len(self._unread))
+        tokens[:count] = self._unread[:count]
+        self._unread = self._unread[count:]
+        while count < num_tokens:
+            buffer = np.frombuffer(self._buffer, dtype=np.uint8)
+            num_parsed, self._position, is_fast = parse_tokens_kernel(
+                buffer, self._position, tokens[count:], self._is_final)
+            count += num_parsed
+            if count == num_tokens:
+                break
+            if not is_fast:
+                count += self._read_slow(tokens[count:])
+            elif self._is_final:
+                if allow_partial:
+                    return tokens[:count]
+                raise ValueError('ply body is truncated.')
+            else:
+                self._read_chunk()
+        return tokens
+
+    def unread(self, tokens):
+        """Push back numbers that were read past the end of an element, to be read again.
+
+        Args:
+            tokens (numpy.array [k]): Last numbers read.
+        """
+        self._unread = np.concatenate([tokens, self._unread])
+
+    def _read_slow(self, tokens):
+        """Parse the complete tokens left in the buffer with python, for numbers outside the
+            fast path of parse_tokens_kernel.
+
+        Args:
+            tokens (numpy.array [k]): float64 output.
+
+        Returns:
+            int: Number of tokens parsed.
+        """
+        end = len(self._buffer)
+        if not self._is_final:
+            end = max(self._buffer.rfind(space) for space in [b' ', b'\t', b'\n', b'\r']) + 1
+            if end <= self._position:
+                self._read_chunk()
+                return 0
+
+        words = self._buffer[self._position:end].split(None, len(tokens))
+        values = words[:len(tokens)]
+        tokens[:len(values)] = np.array(values, dtype=np.float64)
+        rest = words[len(tokens)] if len(words) > len(tokens) else b''
+        self._position = end - len(rest)
+        return len(values)
+
+    def _read_chunk(self):
+        """Append the next chunk of the file to the unparsed part of the buffer.
+        """
+        chunk = self._f.read(self._chunk_bytes)
+        self._is_final = len(chunk) < self._chunk_bytes
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
@@ -0,0 +1,62 @@
+import io
+import unittest
+import numpy as np
+from ply_ascii import *
+
+
+class TestPlyAscii(unittest.TestCase):
+    """Unit test ply_ascii.py.
+    """
+
+    def test_format_rows(self):
+        """Test ply_ascii.format_rows formats exactly like python.
+        """
+        rng = np.random.default_rng(0)
+        values = np.concatenate([
+            rng.normal(size=10000) * 10. ** rng.integers(-8, 10, 10000),
+            # exact ties of the 6th decimal are rounded half to even
+            np.arange(-300, 300) / 128.,
+            np.arange(-300, 300) / 1e6 + 5e-7,
+            [0., -0., -1e-9, 5e-7, 999999.9999995, 999999999.9999995, 1e9, 1e17]])
+        self.assertEqual(bytes(format_rows(values[:, None], ['%f'])),
+                         ''.join('%f\n' % value for value in values).encode('ascii'))
+        self.assertEqual(bytes(format_rows(values[:, None], ['%d'])),
+                         ''.join('%d\n' % value for value in values).encode('ascii'))
+
+        table = np.array([[1.5, 2., 255.], [-0.25, 1e-3, 0.]])
+        self.assertEqual(bytes(format_rows(table, ['%f', '%f', '%d'])),
+                         b'1.500000 2.000000 255\n-0.250000 0.001000 0\n')
+
+        # values outside the kernel are formatted by python
+        table = np.array([[np.nan, 1.], [np.inf, 2.]])
+        self.assertEqual(bytes(format_rows(table, ['%f', '%d'])), b'nan 1\ninf 2\n')
+
+        # only the rows outside the kernel are formatted by python
+        table = np.stack([values, values[::-1]], axis=1)
+        table[::1000, 0] = [np.nan, -np.inf, 1e300] * 4
+        lengths = np.empty(len(table), dtype=np.int64)
+        rows = np.empty((len(table), 2 * (MAX_VALUE_LENGTH + 1)), dtype=np.uint8)
+        self.assertEqual(format_rows_kernel(table, np.zeros(2, dtype=bool), rows, lengths),
+                         np.count_nonzero(lengths < 0))
+        self.assertTrue(12 <= np.count_nonzero(lengths < 0) < len(table) // 10)
+        self.assertEqual(bytes(format_rows(table, ['%f', '%f'])),
+                         ''.join('%f %f\n' % tuple(row) for row in table).encode('ascii'))
+
+    def test_ascii_token_reader(self):
+        """Test ply_ascii.AsciiTokenReader across chunks and outside the fast path.
+        """
+        rng = np.random.default_rng(1)
+        values = rng.normal(size=5000) * 10. ** rng.integers(-5, 5, 5000)
+        text = b''.join(b'%r\r\n' % value for value in values.tolist()) + b'nan -inf 1e5 +3 12345678901234567890'
+        reader = AsciiTokenReader(io.BytesIO(text), chunk_bytes=333)
+        tokens = np.concatenate([reader.read(1000), reader.read(4005)])
+        self.assertTrue(np.array_equal(tokens, np.array(text.split(), dtype=np.float64), equal_nan=True))
+
+        with self.assertRaises(ValueError):
+            AsciiTokenReader(io.BytesIO(b'1 2 x 4')).read(4)
+        with self.assertRaises(ValueError):
+            AsciiTokenReader(io.BytesIO(b'1 2')).read(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+from numba import njit, prange
+import numpy as np
+
+
+@njit(cache=True)
+def read_integer(buffer, position, size, is_signed, is_big_endian):
+    """Decode a binary integer.
+
+    Args:
+        buffer (numpy.array [m]): uint8 bytes.
+        position (int): Position of the first byte.
+        size (int): Number of bytes, 1, 2 or 4.
+        is_signed (bool): Whether the integer is two's complement.
+        is_big_endian (bool): Whether the most significant byte comes first.
+
+    Returns:
+        int: The integer.
+    """
+    value = 0
+    for i in range(size):
+        byte = buffer[position + i] if is_big_endian else buffer[position + size - 1 - i]
+        value = (value << 8) | byte
+    if is_signed and value >= 1 << (8 * size - 1):
+        value -= 1 << (8 * size)
+    return value
+
+
+@njit(cache=True)
+def scan_binary_rows(buffer, position, num_rows, sizes, count_sizes, count_signed, is_big_endian):
+    """Find where the properties of the binary rows of an element start, for elements with
+        variable length list properties.
+
+    Args:
+        buffer (numpy.array [m]): uint8 body.
+        position (int): Position of the first row.
+        num_rows (int): Number of rows.
+        sizes (numpy.array [p]): Size of each scalar property, or of the items of each list property.
+        count_sizes (numpy.array [p]): Size of the count of each list property, 0 for scalar properties.
+        count_signed (numpy.array [p]): Whether the count of each list property is signed.
+        is_big_endian (bool): Whether the body is big endian.
+
+    Returns:
+        numpy.array [num_rows, p]: Position of each scalar property, or of the first item of each list.
+        numpy.array [num_rows, p]: Number of items of each list property, 1 for scalar properties.
+        int: Position after the last row, or -1 if the body is truncated or has a negative count.
+    """
+    num_properties = len(sizes)
+    starts = np.empty((num_rows, num_properties), dtype=np.int64)
+    counts = np.ones((num_rows, num_properties), dtype=np.int64)
+    for i in range(num_rows):
+        for j in range(num_properties):
+            if count_sizes[j] > 0:
+                if position + count_sizes[j] > len(buffer):
+                    return starts, counts, -1
+                count = read_integer(buffer, position, count_sizes[j], count_signed[j], is_big_endian)
+                if count < 0:
+                    return starts, counts, -1
+                counts[i, j] = count
+                position += count_sizes[j]
+            starts[i, j] = position
+            position += counts[i, j] * sizes[j]
+    if position > len(buffer):
+        return starts, counts, -1
+    return starts, counts, position
+
+
+@njit(cache=True)
+def scan_token_rows(tokens, num_rows, is_list):
+    """Find where the properties of the ascii rows of an element start, for elements with
+        variable length list properties.
+
+    Args:
+        tokens (numpy.array [m]): Numbers of the body.
+        num_rows (int): Maximum number of rows to scan.
+        is_list (numpy.array [p]): Whether each property is a list.
+
+    Returns:
+        numpy.array [k, p]: Token of each scalar property, or of the first item of each list.
+        numpy.array [k, p]: Number of items of each list property, 1 for scalar properties.
+        int: Number k of rows complete in tokens, or -1 if a list count is not a non-negative integer.
+        int: Number of tokens of the complete rows.
+    """
+    num_properties = len(is_list)
+    starts = np.empty((num_rows, num_properties), dtype=np.int64)
+    counts = np.ones((num_rows, num_properties), dtype=np.int64)
+    position = 0
+    for i in range(num_rows):
+        row_start = position
+        for j in range(num_properties):
+            if is_list[j]:
+                if position >= len(tokens):
+                    return starts, counts, i, row_start
+                count = tokens[position]
+                if not (count >= 0 and count == np.floor(count)):
+                    return starts, counts, -1, row_start
+                counts[i, j] = int(count)
+                position += 1
+            starts[i, j] = position
+            position += counts[i, j]
+        if position > len(tokens):
+            return starts, counts, i, row_start
+    return starts, counts, num_rows, position
+
+
+@njit(parallel=True, cache=True)
+def gather_runs_kernel(source, starts, lengths, offsets, out):
+    """Copy runs of a source array one after the other.
+
+    Args:
+        source (numpy.array [m]): Source array.
+        starts (numpy.array [n]): Start of each run in the source.
+        lengths (numpy.array [n]): Length of each run.
+        offsets (numpy.array [n]): Start of each run in the output.
+        out (numpy.array [sum(lengths)]): Output array.
+    """
+    for i in prange(len(starts)):
+        out[offsets[i]:offsets[i] + lengths[i]] = source[starts[i]:starts[i] + lengths[i]]
+
+
+def gather_runs(source, starts, lengths):
+    """Concatenate runs of a source array.
+
+    Args:
+        source (numpy.array [m]): Source array.
+        starts (numpy.array [n]): Start of each run in the source.
+        lengths (numpy.array [n]): Length of each run.
+
+    Returns:
+        numpy.array [sum(lengths)]: The runs, one after the other.
+    """
+    starts = np.ascontiguousarray(starts, dtype=np.int64)
+    lengths = np.ascontiguousarray(lengths, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    out = np.empty(lengths.sum(), dtype=source.dtype)
+    gather_runs_kernel(source, starts, lengths, offsets, out)
+    return out
+
+
+@njit(parallel=True, cache=True)
+def triangulate_polygons_kernel(counts, polygon_offsets, indices, triangle_offsets, triangles):
+    """Split polygons into fans of triangles around their first vertex.
+
+    Args:
+        counts (numpy.array [n]): Number of vertices of each polygon.
+        polygon_offsets (numpy.array [n]): Position of the first vertex of each polygon in indices.
+        indices (numpy.array [m]): Vertex indices of the polygons, one after the other.
+        triangle_offsets (numpy.array [n]): First output triangle of each polygon.
+        triangles (numpy.array [t, 3]): Output triangles.
+    """
+    for i in prange(len(counts)):
+        first = polygon_offsets[i]
+        for k in range(counts[i] - 2):
+            triangles[triangle_offsets[i] + k, 0] = indices[first]
+            triangles[triangle_offsets[i] + k, 1] = indices[first + k + 1]
+            triangles[triangle_offsets[i] + k, 2] = indices[first + k + 2]
+
+
+def triangulate_polygons(counts, indices):
+    """Split polygons into fans of triangles. Polygons with less than 3 vertices are dropped.
+
+    Args:
+        counts (numpy.array [n]): Number of vertices of each polygon.
+        indices (numpy.array [sum(counts)]): Vertex indices of the polygons, one after the other.
+
+    Returns:
+        numpy.array [t, 3]: Vertex indices of the triangles.
+    """
+    counts = np.ascontiguousarray(counts, dtype=np.int64)
+    if np.all(counts == 3):
+        return indices.reshape(-1, 3)
+    num_triangles = np.maximum(counts - 2, 0)
+    triangle_offsets = np.cumsum(num_triangles) - num_triangles
+    triangles = np.empty((num_triangles.sum(), 3), dtype=indices.dtype)
+    triangulate_polygons_kernel(counts, np.cumsum(counts) - counts, indices, triangle_offsets, triangles)
+    return triangles
@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+from ply_lists import *
+
+
+class TestPlyLists(unittest.TestCase):
+    """Unit test ply_lists.py.
+    """
+
+    def test_scan_binary_rows(self):
+        """Test ply_lists.scan_binary_rows.
+        """
+        # rows of a uchar scalar and a list with a big endian short count and int items
+        rows = [(7, [1, 2, 3]), (8, []), (9, [4, 5])]
+        body = b''.join(bytes([flags]) + np.array([len(items)], dtype='>i2').tobytes()
+                        + np.array(items, dtype='>i4').tobytes() for flags, items in rows)
+        starts, counts, end = scan_binary_rows(np.frombuffer(body, dtype=np.uint8), 0, 3, np.array([1, 4]),
+                                               np.array([0, 2]), np.array([False, True]), True)
+        self.assertEqual(end, len(body))
+        self.assertTrue(np.array_equal(counts, [[1, 3], [1, 0], [1, 2]]))
+        items = gather_runs(np.frombuffer(body, dtype=np.uint8), starts[:, 1], counts[:, 1] * 4).view('>i4')
+        self.assertTrue(np.array_equal(items, [1, 2, 3, 4, 5]))
+
+        # a truncated body
+        _, _, end = scan_binary_rows(np.frombuffer(body[:-1], dtype=np.uint8), 0, 3, np.array([1, 4]),
+                                     np.array([0, 2]), np.array([False, True]), True)
+        self.assertEqual(end, -1)
+
+    def test_scan_token_rows(self):
+        """Test ply_lists.scan_token_rows.
+        """
+        tokens = np.array([3., 0., 1., 2., 4., 0., 1., 2., 3., 3., 5.])
+        starts, counts, num_complete, num_used = scan_token_rows(tokens, 3, np.array([True]))
+        # the last row is incomplete
+        self.assertEqual((num_complete, num_used), (2, 9))
+        self.assertTrue(np.array_equal(starts[:2, 0], [1, 5]))
+        self.assertTrue(np.array_equal(counts[:2, 0], [3, 4]))
+
+        _, _, num_complete, _ = scan_token_rows(np.array([1.5, 0.]), 1, np.array([True]))
+        self.assertEqual(num_complete, -1)
+
+    def test_triangulate_polygons(self):
+        """Test ply_lists.triangulate_polygons.
+        """
+        counts = np.array([3, 4, 2, 5])
+        indices = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13])
+        self.assertTrue(np.array_equal(triangulate_polygons(counts, indices),
+                                       [[0, 1, 2], [3, 4, 5], [3, 5, 6], [9, 10, 11], [9, 11, 12], [9, 12, 13]]))
+        self.assertTrue(np.array_equal(triangulate_polygons(np.array([3, 3]), np.arange(6)), [[0, 1, 2], [3, 4, 5]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from ply import *
+
+
+class TestPly(unittest.TestCase):
+    """Unit test ply.py.
+    """
+
+    def test_read(self):
+        """Test ply.Ply.read.
+        """
+        ply = Ply('data/triangle_sample.ply')
+        self.assertTrue(np.array_equal(ply.points, [[0., 0., 1.], [0., 1., 0.], [1., 0., 0.]]))
+        self.assertTrue(np.array_equal(ply.normals, [[1., 0., 0.]] * 3))
+        self.assertTrue(np.array_equal(ply.colors, [[0, 0, 155]] * 3))
+        self.assertTrue(np.array_equal(ply.triangles, [[2, 1, 0]]))
+
+        ply = Ply('data/point_sample.ply')
+        self.assertEqual(len(ply.points), 3)
+        self.assertIsNone(ply.triangles)
+
+    def test_write(self):
+        """Test ply.Ply.write round trips in every format, with and without optional attributes.
+        """
+        mesh = self._make_mesh()
+        point_cloud = Ply(points=mesh.points)
+        with tempfile.TemporaryDirectory() as path:
+            ply_path = os.path.join(path, 'mesh.ply')
+            for ply_format in PLY_FORMATS:
+                mesh.write(ply_path, ply_format)
+                ply = Ply(ply_path)
+                self.assertTrue(np.allclose(ply.points, mesh.points, atol=1e-6))
+                self.assertTrue(np.allclose(ply.normals, mesh.normals, atol=1e-6))
+                self.assertTrue(np.array_equal(ply.colors, mesh.colors))
+                self.assertTrue(np.array_equal(ply.triangles, mesh.triangles))
+
+                point_cloud.write(ply_path, ply_format)
+                ply = Ply(ply_path)
+                self.assertTrue(np.allclose(ply.points, mesh.points, atol=1e-6))
+                self.assertIsNone(ply.normals)
+                self.assertIsNone(ply.colors)
+                self.assertIsNone(ply.triangles)
+
+            # the binary body is exactly the packed vertex and face records
+            mesh.write(ply_path, 'binary_little_endian')
+            with open(ply_path, 'rb') as f:
+                header = f.read().split(b'end_header\n')[0] + b'end_header\n'
+            self.assertIn(b'format binary_little_endian 1.0\n', header)
+            self.assertIn(b'element face 4\n', header)
+            self.assertEqual(os.path.getsize(ply_path), len(header) + 10 * 27 + 4 * 13)
+
+            with self.assertRaises(ValueError):
+                mesh.write(ply_path, 'binary')
+
+            # ascii rows are formatted with %f and %d
+            Ply('data/triangle_sample.ply').write(ply_path)
+            with open(ply_path) as f:
+                body = f.read().split('end_header\n')[1]
+            self.assertEqual(body, '0.000000 0.000000 1.000000 1.000000 0.000000 0.000000 0 0 155\n'
+                                   '0.000000 1.000000 0.000000 1.000000 0.000000 0.000000 0 0 155\n'
+                                   '1.000000 0.000000 0.000000 1.000000 0.000000 0.000000 0 0 155\n'
+                                   '3 2 1 0\n')
+
+    def test_read_mmap(self):
+        """Test ply.Ply.read maps binary bodies without reading them.
+        """
+        mesh = self._make_mesh()
+        with tempfile.TemporaryDirectory() as path:
+            ply_path = os.path.join(path, 'mesh.ply')
+            for ply_format in ['binary_little_endian', 'binary_big_endian']:
+                mesh.write(ply_path, ply_format)
+                ply = Ply(ply_path, mmap_mode='r')
+                for attribute in [ply.points, ply.normals, ply.colors, ply.triangles]:
+                    self.assertIsInstance(attribute, np.memmap)
+                    self.assertFalse(attribute.flags.writeable)
+                self.assertTrue(np.allclose(ply.points, mesh.points, atol=1e-6))
+                self.assertTrue(np.array_equal(ply.colors, mesh.colors))
+                self.assertTrue(np.array_equal(ply.triangles[1:3], mesh.triangles[1:3]))
+                del ply
+
+            # ascii bodies are read into memory
+            mesh.write(ply_path)
+            ply = Ply(ply_path, mmap_mode='r')
+            self.assertNotIsInstance(ply.points, np.memmap)
+            self.assertTrue(np.array_equal(ply.triangles, mesh.triangles))
+
+            # the file size must match the header
+            mesh.write(ply_path, 'binary_little_endian')
+            with open(ply_path, 'ab') as f:
+                f.write(b'\0')
+            with self.assertRaises(ValueError):
+                Ply(ply_path, mmap_mode='r')
+
+    def test_read_layouts(self):
+        """Test ply.Ply.read decodes other property layouts, extra elements and polygons.
+        """
+        points = np.arange(15.).reshape(5, 3) / 7.
+        polygons = [[0, 1, 2], [0, 1, 2, 3], [0, 1, 2, 3, 4]]
+        header = ('ply\nformat {} 1.0\ncomment extra properties and elements\nelement vertex 5\n'
+                  'property double x\nproperty double y\nproperty double z\nproperty float confidence\n'
+                  'property float red\nproperty float green\nproperty float blue\nproperty float alpha\n'
+                  'element face 3\nproperty uchar flags\nproperty list uchar uint vertex_indices\n'
+                  'element edge 1\nproperty int vertex1\nproperty int vertex2\nend_header\n')
+        with tempfile.TemporaryDirectory() as path:
+            ply_path = os.path.join(path, 'layout.ply')
+            for ply_format, byte_order in PLY_FORMATS.items():
+                with open(ply_path, 'wb') as f:
+                    f.write(header.format(ply_format).encode('ascii'))
+                    for point in points:
+                        values = list(point) + [0.5, 0., 0.5, 1., 1.]
+                        if ply_format == 'ascii':
+                            f.write((' '.join(repr(float(value)) for value in values) + '\n').encode('ascii'))
+                        else:
+                            f.write(point.astype(byte_order + 'f8').tobytes())
+                            f.write(np.array(values[3:], dtype=byte_order + 'f4').tobytes())
+                    for polygon in polygons:
+                        if ply_format == 'ascii':
+                            f.write(('7 %d ' % len(polygon) + ' '.join(map(str, polygon)) + '\n').encode('ascii'))
+                        else:
+                            f.write(bytes([7, len(polygon)]) + np.array(polygon, dtype=byte_order + 'u4').tobytes())
+                    if ply_format == 'ascii':
+                        f.write(b'0 4\n')
+                    else:
+                        f.write(np.array([0, 4], dtype=byte_order + 'i4').tobytes())
+
+                for mmap_mode in [None, 'r']:
+                    ply = Ply(ply_path, mmap_mode=mmap_mode)
+                    self.assertTrue(np.array_equal(ply.points, points))
+                    self.assertIsNone(ply.normals)
+                    self.assertTrue(np.array_equal(ply.colors, [[0, 128, 255]] * 5))
+                    # polygons are split into triangle fans
+                    self.assertTrue(np.array_equal(ply.triangles, [[0, 1, 2], [0, 1, 2], [0, 2, 3],
+                                                                   [0, 1, 2], [0, 2, 3], [0, 3, 4]]))
+                    self.assertTrue(np.array_equal(ply.elements['vertex']['confidence'], [0.5] * 5))
+                    self.assertTrue(np.array_equal(ply.elements['face']['flags'], [7] * 3))
+                    self.assertEqual(ply.elements['edge']['vertex2'][0], 4)
+
+    def test_ply_writer(self):
+        """Test ply.PlyWriter writes the same mesh as Ply.write from chunks.
+        """
+        mesh = self._make_mesh()
+        with tempfile.TemporaryDirectory() as path:
+            ply_path = os.path.join(path, 'mesh.ply')
+            for ply_format in PLY_FORMATS:
+                with PlyWriter(ply_path, ply_format) as writer:
+                    # the second chunk repeats the mesh, with indices local to the chunk, and the
+                    # last triangles connect both chunks
+                    writer.write(mesh.points, mesh.triangles, mesh.normals, mesh.colors)
+                    writer.write(mesh.points[:0], None, mesh.normals[:0], mesh.colors[:0])
+                    writer.write(mesh.points, mesh.triangles, mesh.normals, mesh.colors)
+                    writer.write_triangles(np.array([[0, 10, 19]]))
+                    with self.assertRaises(ValueError):
+                        writer.write_triangles(np.array([[0, 10, 20]]))
+                self.assertEqual(os.listdir(path), ['mesh.ply'])
+                ply = Ply(ply_path)
+                self.assertTrue(np.allclose(ply.points, np.concatenate([mesh.points] * 2), atol=1e-6))
+                self.assertTrue(np.array_equal(ply.colors, np.concatenate([mesh.colors] * 2)))
+                self.assertTrue(np.array_equal(ply.triangles, np.concatenate(
+                    [mesh.triangles, mesh.triangles + 10, [[0, 10, 19]]])))
+
+            with PlyWriter(ply_path, 'binary_little_endian', has_normals=False, has_colors=False,
+                           has_triangles=False) as writer:
+                writer.write(mesh.points)
+                with self.assertRaises(ValueError):
+                    writer.write(mesh.points, normals=mesh.normals)
+                with self.assertRaises(ValueError):
+                    writer.write(mesh.points, mesh.triangles)
+            ply = Ply(ply_path)
+            self.assertEqual(len(ply.points), 10)
+            self.assertIsNone(ply.triangles)
+
+            # a failed write does not leave a partial ply
+            with self.assertRaises(ValueError):
+                with PlyWriter(ply_path) as writer:
+                    writer.write(mesh.points, mesh.triangles + 5, mesh.normals, mesh.colors)
+            self.assertEqual(os.listdir(path), [])
+
+    def _make_mesh(self):
+        """Make a small random mesh.
+
+        Returns:
+            Ply: The mesh.
+        """
+        rng = np.random.default_rng(0)
+        return Ply(triangles=rng.integers(0, 10, (4, 3)), points=rng.random((10, 3)),
+                   normals=rng.random((10, 3)), colors=rng.integers(0, 256, (10, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import resource
+import sys
+
+
+def get_resident_bytes():
+    """Get the resident set size of this process.
+
+    Returns:
+        int: Resident bytes, or None if /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+
+def get_peak_resident_bytes():
+    """Get the peak resident set size of this process.
+
+    Returns:
+        int: Peak resident bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _read_cgroup_value(path):
+    """Read a byte count from a cgroup file, None if it is missing or unlimited.
+    """
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    if not value.isdigit():
+        return None
+    # cgroup v1 reports no limit as a huge page-aligned number
+    value = int(value)
+    return value if value < 1 << 62 else None
+
+
+def get_available_bytes():
+    """Get the memory this process can still allocate: the available system memory,
+        further limited by the memory limit of the container (cgroup v2 or v1).
+
+    Returns:
+        int: Available bytes, or None if they cannot be determined on this platform.
+    """
+    available = None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+
+    for limit_path, usage_path in [('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+                                   ('/sys/fs/cgroup/memory/memory.limit_in_bytes',
+                                    '/sys/fs/cgroup/memory/memory.usage_in_bytes')]:
+        limit = _read_cgroup_value(limit_path)
+        usage = _read_cgroup_value(usage_path)
+        if limit is not None and usage is not None:
+            container_available = max(0, limit - usage)
+            available = container_available if available is None else min(available, container_available)
+            break
+    return available
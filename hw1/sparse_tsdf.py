@@ -0,0 +1,653 @@
+from collections import namedtuple
+import itertools
+import os
+
+from tsdf import *
+
+# raycast storage of a sparse volume: the hash table and the block pool, see DenseVoxels
+SparseVoxels = namedtuple('SparseVoxels', ['hash_keys', 'hash_slots', 'tsdf', 'weight', 'color'])
+
+
+@njit(cache=True)
+def _hash_block(bx, by, bz, mask):
+    """Spatial hash of a block coordinate (Teschner et al. 2003).
+    """
+    return ((np.int64(bx) * 73856093) ^ (np.int64(by) * 19349669) ^ (np.int64(bz) * 83492791)) & mask
+
+
+@njit(cache=True)
+def hash_find(table_keys, table_slots, bx, by, bz):
+    """Find the storage slot of a block coordinate in an open addressing hash table.
+
+    Args:
+        table_keys (numpy.array [t, 3]): Block coordinate stored in each table entry.
+        table_slots (numpy.array [t, ]): Storage slot of each table entry, -1 if empty.
+            t must be a power of two.
+        bx (int): x block coordinate.
+        by (int): y block coordinate.
+        bz (int): z block coordinate.
+
+    Returns:
+        int: Storage slot of the block, -1 if it is not allocated.
+    """
+    mask = table_slots.shape[0] - 1
+    h = _hash_block(bx, by, bz, mask)
+    while table_slots[h] != -1:
+        if table_keys[h, 0] == bx and table_keys[h, 1] == by and table_keys[h, 2] == bz:
+            return table_slots[h]
+        h = (h + 1) & mask
+    return -1
+
+
+@njit(cache=True)
+def hash_lookup(table_keys, table_slots, block_coords):
+    """Find the storage slots of block coordinates in an open addressing hash table.
+
+    Args:
+        table_keys (numpy.array [t, 3]): Block coordinate stored in each table entry.
+        table_slots (numpy.array [t, ]): Storage slot of each table entry, -1 if empty.
+            t must be a power of two.
+        block_coords (numpy.array [n, 3]): Block coordinates to look up.
+
+    Returns:
+        numpy.array [n, ]: Storage slot of each block, -1 if it is not allocated.
+    """
+    slots = np.empty(block_coords.shape[0], dtype=np.int32)
+    for i in range(block_coords.shape[0]):
+        slots[i] = hash_find(table_keys, table_slots, block_coords[i, 0], block_coords[i, 1], block_coords[i, 2])
+    return slots
+
+
+@njit(cache=True)
+def hash_insert(table_keys, table_slots, block_coords, num_blocks):
+    """Look up block coordinates, assigning the next free storage slot to new ones.
+
+    Args:
+        table_keys (numpy.array [t, 3]): Block coordinate stored in each table entry.
+        table_slots (numpy.array [t, ]): Storage slot of each table entry, -1 if empty.
+            t must be a power of two with room for every new block.
+        block_coords (numpy.array [n, 3]): Block coordinates to look up or insert.
+        num_blocks (int): Number of storage slots already in use.
+
+    Returns:
+        numpy.array [n, ]: Storage slot of each block.
+        int: Number of storage slots in use after the insertion.
+    """
+    mask = table_slots.shape[0] - 1
+    slots = np.empty(block_coords.shape[0], dtype=np.int32)
+    for i in range(block_coords.shape[0]):
+        bx, by, bz = block_coords[i, 0], block_coords[i, 1], block_coords[i, 2]
+        h = _hash_block(bx, by, bz, mask)
+        while True:
+            if table_slots[h] == -1:
+                table_keys[h, 0] = bx
+                table_keys[h, 1] = by
+                table_keys[h, 2] = bz
+                table_slots[h] = num_blocks
+                slots[i] = num_blocks
+                num_blocks += 1
+                break
+            if table_keys[h, 0] == bx and table_keys[h, 1] == by and table_keys[h, 2] == bz:
+                slots[i] = table_slots[h]
+                break
+            h = (h + 1) & mask
+    return slots, num_blocks
+
+
+@overload(load_block, inline='always')
+def _load_sparse_block(voxels, i, j, k):
+    if is_voxels_type(voxels, SparseVoxels):
+        def impl(voxels, i, j, k):
+            s = voxels.tsdf.shape[1]
+            slot = hash_find(voxels.hash_keys, voxels.hash_slots, i // s, j // s, k // s)
+            found = slot >= 0
+            slot = max(slot, 0)
+            return found, voxels.tsdf[slot], voxels.weight[slot], voxels.color[slot], i % s, j % s, k % s
+        return impl
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def integrate_blocks_kernel(block_coords, slots, voxel_bounds, tsdf_blocks, weight_blocks, color_blocks,
+                            camera_origin, camera_steps, camera_intrinsics, depth_image, color_image,
+                            truncation_margin, observation_weight, color_policy, color_alpha):
+    """Fuse an RGB-D observation into allocated voxel blocks in a single pass.
+        Camera coordinates are swept along each row of voxels with additions only.
+
+    Args:
+        block_coords (numpy.array [c, 3]): Block coordinate of each storage slot.
+        slots (numpy.array [b, ]): Storage slots of the blocks to update.
+        voxel_bounds (numpy.array [3, ]): Dimensions of the voxel grid; voxels of
+            edge blocks outside the grid are skipped.
+        tsdf_blocks (numpy.array [c, s, s, s]): The tsdf block pool.
+        weight_blocks (numpy.array [c, s, s, s]): The weight block pool.
+        color_blocks (numpy.array [c, s, s, s, 3]): The color block pool in RGB.
+        camera_origin (numpy.array [3, ]): Camera coordinates of voxel (0, 0, 0).
+        camera_steps (numpy.array [3, 3]): Row a is the change in camera coordinates
+            per voxel step along voxel axis a.
+        camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+        depth_image (numpy.array [h, w]): A z depth image.
+        color_image (numpy.array [h, w, 3]): An rgb image.
+        truncation_margin (float): Truncation on the SDF in meters.
+        observation_weight (float): The weight to assign for the current observation.
+        color_policy (int): Color blending policy, a value of COLOR_POLICIES.
+        color_alpha (float): Weight of the observation in the exponential moving average of colors.
+
+    Returns:
+        int: Number of voxels updated.
+    """
+    block_size = tsdf_blocks.shape[1]
+    tsdf_flat = tsdf_blocks.reshape(-1)
+    weight_flat = weight_blocks.reshape(-1)
+    color_flat = color_blocks.reshape((-1, 3))
+    step_x, step_y, step_z = camera_steps[0], camera_steps[1], camera_steps[2]
+
+    num_updated = 0
+    for n in prange(slots.shape[0]):
+        b = slots[n]
+        i_start = block_coords[b, 0] * block_size
+        j_start = block_coords[b, 1] * block_size
+        k_start = block_coords[b, 2] * block_size
+        i_count = min(block_size, voxel_bounds[0] - i_start)
+        j_count = min(block_size, voxel_bounds[1] - j_start)
+        k_count = min(block_size, voxel_bounds[2] - k_start)
+        for bi in range(i_count):
+            i = i_start + bi
+            for bj in range(j_count):
+                j = j_start + bj
+                camera_x = camera_origin[0] + i * step_x[0] + j * step_y[0] + k_start * step_z[0]
+                camera_y = camera_origin[1] + i * step_x[1] + j * step_y[1] + k_start * step_z[1]
+                camera_z = camera_origin[2] + i * step_x[2] + j * step_y[2] + k_start * step_z[2]
+                index = ((b * block_size + bi) * block_size + bj) * block_size
+                for bk in range(k_count):
+                    if integrate_voxel(index + bk, camera_x, camera_y, camera_z,
+                                       tsdf_flat, weight_flat, color_flat, depth_image, color_image,
+                                       camera_intrinsics, truncation_margin, observation_weight,
+                                       color_policy, color_alpha):
+                        num_updated += 1
+                    camera_x += step_z[0]
+                    camera_y += step_z[1]
+                    camera_z += step_z[2]
+    return num_updated
+
+
+class SparseTSDFVolume(TSDFVolume):
+    """Volumetric TSDF Fusion of RGB-D Images on a sparse voxel-hashing backend.
+
+    Voxels are stored in fixed-size blocks that are only allocated where depth
+    observations land, so memory scales with the observed surface area instead
+    of the volume bounds. A spatial hash maps block coordinates to storage slots.
+    """
+
+    def __init__(self, volume_bounds, voxel_size, fused=True, block_size=8,
+                 tsdf_dtype=np.float32, weight_dtype=np.float32, color_dtype=np.float32,
+                 initial_capacity=1024, color_policy='mean', color_alpha=0.2):
+        """Initialize sparse tsdf volume instance variables.
+
+        Args:
+            volume_bounds (numpy.array [3, 2]): rows index [x, y, z] and cols index [min_bound, max_bound].
+                Note: units are in meters.
+            voxel_size (float): The side length of each voxel in meters.
+            fused (bool, optional): Integrate with the single-pass numba kernel. If False,
+                use the step-by-step numpy pipeline. Defaults to True.
+            block_size (int, optional): The side length of each voxel block in voxels. Defaults to 8.
+            tsdf_dtype (numpy.dtype, optional): Storage type of the tsdf: float32, float16,
+                or int16 fixed point. Defaults to float32.
+            weight_dtype (numpy.dtype, optional): Storage type of the weights: float32, or
+                uint8 or uint16 saturating at their maximum. Defaults to float32.
+            color_dtype (numpy.dtype, optional): Storage type of the colors: float32 or uint8.
+                Defaults to float32.
+            initial_capacity (int, optional): Number of blocks to reserve storage for.
+                Storage grows as needed. Defaults to 1024.
+            color_policy (str, optional): How observed colors are blended into voxels:
+                'mean', 'max_weight' or 'ema', see TSDFVolume. Defaults to 'mean'.
+            color_alpha (float, optional): Weight of each observation in the exponential
+                moving average, in (0, 1]. Defaults to 0.2.
+
+        Raises:
+            ValueError: If volume bounds are not the correct shape.
+            ValueError: If voxel size is not positive.
+            ValueError: If block size or initial capacity is not positive.
+            ValueError: If a storage type is not supported.
+            ValueError: If the color policy or alpha is not supported.
+        """
+        if initial_capacity <= 0:
+            raise ValueError('initial capacity must be positive.')
+
+        self._initial_capacity = int(initial_capacity)
+        super().__init__(volume_bounds, voxel_size, fused=fused, block_size=block_size,
+                         tsdf_dtype=tsdf_dtype, weight_dtype=weight_dtype, color_dtype=color_dtype,
+                         color_policy=color_policy, color_alpha=color_alpha)
+
+    def _allocate_volumes(self):
+        """Allocate the empty block pool and hash table.
+        """
+        self._num_blocks = 0
+        (self._block_coords, self._tsdf_blocks,
+         self._weight_blocks, self._color_blocks) = self._new_block_pool(self._initial_capacity)
+
+        # slots updated since their mesh was last extracted, and the cached block meshes
+        self._dirty_slots = np.zeros(self._initial_capacity, dtype=bool)
+        self._block_meshes = {}
+
+        # keep the hash table at most half full
+        table_size = 1 << int(np.ceil(np.log2(2 * self._initial_capacity)))
+        self._hash_keys = np.zeros((table_size, 3), dtype=np.int32)
+        self._hash_slots = np.full(table_size, -1, dtype=np.int32)
+
+        # voxel offsets inside a block, in the same order as the flattened block storage
+        self._block_voxel_offsets = np.stack(np.meshgrid(
+            range(self._block_size),
+            range(self._block_size),
+            range(self._block_size),
+            indexing='ij'), axis=-1).reshape(-1, 3)
+
+    @property
+    def num_blocks(self):
+        """int: Number of allocated voxel blocks."""
+        return self._num_blocks
+
+    def _new_block_pool(self, capacity):
+        """Allocate empty block storage.
+
+        Args:
+            capacity (int): Number of blocks.
+
+        Returns:
+            numpy.array [c, 3]: Block coordinate of each storage slot.
+            numpy.array [c, s, s, s]: The tsdf block pool.
+            numpy.array [c, s, s, s]: The weight block pool.
+            numpy.array [c, s, s, s, 3]: The color block pool in RGB.
+        """
+        block_shape = (capacity,) + (self._block_size,) * 3
+        self._check_available_memory(capacity * (self._block_size ** 3 * get_voxel_bytes(
+            self._tsdf_dtype, self._weight_dtype, self._color_dtype) + 3 * 4))
+        return (np.zeros((capacity, 3), dtype=np.int32),
+                np.full(block_shape, encode_tsdf(1., self._tsdf_dtype), dtype=self._tsdf_dtype),
+                np.zeros(block_shape, dtype=self._weight_dtype),
+                np.zeros(block_shape + (3,), dtype=self._color_dtype))
+
+    def _get_storage_bytes(self):
+        """Get the bytes of the block pool, including its unused capacity, and of the hash table.
+
+        Returns:
+            dict: Bytes of each storage array by name.
+        """
+        return {name: int(array.nbytes) for name, array in [
+            ('block_coords', self._block_coords), ('tsdf', self._tsdf_blocks),
+            ('weight', self._weight_blocks), ('color', self._color_blocks),
+            ('dirty_slots', self._dirty_slots), ('hash_keys', self._hash_keys),
+            ('hash_slots', self._hash_slots)]}
+
+    def _reserve(self, num_blocks):
+        """Grow the block pool and hash table to hold at least num_blocks blocks.
+
+        Args:
+            num_blocks (int): Number of blocks that must fit.
+        """
+        capacity = len(self._block_coords)
+        if num_blocks > capacity:
+            while capacity < num_blocks:
+                capacity *= 2
+            block_coords, tsdf_blocks, weight_blocks, color_blocks = self._new_block_pool(capacity)
+
+            n = self._num_blocks
+            block_coords[:n] = self._block_coords[:n]
+            tsdf_blocks[:n] = self._tsdf_blocks[:n]
+            weight_blocks[:n] = self._weight_blocks[:n]
+            color_blocks[:n] = self._color_blocks[:n]
+
+            self._block_coords = block_coords
+            self._tsdf_blocks = tsdf_blocks
+            self._weight_blocks = weight_blocks
+            self._color_blocks = color_blocks
+            dirty_slots = np.zeros(capacity, dtype=bool)
+            dirty_slots[:n] = self._dirty_slots[:n]
+            self._dirty_slots = dirty_slots
+
+        table_size = len(self._hash_slots)
+        if 2 * num_blocks > table_size:
+            while 2 * num_blocks > table_size:
+                table_size *= 2
+            self._hash_keys = np.zeros((table_size, 3), dtype=np.int32)
+            self._hash_slots = np.full(table_size, -1, dtype=np.int32)
+            hash_insert(self._hash_keys, self._hash_slots, self._block_coords[:self._num_blocks], 0)
+
+    def _get_metadata(self):
+        """Get the description of the volume that save writes to meta.json.
+
+        Returns:
+            dict: Volume type, grid geometry, storage types and block count.
+        """
+        meta = super()._get_metadata()
+        meta['num_blocks'] = self._num_blocks
+        meta['initial_capacity'] = self._initial_capacity
+        return meta
+
+    def _save_volumes(self, path):
+        """Save the allocated blocks to .npy files in a directory.
+        """
+        n = self._num_blocks
+        save_voxel_array(os.path.join(path, 'block_coords.npy'), self._block_coords[:n])
+        save_voxel_array(os.path.join(path, 'tsdf.npy'), self._tsdf_blocks[:n])
+        save_voxel_array(os.path.join(path, 'weight.npy'), self._weight_blocks[:n])
+        save_voxel_array(os.path.join(path, 'color.npy'), self._color_blocks[:n])
+
+    def _load_volumes(self, path, meta, mmap_mode):
+        """Map the blocks saved by _save_volumes and rebuild the hash table.
+            The block pool stays mapped until new blocks have to be allocated,
+            which copies it into memory.
+        """
+        self._initial_capacity = meta['initial_capacity']
+        self._allocate_volumes()
+        num_blocks = meta['num_blocks']
+        if num_blocks == 0:
+            return
+
+        self._block_coords = load_voxel_array(os.path.join(path, 'block_coords.npy'), mmap_mode)
+        self._tsdf_blocks = load_voxel_array(os.path.join(path, 'tsdf.npy'), mmap_mode)
+        self._weight_blocks = load_voxel_array(os.path.join(path, 'weight.npy'), mmap_mode)
+        self._color_blocks = load_voxel_array(os.path.join(path, 'color.npy'), mmap_mode)
+        if self._tsdf_blocks.shape != (num_blocks,) + (self._block_size,) * 3:
+            raise ValueError('{} does not match the block count in meta.json.'.format(path))
+
+        self._dirty_slots = np.ones(num_blocks, dtype=bool)
+        self._reserve(num_blocks)
+        self._num_blocks = num_blocks
+        hash_insert(self._hash_keys, self._hash_slots, self._block_coords, 0)
+
+    def allocate_blocks(self, block_coords):
+        """Allocate storage for voxel blocks that do not exist yet.
+
+        Args:
+            block_coords (numpy.array [n, 3]): Unique block coordinates inside the volume bounds.
+
+        Returns:
+            numpy.array [n, ]: Storage slot of each block.
+        """
+        block_coords = np.ascontiguousarray(block_coords, dtype=np.int32)
+        self._reserve(self._num_blocks + len(block_coords))
+        slots, num_blocks = hash_insert(self._hash_keys, self._hash_slots, block_coords, self._num_blocks)
+        self._block_coords[slots] = block_coords
+        self._num_blocks = num_blocks
+        return slots
+
+    def _merge_storage(self, other):
+        """Merge the blocks of a sparse volume with the same grid into this one,
+            allocating the blocks that do not exist yet.
+        """
+        if not isinstance(other, SparseTSDFVolume) or other._block_size != self._block_size:
+            raise ValueError('sparse volumes can only merge sparse volumes with the same block size.')
+
+        n = other._num_blocks
+        slots = self.allocate_blocks(other._block_coords[:n])
+        capacity = len(self._block_coords)
+        self.merge_kernel(
+            kernel_view(self._tsdf_blocks).reshape(capacity, -1),
+            self._weight_blocks.reshape(capacity, -1),
+            self._color_blocks.reshape(capacity, -1, 3),
+            kernel_view(other._tsdf_blocks[:n]).reshape(n, -1),
+            other._weight_blocks[:n].reshape(n, -1),
+            other._color_blocks[:n].reshape(n, -1, 3),
+            slots, self._color_policy, self._color_alpha)
+        self._dirty_slots[slots] = True
+
+    def get_observed_blocks(self, depth_image, camera_intrinsics, camera_pose):
+        """Find the voxel blocks within the truncation band of the observed surface.
+
+        Args:
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+
+        Returns:
+            numpy.array [n, 3]: Unique coordinates of the blocks inside the volume bounds.
+        """
+        u0 = camera_intrinsics[0, 2]
+        v0 = camera_intrinsics[1, 2]
+        fu = camera_intrinsics[0, 0]
+        fv = camera_intrinsics[1, 1]
+
+        # sample each observed ray across the truncation band, finely enough not to skip a block
+        v, u = np.nonzero(depth_image > 0)
+        band = np.arange(-self._truncation_margin, self._truncation_margin + 1e-6, self._voxel_size / 2)
+        z = depth_image[v, u][:, None] + band[None, :]
+        x = (u[:, None] - u0) / fu * z
+        y = (v[:, None] - v0) / fv * z
+        in_front = z > 0
+        camera_points = np.stack([x[in_front], y[in_front], z[in_front]], axis=1)
+
+        world_points = transform_point3s(camera_pose, camera_points)
+        voxels = np.round((world_points - self._volume_origin) / self._voxel_size).astype(np.int64)
+        in_bounds = np.logical_and(voxels >= 0, voxels < self._voxel_bounds).all(axis=1)
+        blocks = voxels[in_bounds] // self._block_size
+
+        # unique on a linear key is much faster than a row-wise unique
+        keys = np.unique(np.ravel_multi_index(blocks.T, self._block_bounds))
+        return np.stack(np.unravel_index(keys, self._block_bounds), axis=1)
+
+    def get_slot_voxels(self, slots):
+        """Get the voxels stored in a set of blocks.
+
+        Args:
+            slots (numpy.array [b, ]): Storage slots of the blocks.
+
+        Returns:
+            numpy.array [n, 3]: Voxel grid coordinates of each voxel inside the volume bounds.
+            numpy.array [n, ]: Index of each voxel into the flattened block storage.
+        """
+        block_voxels = self._block_size ** 3
+        voxel_coords = (self._block_coords[slots, None, :] * self._block_size
+                        + self._block_voxel_offsets[None, :, :]).reshape(-1, 3)
+        voxel_index = (slots[:, None].astype(np.int64) * block_voxels
+                       + np.arange(block_voxels)[None, :]).reshape(-1)
+
+        # blocks on the far edges of the volume may stick out of the volume bounds
+        in_bounds = (voxel_coords < self._voxel_bounds).all(axis=1)
+        return voxel_coords[in_bounds], voxel_index[in_bounds]
+
+    def get_visible_slots(self, depth_image, camera_intrinsics, camera_pose):
+        """Find the allocated blocks inside the camera frustum of an observation.
+
+        Args:
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+
+        Returns:
+            numpy.array [b, ]: Storage slots of the blocks inside the frustum.
+        """
+        world_planes, _ = self.get_frustum_planes(depth_image, camera_intrinsics, camera_pose)
+        if world_planes is None:
+            return np.zeros(0, dtype=np.int32)
+        return self.get_frustum_slots(world_planes)
+
+    def get_frustum_slots(self, world_planes):
+        """Find the allocated blocks inside a frustum.
+
+        Args:
+            world_planes (numpy.array [p, 4]): Frustum planes in world coordinates.
+
+        Returns:
+            numpy.array [b, ]: Storage slots of the blocks inside the frustum.
+        """
+        slots = np.arange(self._num_blocks, dtype=np.int32)
+        return slots[self.blocks_in_frustum(world_planes, self._block_coords[:self._num_blocks])]
+
+    def integrate(self, color_image, depth_image, camera_intrinsics, camera_pose, observation_weight=1.):
+        """Integrate an RGB-D observation into the TSDF volume, allocating the blocks
+            around the observed surface first.
+
+        Args:
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4] or SE3): SE3 transform representing pose (camera to world)
+            observation_weight (float, optional):  The weight to assign for the current
+                observation. Defaults to 1.
+        """
+        # validate the pose once; the stages below use it and its cached inverse as is
+        camera_pose = to_se3(camera_pose)
+        with self._time_frame():
+            with self._time_stage('allocation'):
+                self.allocate_blocks(self.get_observed_blocks(depth_image, camera_intrinsics, camera_pose))
+            with self._time_stage('culling'):
+                slots = self.get_visible_slots(depth_image, camera_intrinsics, camera_pose)
+            self._dirty_slots[slots] = True
+
+            if self._fused:
+                camera_origin, camera_steps = self.get_camera_steps(camera_pose)
+                with self._time_stage('fused_kernel'):
+                    num_updated = integrate_blocks_kernel(
+                        self._block_coords, slots, self._voxel_bounds,
+                        kernel_view(self._tsdf_blocks), self._weight_blocks, self._color_blocks,
+                        camera_origin, camera_steps, camera_intrinsics, depth_image, color_image,
+                        self._truncation_margin, observation_weight, self._color_policy, self._color_alpha)
+                self._count_block_voxels(self._block_coords[slots], num_updated)
+                return
+
+            voxel_coords, voxel_index = self.get_slot_voxels(slots)
+            self._integrate_voxels(
+                voxel_coords,
+                voxel_index,
+                self._tsdf_blocks.reshape(-1),
+                self._weight_blocks.reshape(-1),
+                self._color_blocks.reshape(-1, 3),
+                color_image, depth_image, camera_intrinsics, camera_pose, observation_weight)
+
+    def get_volume(self):
+        """Get the tsdf and color volumes as dense grids over the volume bounds.
+            Voxels outside allocated blocks hold the initial values.
+
+        Returns:
+            numpy.array [l, w, h]: l, w, h are the dimensions of the voxel grid in voxel space.
+                Each entry contains the integrated tsdf value.
+            numpy.array [l, w, h, 3]: l, w, h are the dimensions of the voxel grid in voxel space.
+                3 is the channel number in the order r, g, then b.
+        """
+        tsdf_volume, _, color_volume = self._get_dense_storage()
+        return tsdf_volume, color_volume
+
+    def _get_dense_storage(self):
+        """Scatter the allocated blocks into dense float32 grids over the volume bounds.
+
+        Returns:
+            numpy.array [l, w, h]: The decoded tsdf volume.
+            numpy.array [l, w, h]: The weight volume.
+            numpy.array [l, w, h, 3]: The color volume in RGB.
+        """
+        tsdf_volume = np.ones(self._voxel_bounds, dtype=np.float32)
+        weight_volume = np.zeros(self._voxel_bounds, dtype=np.float32)
+        color_volume = np.zeros(np.append(self._voxel_bounds, 3), dtype=np.float32)
+
+        voxel_coords, voxel_index = self.get_slot_voxels(np.arange(self._num_blocks))
+        x, y, z = voxel_coords.T
+        tsdf_volume[x, y, z] = decode_tsdf(self._tsdf_blocks.reshape(-1)[voxel_index])
+        weight_volume[x, y, z] = self._weight_blocks.reshape(-1)[voxel_index]
+        color_volume[x, y, z] = self._color_blocks.reshape(-1, 3)[voxel_index]
+        return tsdf_volume, weight_volume, color_volume
+
+    def _get_raycast_voxels(self, world_planes, world_bounds):
+        """Get the hash table and block pool for the raycast kernel, and the box of the
+            allocated blocks in a frustum.
+
+        Args:
+            world_planes (numpy.array [p, 4]): Frustum planes in world coordinates.
+            world_bounds (numpy.array [3, 2]): World space bounding box of the frustum.
+
+        Yields:
+            SparseVoxels: The raycast storage. Nothing is yielded if no allocated block is
+                in the frustum.
+            numpy.array [3, 2]: Box of the blocks in the frustum, see get_voxel_box.
+        """
+        slots = self.get_frustum_slots(world_planes)
+        if len(slots) == 0:
+            return
+        voxels = SparseVoxels(self._hash_keys, self._hash_slots, kernel_view(self._tsdf_blocks),
+                              self._weight_blocks, self._color_blocks)
+        yield voxels, self.get_voxel_box(self._block_coords[slots])
+
+    def get_padded_blocks(self, slots):
+        """Gather blocks together with the first voxel layer of their +x, +y and +z neighbors.
+
+        Args:
+            slots (numpy.array [b, ]): Storage slots of the blocks.
+
+        Returns:
+            numpy.array [b, s + 1, s + 1, s + 1]: Padded tsdf values of each block.
+            numpy.array [b, s + 1, s + 1, s + 1, 3]: Padded colors of each block.
+        """
+        s = self._block_size
+        tsdf_blocks = np.ones((len(slots), s + 1, s + 1, s + 1), dtype=np.float32)
+        color_blocks = np.zeros((len(slots), s + 1, s + 1, s + 1, 3), dtype=np.float32)
+        block_coords = self._block_coords[slots]
+
+        for offset in itertools.product((0, 1), repeat=3):
+            neighbor_slots = hash_lookup(self._hash_keys, self._hash_slots, block_coords + np.array(offset))
+            found = np.nonzero(neighbor_slots >= 0)[0]
+            target = tuple(slice(s, s + 1) if o else slice(0, s) for o in offset)
+            source = tuple(slice(0, 1) if o else slice(0, s) for o in offset)
+            tsdf_blocks[(found,) + target] = decode_tsdf(self._tsdf_blocks[(neighbor_slots[found],) + source])
+            color_blocks[(found,) + target] = self._color_blocks[(neighbor_slots[found],) + source]
+        return tsdf_blocks, color_blocks
+
+    def get_dirty_slots(self):
+        """Get the allocated blocks whose meshes are out of date. Besides the updated blocks,
+            these include the blocks whose meshes reach into an updated neighbor.
+
+        Returns:
+            numpy.array [b, ]: Storage slots of the blocks to re-mesh.
+        """
+        dirty = self._dirty_slots[:self._num_blocks].copy()
+        updated_coords = self._block_coords[np.nonzero(dirty)[0]]
+        for offset in itertools.product((0, 1), repeat=3):
+            neighbor_slots = hash_lookup(self._hash_keys, self._hash_slots, updated_coords - np.array(offset))
+            dirty[neighbor_slots[neighbor_slots >= 0]] = True
+        return np.nonzero(dirty)[0]
+
+    def update_block_meshes(self, batch_size=4096):
+        """ Re-mesh the dirty blocks and update the block mesh cache, keyed by storage slot.
+
+        Args:
+            batch_size (int, optional): Number of blocks gathered at a time. Defaults to 4096.
+        """
+        dirty_slots = self.get_dirty_slots()
+        for start in range(0, len(dirty_slots), batch_size):
+            slots = dirty_slots[start:start + batch_size]
+            tsdf_blocks, color_blocks = self.get_padded_blocks(slots)
+            meshes = marching_cubes_blocks(
+                tsdf_blocks, color_blocks, self._block_coords[slots] * self._block_size)
+            for slot, mesh in zip(slots.tolist(), meshes):
+                if mesh is None:
+                    self._block_meshes.pop(slot, None)
+                else:
+                    self._block_meshes[slot] = mesh
+        self._dirty_slots[:] = False
+
+    def _get_mesh_block_coords(self, keys):
+        """Get the voxel block coordinates of the storage slots the block meshes are cached by.
+        """
+        return self._block_coords[np.array(keys, dtype=np.int64)]
+
+    def get_mesh(self, incremental=False, batch_size=4096):
+        """ Run marching cubes block by block over the allocated blocks to get a mesh representation.
+
+        Args:
+            incremental (bool, optional): Re-mesh only the blocks updated since the last
+                extraction, reusing cached meshes of the other blocks. Defaults to False.
+            batch_size (int, optional): Number of blocks gathered at a time. Defaults to 4096.
+
+        Returns:
+            numpy.array [n, 3]: each row represents a 3D point.
+            numpy.array [k, 3]: each row is a list of point indices used to render triangles.
+            numpy.array [n, 3]: each row represents the normal vector for the corresponding 3D point.
+            numpy.array [n, 3]: each row represents the color of the corresponding 3D point.
+        """
+        if not incremental:
+            self._block_meshes = {}
+            self._dirty_slots[:self._num_blocks] = True
+        self.update_block_meshes(batch_size)
+
+        voxel_points, triangles, normals, colors = weld_meshes(list(self._block_meshes.values()))
+        points = self.voxel_to_world(self._volume_origin, voxel_points, self._voxel_size)
+        colors = np.floor(colors).astype(np.uint8)
+        return points, triangles, normals, colors
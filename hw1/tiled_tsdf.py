@@ -0,0 +1,567 @@
+from collections import OrderedDict
+import glob
+import itertools
+import shutil
+import tempfile
+
+from sparse_tsdf import SparseVoxels, hash_insert
+from tsdf import *
+
+
+class TiledTSDFVolume(TSDFVolume):
+    """Volumetric TSDF Fusion of RGB-D Images on an out-of-core tiled backend.
+
+    The voxel grid is split into cubic tiles that are allocated when an observation
+    first reaches them. At most max_tiles tiles are kept in memory; the least
+    recently used ones are evicted to a directory of .npy files and paged back
+    in when a frustum or a mesh extraction touches them again.
+    """
+
+    def __init__(self, volume_bounds, voxel_size, fused=True, block_size=8,
+                 tsdf_dtype=np.float32, weight_dtype=np.float32, color_dtype=np.float32,
+                 tile_size=64, max_tiles=64, store_path=None, color_policy='mean', color_alpha=0.2):
+        """Initialize tiled tsdf volume instance variables.
+
+        Args:
+            volume_bounds (numpy.array [3, 2]): rows index [x, y, z] and cols index [min_bound, max_bound].
+                Note: units are in meters.
+            voxel_size (float): The side length of each voxel in meters.
+            fused (bool, optional): Integrate with the single-pass numba kernel. If False,
+                use the step-by-step numpy pipeline. Defaults to True.
+            block_size (int, optional): The side length in voxels of the blocks that are
+                culled against the camera frustum together. Defaults to 8.
+            tsdf_dtype (numpy.dtype, optional): Storage type of the tsdf: float32, float16,
+                or int16 fixed point. Defaults to float32.
+            weight_dtype (numpy.dtype, optional): Storage type of the weights: float32, or
+                uint8 or uint16 saturating at their maximum. Defaults to float32.
+            color_dtype (numpy.dtype, optional): Storage type of the colors: float32 or uint8.
+                Defaults to float32.
+            tile_size (int, optional): The side length of each tile in voxels, a multiple
+                of block_size. Defaults to 64.
+            max_tiles (int, optional): Number of tiles kept in memory. Defaults to 64.
+            store_path (str, optional): Directory that evicted tiles are written to. Defaults
+                to a temporary directory that is removed with the volume.
+            color_policy (str, optional): How observed colors are blended into voxels:
+                'mean', 'max_weight' or 'ema', see TSDFVolume. Defaults to 'mean'.
+            color_alpha (float, optional): Weight of each observation in the exponential
+                moving average, in (0, 1]. Defaults to 0.2.
+
+        Raises:
+            ValueError: If volume bounds are not the correct shape.
+            ValueError: If voxel size is not positive.
+            ValueError: If block size or max tiles is not positive.
+            ValueError: If tile size is not a positive multiple of block size.
+            ValueError: If a storage type is not supported.
+            ValueError: If the color policy or alpha is not supported.
+        """
+        if tile_size <= 0 or block_size <= 0 or tile_size % block_size != 0:
+            raise ValueError('tile size must be a positive multiple of block size.')
+
+        if max_tiles <= 0:
+            raise ValueError('max tiles must be positive.')
+
+        self._tile_size = int(tile_size)
+        self._max_tiles = int(max_tiles)
+        self._set_store(store_path)
+        super().__init__(volume_bounds, voxel_size, fused=fused, block_size=block_size,
+                         tsdf_dtype=tsdf_dtype, weight_dtype=weight_dtype, color_dtype=color_dtype,
+                         color_policy=color_policy, color_alpha=color_alpha)
+
+    def _set_store(self, store_path):
+        """Set the directory that evicted tiles are written to.
+
+        Args:
+            store_path (str): Tile directory, or None for a temporary one.
+        """
+        if store_path is None:
+            self._temporary_store = tempfile.TemporaryDirectory(prefix='tsdf_tiles_')
+            store_path = self._temporary_store.name
+        os.makedirs(store_path, exist_ok=True)
+        self._store_path = store_path
+
+    def _allocate_volumes(self):
+        """Set up the empty tile cache. No voxel storage is allocated up front.
+        """
+        self._tile_bounds = -(-self._voxel_bounds // self._tile_size)
+
+        # in-memory tiles in least to most recently used order, the tiles saved in the
+        # store, and the in-memory tiles that changed since they were last saved
+        self._tiles = OrderedDict()
+        self._stored_tiles = set()
+        self._modified_tiles = set()
+
+        # a read-only directory of saved tiles, and the stored tiles that are only saved
+        # there. Tiles are written to the store when they change
+        self._source_path = None
+        self._source_tiles = set()
+
+        # blocks updated since their mesh was last extracted, and the cached block meshes
+        self._dirty_blocks = np.zeros(self._block_bounds, dtype=bool)
+        self._block_meshes = {}
+
+    @property
+    def num_tiles(self):
+        """int: Number of allocated tiles, in memory or in the store."""
+        return len(self._stored_tiles | set(self._tiles))
+
+    def _get_storage_bytes(self):
+        """Get the bytes of the in-memory tiles and the dirty block flags.
+            Tiles in the store are not counted.
+
+        Returns:
+            dict: Bytes of each kind of storage array by name.
+        """
+        storage_bytes = {'tsdf': 0, 'weight': 0, 'color': 0}
+        for tsdf_tile, weight_tile, color_tile in self._tiles.values():
+            storage_bytes['tsdf'] += int(tsdf_tile.nbytes)
+            storage_bytes['weight'] += int(weight_tile.nbytes)
+            storage_bytes['color'] += int(color_tile.nbytes)
+        storage_bytes['dirty_blocks'] = int(self._dirty_blocks.nbytes)
+        return storage_bytes
+
+    def get_tile_shape(self, tile):
+        """Get the number of voxels along each axis of a tile, which is smaller
+            than the tile size at the upper volume bounds.
+
+        Args:
+            tile (tuple): Tile coordinate.
+
+        Returns:
+            numpy.array [3, ]: Tile shape in voxels.
+        """
+        return np.minimum(self._tile_size, self._voxel_bounds - np.array(tile) * self._tile_size)
+
+    def _get_tile_filenames(self, tile, path=None):
+        """Get the .npy files of a tile's tsdf, weight and color storage, by default
+            where the tile was last saved.
+        """
+        if path is None:
+            path = self._source_path if tile in self._source_tiles else self._store_path
+        prefix = os.path.join(path, '{}_{}_{}'.format(*tile))
+        return [prefix + '.tsdf.npy', prefix + '.weight.npy', prefix + '.color.npy']
+
+    def _read_tile(self, tile, mmap_mode=None):
+        """Get the storage of a tile without changing the cache.
+
+        Args:
+            tile (tuple): Tile coordinate.
+            mmap_mode (str, optional): Memory-map mode of tiles read from the store.
+                Defaults to None to load them into memory.
+
+        Returns:
+            tuple of numpy.array: tsdf, weight and color storage, or None if the tile is
+                not allocated.
+        """
+        if tile in self._tiles:
+            return self._tiles[tile]
+        if tile in self._stored_tiles:
+            return tuple(load_voxel_array(f, mmap_mode=mmap_mode) for f in self._get_tile_filenames(tile))
+        return None
+
+    def get_tile(self, tile):
+        """Get the storage of a tile, paging it in from the store or allocating it
+            if needed, and evicting the least recently used tiles beyond max_tiles.
+
+        Args:
+            tile (tuple): Tile coordinate.
+
+        Returns:
+            numpy.array [l, w, h]: The tsdf storage of the tile.
+            numpy.array [l, w, h]: The weight storage of the tile.
+            numpy.array [l, w, h, 3]: The color storage of the tile in RGB.
+        """
+        if tile in self._tiles:
+            self._tiles.move_to_end(tile)
+            return self._tiles[tile]
+
+        arrays = self._read_tile(tile)
+        if arrays is None:
+            shape = tuple(self.get_tile_shape(tile))
+            arrays = (np.full(shape, encode_tsdf(1., self._tsdf_dtype), dtype=self._tsdf_dtype),
+                      np.zeros(shape, dtype=self._weight_dtype),
+                      np.zeros(shape + (3,), dtype=self._color_dtype))
+            self._modified_tiles.add(tile)
+        self._tiles[tile] = arrays
+
+        while len(self._tiles) > self._max_tiles:
+            self._evict_tile(next(iter(self._tiles)))
+        return arrays
+
+    def _evict_tile(self, tile):
+        """Drop a tile from memory, saving it to the store first if it changed.
+
+        Args:
+            tile (tuple): Tile coordinate.
+        """
+        arrays = self._tiles.pop(tile)
+        if tile in self._modified_tiles:
+            self._source_tiles.discard(tile)
+            for filename, array in zip(self._get_tile_filenames(tile), arrays):
+                save_voxel_array(filename, array)
+            self._stored_tiles.add(tile)
+            self._modified_tiles.discard(tile)
+
+    def flush(self):
+        """Save every in-memory tile that changed to the store, keeping it in memory.
+        """
+        for tile in list(self._modified_tiles):
+            self._source_tiles.discard(tile)
+            for filename, array in zip(self._get_tile_filenames(tile), self._tiles[tile]):
+                save_voxel_array(filename, array)
+            self._stored_tiles.add(tile)
+        self._modified_tiles.clear()
+
+    def _group_blocks_by_tile(self, block_coords):
+        """Split voxel blocks by the tile they lie in.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks.
+
+        Returns:
+            list of tuple: (tile, block coordinates inside that tile) pairs.
+        """
+        if len(block_coords) == 0:
+            return []
+        tile_coords = block_coords // (self._tile_size // self._block_size)
+        tiles, tile_index = np.unique(tile_coords, axis=0, return_inverse=True)
+        order = np.argsort(tile_index.reshape(-1), kind='stable')
+        groups = np.split(block_coords[order], np.cumsum(np.bincount(tile_index.reshape(-1)))[:-1])
+        return [(tuple(tile.tolist()), blocks) for tile, blocks in zip(tiles, groups)]
+
+    def integrate(self, color_image, depth_image, camera_intrinsics, camera_pose, observation_weight=1.):
+        """Integrate an RGB-D observation into the TSDF volume tile by tile, paging in
+            the tiles that the camera frustum touches.
+
+        Args:
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4] or SE3): SE3 transform representing pose (camera to world)
+            observation_weight (float, optional):  The weight to assign for the current
+                observation. Defaults to 1.
+        """
+        # validate the pose once; the stages below use it and its cached inverse as is
+        camera_pose = to_se3(camera_pose)
+        with self._time_frame():
+            with self._time_stage('culling'):
+                block_coords = self.get_visible_blocks(depth_image, camera_intrinsics, camera_pose)
+            self._dirty_blocks[tuple(block_coords.T)] = True
+            camera_origin, camera_steps = self.get_camera_steps(camera_pose)
+            blocks_per_tile = self._tile_size // self._block_size
+
+            for tile, tile_blocks in self._group_blocks_by_tile(block_coords):
+                with self._time_stage('paging'):
+                    tsdf_tile, weight_tile, color_tile = self.get_tile(tile)
+                self._modified_tiles.add(tile)
+                local_blocks = tile_blocks - np.array(tile) * blocks_per_tile
+                tile_offset = np.array(tile) * self._tile_size
+
+                if self._fused:
+                    with self._time_stage('fused_kernel'):
+                        num_updated = self.integrate_kernel(
+                            kernel_view(tsdf_tile), weight_tile, color_tile,
+                            local_blocks, self._block_size, camera_origin + tile_offset @ camera_steps,
+                            camera_steps, camera_intrinsics, depth_image, color_image,
+                            self._truncation_margin, observation_weight, self._color_policy, self._color_alpha)
+                    self._count_block_voxels(tile_blocks, num_updated)
+                    continue
+
+                voxel_index = self.get_block_voxel_index(local_blocks, self._block_size, np.array(tsdf_tile.shape))
+                voxel_coords = np.stack(np.unravel_index(voxel_index, tsdf_tile.shape), axis=1) + tile_offset
+                self._integrate_voxels(
+                    voxel_coords,
+                    voxel_index,
+                    tsdf_tile.reshape(-1),
+                    weight_tile.reshape(-1),
+                    color_tile.reshape(-1, 3),
+                    color_image, depth_image, camera_intrinsics, camera_pose, observation_weight)
+
+    def get_volume(self):
+        """Get the tsdf and color volumes as dense grids over the volume bounds.
+            This allocates the whole grid and is meant for small volumes and inspection.
+
+        Returns:
+            numpy.array [l, w, h]: l, w, h are the dimensions of the voxel grid in voxel space.
+                Each entry contains the integrated tsdf value.
+            numpy.array [l, w, h, 3]: l, w, h are the dimensions of the voxel grid in voxel space.
+                3 is the channel number in the order r, g, then b.
+        """
+        tsdf_volume, _, color_volume = self._get_dense_storage()
+        return tsdf_volume, color_volume
+
+    def _get_dense_storage(self):
+        """Copy the allocated tiles into dense float32 grids over the volume bounds.
+
+        Returns:
+            numpy.array [l, w, h]: The decoded tsdf volume.
+            numpy.array [l, w, h]: The weight volume.
+            numpy.array [l, w, h, 3]: The color volume in RGB.
+        """
+        tsdf_volume = np.ones(self._voxel_bounds, dtype=np.float32)
+        weight_volume = np.zeros(self._voxel_bounds, dtype=np.float32)
+        color_volume = np.zeros(np.append(self._voxel_bounds, 3), dtype=np.float32)
+        for tile in self._stored_tiles | set(self._tiles):
+            tsdf_tile, weight_tile, color_tile = self._read_tile(tile)
+            i, j, k = np.array(tile) * self._tile_size
+            l, w, h = tsdf_tile.shape
+            tsdf_volume[i:i + l, j:j + w, k:k + h] = decode_tsdf(tsdf_tile)
+            weight_volume[i:i + l, j:j + w, k:k + h] = weight_tile
+            color_volume[i:i + l, j:j + w, k:k + h] = color_tile
+        return tsdf_volume, weight_volume, color_volume
+
+    def _get_raycast_voxels(self, world_planes, world_bounds):
+        """Gather the blocks of the allocated tiles in a frustum into block pools for the
+            raycast kernel. The blocks are split into boxes that, with their neighboring
+            blocks, hold at most as many voxels as max_tiles tiles, and one pool is yielded
+            per box. Tiles are read without paging them into the cache.
+
+        Args:
+            world_planes (numpy.array [p, 4]): Frustum planes in world coordinates.
+            world_bounds (numpy.array [3, 2]): World space bounding box of the frustum.
+
+        Yields:
+            SparseVoxels: The raycast storage of a box of blocks. Nothing is yielded if no
+                allocated tile is in the frustum.
+            numpy.array [3, 2]: The box, see get_voxel_box.
+        """
+        tiles = np.array(sorted(self._stored_tiles | set(self._tiles)), dtype=np.int64).reshape(-1, 3)
+        tiles = tiles[self.blocks_in_frustum(world_planes, tiles, self._tile_size)]
+        if len(tiles) == 0:
+            return
+
+        # every block of the tiles in the frustum can be a neighbor, and the ones in the
+        # frustum are sampled
+        blocks_per_tile = self._tile_size // self._block_size
+        offsets = np.stack(np.meshgrid(*[range(blocks_per_tile)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+        tile_blocks = (tiles[:, None] * blocks_per_tile + offsets).reshape(-1, 3)
+        tile_blocks = tile_blocks[(tile_blocks < self._block_bounds).all(axis=1)]
+        block_coords = tile_blocks[self.blocks_in_frustum(world_planes, tile_blocks)]
+
+        max_blocks = self._max_tiles * blocks_per_tile ** 3
+        for box_blocks, pool_blocks in self._split_raycast_blocks(block_coords, tile_blocks, max_blocks):
+            yield self._get_block_pool(pool_blocks), self.get_voxel_box(box_blocks)
+
+    @staticmethod
+    def _split_raycast_blocks(block_coords, neighbor_coords, max_blocks):
+        """Split blocks into disjoint boxes by halving the longest side of their bounding
+            box until the blocks in each box and next to it number at most max_blocks.
+            A single block and its neighbors are never split.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the blocks to split.
+            neighbor_coords (numpy.array [n, 3]): Coordinates of all the blocks that hold
+                storage, including block_coords.
+            max_blocks (int): Maximum number of blocks around a box.
+
+        Yields:
+            numpy.array [c, 3]: Coordinates of the blocks in a box.
+            numpy.array [d, 3]: Coordinates of the blocks in or next to the box.
+        """
+        stack = [block_coords]
+        while stack:
+            box_blocks = stack.pop()
+            box_min, box_max = box_blocks.min(axis=0), box_blocks.max(axis=0)
+            near = ((neighbor_coords >= box_min - 1) & (neighbor_coords <= box_max + 1)).all(axis=1)
+            if np.count_nonzero(near) <= max_blocks or len(box_blocks) == 1:
+                yield box_blocks, neighbor_coords[near]
+                continue
+            axis = np.argmax(box_max - box_min)
+            lower = box_blocks[:, axis] <= (box_min[axis] + box_max[axis]) // 2
+            stack += [box_blocks[~lower], box_blocks[lower]]
+
+    def _get_block_pool(self, block_coords):
+        """Copy voxel blocks out of their tiles into a block pool with a hash table.
+            Blocks at the upper volume bounds are padded with unobserved voxels.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of blocks in allocated tiles.
+
+        Returns:
+            SparseVoxels: The raycast storage of the blocks.
+        """
+        s = self._block_size
+        tsdf_pool = np.full((len(block_coords), s, s, s), encode_tsdf(1., self._tsdf_dtype), dtype=self._tsdf_dtype)
+        weight_pool = np.zeros((len(block_coords), s, s, s), dtype=self._weight_dtype)
+        color_pool = np.zeros((len(block_coords), s, s, s, 3), dtype=self._color_dtype)
+
+        # stored tiles are memory-mapped, so only the pooled blocks are read
+        groups = self._group_blocks_by_tile(block_coords)
+        slot = 0
+        for tile, tile_blocks in groups:
+            tile_arrays = self._read_tile(tile, mmap_mode='r')
+            for i, j, k in (tile_blocks - np.array(tile) * (self._tile_size // s)) * s:
+                for pool, array in zip([tsdf_pool, weight_pool, color_pool], tile_arrays):
+                    block = array[i:i + s, j:j + s, k:k + s]
+                    pool[slot, :block.shape[0], :block.shape[1], :block.shape[2]] = block
+                slot += 1
+
+        table_size = 1 << int(np.ceil(np.log2(2 * len(block_coords))))
+        block_keys = np.zeros((table_size, 3), dtype=np.int32)
+        block_slots = np.full(table_size, -1, dtype=np.int32)
+        hash_insert(block_keys, block_slots, np.concatenate([blocks for _, blocks in groups]).astype(np.int32), 0)
+        return SparseVoxels(block_keys, block_slots, kernel_view(tsdf_pool), weight_pool, color_pool)
+
+    def get_padded_tile(self, tile):
+        """Gather a tile together with the first voxel layer of its +x, +y and +z neighbors.
+            Tiles that are not allocated hold the initial values.
+
+        Args:
+            tile (tuple): Tile coordinate.
+
+        Returns:
+            numpy.array [l, w, h]: Padded tsdf values of the tile.
+            numpy.array [l, w, h, 3]: Padded colors of the tile.
+        """
+        t = self._tile_size
+        shape = np.minimum(t + 1, self._voxel_bounds - np.array(tile) * t)
+        tsdf_tile = np.ones(shape, dtype=np.float32)
+        color_tile = np.zeros(np.append(shape, 3), dtype=np.float32)
+
+        for offset in itertools.product((0, 1), repeat=3):
+            neighbor = tuple(c + o for c, o in zip(tile, offset))
+            if neighbor not in self._tiles and neighbor not in self._stored_tiles:
+                continue
+            neighbor_tsdf, _, neighbor_color = self.get_tile(neighbor)
+            target = tuple(slice(t, t + 1) if o else slice(0, t) for o in offset)
+            source = tuple(slice(0, 1) if o else slice(0, t) for o in offset)
+            tsdf_tile[target] = decode_tsdf(neighbor_tsdf[source])
+            color_tile[target] = neighbor_color[source]
+        return tsdf_tile, color_tile
+
+    def update_block_meshes(self):
+        """ Re-mesh the dirty blocks tile by tile and update the block mesh cache.
+        """
+        s = self._block_size
+        blocks_per_tile = self._tile_size // s
+
+        for tile, tile_blocks in self._group_blocks_by_tile(self.get_dirty_blocks()):
+            tsdf_tile, color_tile = self.get_padded_tile(tile)
+            local_blocks = tile_blocks - np.array(tile) * blocks_per_tile
+
+            # most updated blocks are free space and have no mesh
+            crossing = self.blocks_crossing_surface(tsdf_tile, local_blocks, s)
+            for block in map(tuple, tile_blocks[~crossing]):
+                self._block_meshes.pop(block, None)
+            tile_blocks = tile_blocks[crossing]
+            local_blocks = local_blocks[crossing]
+
+            tsdf_blocks = []
+            color_blocks = []
+            for i, j, k in local_blocks * s:
+                tsdf_blocks.append(tsdf_tile[i:i + s + 1, j:j + s + 1, k:k + s + 1])
+                color_blocks.append(color_tile[i:i + s + 1, j:j + s + 1, k:k + s + 1])
+
+            meshes = marching_cubes_blocks(tsdf_blocks, color_blocks, tile_blocks * s)
+            for block, mesh in zip(map(tuple, tile_blocks), meshes):
+                if mesh is None:
+                    self._block_meshes.pop(block, None)
+                else:
+                    self._block_meshes[block] = mesh
+        self._dirty_blocks[:] = False
+
+    def get_mesh_chunks(self, chunk_size=None):
+        """ Extract the mesh tile by tile, re-meshing the blocks updated since the last
+            extraction, see TSDFVolume.get_mesh_chunks.
+
+        Args:
+            chunk_size (int, optional): The side length of the chunks in voxel blocks.
+                Defaults to None for the blocks of a tile.
+
+        Yields:
+            tuple: (points, triangles, normals, colors) of each chunk, as returned by get_mesh.
+        """
+        chunk_size = self._tile_size // self._block_size if chunk_size is None else chunk_size
+        return super().get_mesh_chunks(chunk_size)
+
+    def get_mesh(self, incremental=False):
+        """ Run marching cubes tile by tile over the allocated tiles to get a mesh representation.
+
+        Args:
+            incremental (bool, optional): Re-mesh only the blocks updated since the last
+                extraction, reusing cached meshes of the other blocks. Defaults to False.
+
+        Returns:
+            numpy.array [n, 3]: each row represents a 3D point.
+            numpy.array [k, 3]: each row is a list of point indices used to render triangles.
+            numpy.array [n, 3]: each row represents the normal vector for the corresponding 3D point.
+            numpy.array [n, 3]: each row represents the color of the corresponding 3D point.
+        """
+        if not incremental:
+            self._block_meshes = {}
+            blocks_per_tile = self._tile_size // self._block_size
+            for tile in self._stored_tiles | set(self._tiles):
+                i, j, k = np.array(tile) * blocks_per_tile
+                self._dirty_blocks[i:i + blocks_per_tile, j:j + blocks_per_tile, k:k + blocks_per_tile] = True
+        return super().get_mesh(incremental=True)
+
+    def _merge_storage(self, other):
+        """Merge the tiles of a tiled volume with the same grid into this one, one tile at a time.
+        """
+        if not isinstance(other, TiledTSDFVolume) or other._tile_size != self._tile_size:
+            raise ValueError('tiled volumes can only merge tiled volumes with the same tile size.')
+
+        blocks_per_tile = self._tile_size // self._block_size
+        for tile in other._stored_tiles | set(other._tiles):
+            other_tsdf, other_weight, other_color = other._read_tile(tile)
+            tsdf_tile, weight_tile, color_tile = self.get_tile(tile)
+            self._modified_tiles.add(tile)
+            self.merge_kernel(
+                kernel_view(tsdf_tile).reshape(1, -1),
+                weight_tile.reshape(1, -1),
+                color_tile.reshape(1, -1, 3),
+                kernel_view(other_tsdf).reshape(1, -1),
+                other_weight.reshape(1, -1),
+                other_color.reshape(1, -1, 3),
+                np.zeros(1, dtype=np.int64), self._color_policy, self._color_alpha)
+            i, j, k = np.array(tile) * blocks_per_tile
+            self._dirty_blocks[i:i + blocks_per_tile, j:j + blocks_per_tile, k:k + blocks_per_tile] = True
+
+    def _get_metadata(self):
+        """Get the description of the volume that save writes to meta.json.
+
+        Returns:
+            dict: Volume type, grid geometry, storage types and tiling.
+        """
+        meta = super()._get_metadata()
+        meta['tile_size'] = self._tile_size
+        meta['max_tiles'] = self._max_tiles
+        return meta
+
+    def _save_volumes(self, path):
+        """Save every allocated tile to .npy files in a directory.
+        """
+        self.flush()
+        if os.path.abspath(path) == os.path.abspath(self._store_path):
+            return
+        for tile in self._stored_tiles:
+            for source, target in zip(self._get_tile_filenames(tile), self._get_tile_filenames(tile, path)):
+                if os.path.abspath(source) != os.path.abspath(target):
+                    shutil.copyfile(source, target)
+
+    def _load_volumes(self, path, meta, mmap_mode):
+        """Page tiles in on demand from a directory written by _save_volumes. With
+            mmap_mode 'r+', the directory becomes the tile store and evicted tiles are
+            written back to it. Otherwise it is only read, and tiles that change are
+            written to a temporary store.
+
+        Raises:
+            ValueError: If mmap_mode is not 'r+', 'r', 'c' or None.
+        """
+        if mmap_mode not in ('r+', 'r', 'c', None):
+            raise ValueError("mmap mode must be 'r+', 'r', 'c' or None.")
+
+        self._tile_size = meta['tile_size']
+        self._max_tiles = meta['max_tiles']
+        self._set_store(path if mmap_mode == 'r+' else None)
+        self._allocate_volumes()
+        if mmap_mode != 'r+':
+            self._source_path = path
+
+        blocks_per_tile = self._tile_size // self._block_size
+        for filename in glob.glob(os.path.join(path, '*.tsdf.npy')):
+            tile = tuple(int(c) for c in os.path.basename(filename).split('.')[0].split('_'))
+            self._stored_tiles.add(tile)
+            if self._source_path is not None:
+                self._source_tiles.add(tile)
+            i, j, k = np.array(tile) * blocks_per_tile
+            self._dirty_blocks[i:i + blocks_per_tile, j:j + blocks_per_tile, k:k + blocks_per_tile] = True
@@ -5,7 +5,8 @@ def transform_is_valid(t, tolerance=1e-3):
     """Check if array is a valid transform.
 
     Args:
-        t (numpy.array [4, 4]): Transform candidate.
+        t (numpy.array [4, 4] or SE3): Transform candidate. An SE3 was validated
+            when it was constructed.
         tolerance (float, optional): maximum absolute difference
             for two numbers to be considered close enough to each
             other. Defaults to 1e-3.
@@ -13,6 +14,9 @@ def transform_is_valid(t, tolerance=1e-3):
     Returns:
         bool: True if array is a valid transform else False.
     """
+    if isinstance(t, SE3):
+        return True
+
     # check shape
     if t.shape != (4,4):
         return False
@@ -39,28 +43,30 @@ def transform_concat(t1, t2):
     """[summary]
 
     Args:
-        t1 (numpy.array [4, 4]): SE3 transform.
-        t2 (numpy.array [4, 4]): SE3 transform.
+        t1 (numpy.array [4, 4] or SE3): SE3 transform.
+        t2 (numpy.array [4, 4] or SE3): SE3 transform.
 
     Raises:
         ValueError: t1 is invalid.
         ValueError: t2 is invalid.
 
     Returns:
-        numpy.array [4, 4]: t1 * t2.
+        numpy.array [4, 4]: t1 * t2, an SE3 if both t1 and t2 are.
     """
-    if not transform_is_valid(t1):
+    if isinstance(t1, SE3) and isinstance(t2, SE3):
+        return t1 @ t2
+    if not isinstance(t1, SE3) and not transform_is_valid(t1):
         raise ValueError('Invalid input transform t1')
-    if not transform_is_valid(t2):
+    if not isinstance(t2, SE3) and not transform_is_valid(t2):
         raise ValueError('Invalid input transform t2')
 
-    return np.matmul(t1, t2)
+    return np.matmul(np.asarray(t1), np.asarray(t2))
 
 def transform_point3s(t, ps):
     """Transfrom 3D points from one space to another.
 
     Args:
-        t (numpy.array [4, 4]): SE3 transform.
+        t (numpy.array [4, 4] or SE3): SE3 transform. An SE3 is not validated again.
         ps (numpy.array [n, 3]): Array of n 3D points (x, y, z).
 
     Raises:
@@ -70,35 +76,145 @@ def transform_point3s(t, ps):
     Returns:
         numpy.array [n, 3]: Transformed 3D points.
     """
-    if not transform_is_valid(t):
+    if not isinstance(t, SE3) and not transform_is_valid(t):
         raise ValueError('Invalid input transform t')
     if len(ps.shape) != 2 or ps.shape[1] != 3:
         raise ValueError('Invalid input points ps')
 
-    # convert to homogeneous
-    ps_homogeneous = np.hstack([ps, np.ones((len(ps), 1), dtype=np.float32)])
-    ps_transformed = np.dot(t, ps_homogeneous.T).T
-
-    return ps_transformed[:, :3]
+    # rotate and translate, without converting the points to homogeneous coordinates
+    t = np.asarray(t)
+    return ps @ t[:3, :3].T + t[:3, 3]
 
 def transform_inverse(t):
     """Find the inverse of the transfom.
 
     Args:
-        t (numpy.array [4, 4]): SE3 transform.
+        t (numpy.array [4, 4] or SE3): SE3 transform. An SE3 is not validated again.
 
     Raises:
         ValueError: If t is not a valid transform.
 
     Returns:
-        numpy.array [4, 4]: Inverse of the input transform.
+        numpy.array [4, 4]: Inverse of the input transform, the cached SE3 inverse if t is an SE3.
     """
+    if isinstance(t, SE3):
+        return t.inverse()
     if not transform_is_valid(t):
         raise ValueError('Invalid input transform t')
 
-    return np.linalg.inv(t)
+    return _rigid_inverse(t)
+
+def _rigid_inverse(t):
+    """Invert a rigid transform in closed form: [R, p]^-1 = [R^T, -R^T p].
+    """
+    rotation_t = t[:3, :3].T
+    inverse = np.eye(4)
+    inverse[:3, :3] = rotation_t
+    inverse[:3, 3] = -rotation_t @ t[:3, 3]
+    return inverse
+
+class SE3(object):
+    """SE3 transform that is validated once, when it is constructed.
+
+    Inverses are computed in closed form and cached, and products of SE3 transforms
+    are not validated again. The transform functions of this module take an SE3
+    wherever they take a transform and skip its validation. SE3 behaves as its
+    matrix under numpy indexing and numpy.asarray; the matrix itself, a read-only
+    C-contiguous float64 array, is the representation to pass to numba kernels.
+    """
+
+    def __init__(self, t):
+        """Validate an SE3 transform.
+
+        Args:
+            t (numpy.array [4, 4]): SE3 transform.
+
+        Raises:
+            ValueError: If t is not a valid transform.
+        """
+        t = np.asarray(t)
+        if not transform_is_valid(t):
+            raise ValueError('Invalid input transform t')
+        self._set_matrix(t)
+
+    @classmethod
+    def _from_valid(cls, t):
+        """Wrap a transform that is valid by construction without validating it.
+        """
+        se3 = cls.__new__(cls)
+        se3._set_matrix(t)
+        return se3
+
+    def _set_matrix(self, t):
+        matrix = np.array(t, dtype=np.float64, order='C')
+        matrix.flags.writeable = False
+        self._matrix = matrix
+        self._inverse = None
+
+    @classmethod
+    def identity(cls):
+        """SE3: The identity transform."""
+        return cls._from_valid(np.eye(4))
+
+    @property
+    def matrix(self):
+        """numpy.array [4, 4]: The read-only transform matrix."""
+        return self._matrix
+
+    @property
+    def rotation(self):
+        """numpy.array [3, 3]: The rotation part of the transform."""
+        return self._matrix[:3, :3]
+
+    @property
+    def translation(self):
+        """numpy.array [3, ]: The translation part of the transform."""
+        return self._matrix[:3, 3]
+
+    def inverse(self):
+        """Find the inverse of the transform, computing it on the first call only.
+
+        Returns:
+            SE3: Inverse of the transform, whose inverse is this transform.
+        """
+        if self._inverse is None:
+            self._inverse = SE3._from_valid(_rigid_inverse(self._matrix))
+            self._inverse._inverse = self
+        return self._inverse
+
+    def __matmul__(self, other):
+        """Compose with another SE3 transform without validating the product.
+        """
+        if not isinstance(other, SE3):
+            return NotImplemented
+        return SE3._from_valid(self._matrix @ other._matrix)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and np.dtype(dtype) != self._matrix.dtype:
+            return self._matrix.astype(dtype)
+        return self._matrix.copy() if copy else self._matrix
+
+    def __getitem__(self, key):
+        return self._matrix[key]
+
+    def __repr__(self):
+        return 'SE3({})'.format(np.array2string(self._matrix, separator=', ').replace('\n', '\n    '))
+
+def to_se3(t):
+    """Get a transform as an SE3, validating it unless it already is one.
+
+    Args:
+        t (numpy.array [4, 4] or SE3): SE3 transform.
+
+    Raises:
+        ValueError: If t is not a valid transform.
+
+    Returns:
+        SE3: The transform.
+    """
+    return t if isinstance(t, SE3) else SE3(t)
 
-@njit(parallel=True)
+@njit(parallel=True, cache=True)
 def camera_to_image(intrinsics, camera_points):
     """Project points in camera space to the image plane.
 
@@ -131,6 +247,33 @@ def camera_to_image(intrinsics, camera_points):
 
     return image_coordinates
 
+def camera_frustum_planes(intrinsics, image_bounds, max_depth):
+    """Bounding planes of the viewing frustum of a pinhole camera.
+        Note: the frustum is a pyramid with its apex at the camera center.
+
+    Args:
+        intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+        image_bounds (numpy.array [2, 2]): rows index [u, v] and cols index [min_bound, max_bound]
+            of the image region in (continuous) pixel coordinates.
+        max_depth (float): z depth of the far plane.
+
+    Returns:
+        numpy.array [5, 4]: each row (a, b, c, d) is a plane in camera coordinates.
+            Points with a * x + b * y + c * z + d >= 0 for every plane are inside the frustum.
+    """
+    u0 = intrinsics[0, 2]
+    v0 = intrinsics[1, 2]
+    fu = intrinsics[0, 0]
+    fv = intrinsics[1, 1]
+    (u_min, u_max), (v_min, v_max) = image_bounds
+
+    # u >= u_min <=> fu * x + (u0 - u_min) * z >= 0 for points in front of the camera
+    return np.array([[fu, 0., u0 - u_min, 0.],
+                     [-fu, 0., u_max - u0, 0.],
+                     [0., fv, v0 - v_min, 0.],
+                     [0., -fv, v_max - v0, 0.],
+                     [0., 0., -1., max_depth]])
+
 def depth_to_point_cloud(intrinsics, depth_image):
     """Back project a depth image to a point cloud.
         Note: point clouds are unordered, so any permutation of points in the list is acceptable.
@@ -91,6 +91,45 @@ class TestTransforms(unittest.TestCase):
         self.assertTrue(np.isclose(np.matmul(t, t_inv), np.eye(4)).all())
         self.assertTrue(np.isclose(np.matmul(t_inv, t), np.eye(4)).all())
 
+    def test_se3(self):
+        """Test transforms.SE3.
+        """
+        np.random.seed(3)
+        t1 = np.eye(4)
+        t1[:3, :3] = self._rand_rotation_matrix()
+        t1[:3, 3] = [0.5, -1., 2.]
+        t2 = np.eye(4)
+        t2[:3, :3] = self._rand_rotation_matrix()
+        t2[:3, 3] = [-0.2, 0.3, 0.1]
+        a, b = SE3(t1), SE3(t2)
+
+        with self.assertRaises(ValueError):
+            SE3(np.random.rand(4, 4))
+        self.assertIs(to_se3(a), a)
+        self.assertTrue(transform_is_valid(a))
+        self.assertTrue(transform_is_valid(SE3(np.eye(4))))
+        self.assertFalse(a.matrix.flags.writeable)
+
+        # the inverse is computed once, and inverts back to the same transform
+        self.assertTrue(np.isclose(a.inverse().matrix, np.linalg.inv(t1)).all())
+        self.assertIs(a.inverse(), a.inverse())
+        self.assertIs(a.inverse().inverse(), a)
+        self.assertIs(transform_inverse(a), a.inverse())
+
+        self.assertTrue(np.isclose((a @ b).matrix, transform_concat(t1, t2)).all())
+        self.assertIsInstance(transform_concat(a, b), SE3)
+        self.assertTrue(np.isclose(transform_concat(a, t2), t1 @ t2).all())
+
+        p = np.random.rand(10, 3)
+        self.assertTrue(np.isclose(transform_point3s(a, p), transform_point3s(t1, p)).all())
+        self.assertTrue(np.array_equal(np.asarray(a), t1))
+        self.assertTrue(np.array_equal(a[:3, 3], t1[:3, 3]))
+
+        # the read-only matrix can be passed to numba kernels
+        points = p + [0., 0., 1.]
+        self.assertTrue(np.array_equal(camera_to_image(SE3.identity().matrix[:3, :3], points),
+                                       camera_to_image(np.eye(3), points)))
+
     def test_camera_to_image(self):
         """Test transforms.camera_to_image.
         """
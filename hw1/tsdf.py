@@ -1,23 +1,545 @@
 
-from skimage import measure
+from collections import namedtuple
+import contextlib
+import itertools
+import json
+import os
+import warnings
+
+from integration_stats import IntegrationStats
+from ply import PlyWriter
+from process_memory import *
 from transforms import *
+from voxel_storage import *
+
+
+# returned by TSDFVolume._time_stage and _time_frame while stats are disabled
+_NO_STATS = contextlib.nullcontext()
+
+
+def marching_cubes_blocks(tsdf_blocks, color_blocks, block_origins):
+    """Run marching cubes independently over a batch of padded voxel blocks.
+
+    Each block must carry one extra layer of voxels from its +x, +y and +z
+    neighbors so that the surfaces of adjacent blocks meet.
+
+    Args:
+        tsdf_blocks (list of numpy.array [l, w, h]): Padded tsdf values of each block.
+        color_blocks (list of numpy.array [l, w, h, 3]): Padded colors of each block in RGB.
+        block_origins (numpy.array [b, 3]): Voxel grid coordinates of each block's first voxel.
+
+    Returns:
+        list of tuple: (points, triangles, normals, colors) of each block, with points
+            given in voxel grid coordinates. None for blocks that do not cross the zero level set.
+    """
+    from skimage import measure
+
+    meshes = []
+    for i in range(len(tsdf_blocks)):
+        block = tsdf_blocks[i]
+        mesh = None
+        if min(block.shape) >= 2 and block.min() <= 0 <= block.max():
+            voxel_points, triangles, normals, _ = measure.marching_cubes(block, level=0, method='lewiner')
+            if len(triangles) > 0:
+                points_ind = np.round(voxel_points).astype(int)
+                colors = color_blocks[i][points_ind[:, 0], points_ind[:, 1], points_ind[:, 2]]
+                mesh = (voxel_points + block_origins[i], triangles, normals, colors)
+        meshes.append(mesh)
+    return meshes
+
+
+# vertices of block meshes equal after rounding to this many decimals are merged
+WELD_DECIMALS = 4
+
+
+def get_weld_keys(points, decimals=WELD_DECIMALS):
+    """Round vertices to the integer keys that weld_meshes merges equal ones by.
+
+    Args:
+        points (numpy.array [n, 3]): Vertices in voxel grid coordinates.
+        decimals (int, optional): Number of decimals kept. Defaults to WELD_DECIMALS.
+
+    Returns:
+        numpy.array [n, 3]: Keys of the vertices.
+    """
+    return np.round(points * 10 ** decimals).astype(np.int64)
+
+
+def weld_meshes(meshes, decimals=WELD_DECIMALS):
+    """Concatenate block meshes and merge the vertices shared along block seams.
+
+    Args:
+        meshes (list of tuple): (points, triangles, normals, colors) of each block.
+        decimals (int, optional): Vertices equal after rounding to this many
+            decimals are merged. Defaults to 4.
+
+    Returns:
+        numpy.array [n, 3]: each row represents a 3D point.
+        numpy.array [k, 3]: each row is a list of point indices used to render triangles.
+        numpy.array [n, 3]: each row represents the normal vector for the corresponding 3D point.
+        numpy.array [n, 3]: each row represents the color of the corresponding 3D point.
+    """
+    if len(meshes) == 0:
+        return (np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int64),
+                np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.float32))
+
+    offsets = np.cumsum([0] + [len(m[0]) for m in meshes[:-1]])
+    points = np.concatenate([m[0] for m in meshes])
+    triangles = np.concatenate([m[1] + offset for m, offset in zip(meshes, offsets)])
+    normals = np.concatenate([m[2] for m in meshes])
+    colors = np.concatenate([m[3] for m in meshes])
+
+    # sort the rounded vertices lexicographically and merge runs of equal ones
+    keys = get_weld_keys(points, decimals)
+    order = np.lexsort(keys.T[::-1])
+    is_first = np.ones(len(keys), dtype=bool)
+    is_first[1:] = (keys[order[1:]] != keys[order[:-1]]).any(axis=1)
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(is_first) - 1
+    first = order[is_first]
+    return points[first], inverse[triangles], normals[first], colors[first]
+
+
+# side length in voxel blocks of the chunks that meshes are streamed in
+MESH_CHUNK_BLOCKS = 8
+
+# color blending policies: a cumulative weighted mean of the observations, the color of
+# the observation with the larger weight, or an exponential moving average
+COLOR_POLICIES = {'mean': 0, 'max_weight': 1, 'ema': 2}
+
+
+@njit(cache=True)
+def blend_color(color_old, color_new, w_old, observation_weight, color_policy, color_alpha):
+    """Blend a stored color channel with a newly observed one.
+
+    Args:
+        color_old (float): Stored color channel.
+        color_new (float): Observed color channel.
+        w_old (float): Accumulated weight of the voxel before the observation.
+        observation_weight (float): The weight of the observation.
+        color_policy (int): Blending policy, a value of COLOR_POLICIES.
+        color_alpha (float): Weight of the observation in the exponential moving average.
+
+    Returns:
+        float: The blended color channel, rounded and at most 255.
+    """
+    if color_policy == 1:
+        # the stored color wins unless the observation outweighs everything before it
+        color = color_new if observation_weight > w_old else color_old
+    elif color_policy == 2:
+        color = color_new if w_old <= 0 else color_old + color_alpha * (color_new - color_old)
+    else:
+        color = (color_old * w_old + color_new * observation_weight) / (w_old + observation_weight)
+    return min(255., np.round(color))
+
+
+@njit(parallel=True, cache=True)
+def blend_colors_kernel(color_old, color_new, w_old, observation_weight, color_policy, color_alpha, out):
+    """Blend stored colors with newly observed ones, see blend_color.
+
+    Args:
+        color_old (numpy.array [n, 3]): Stored colors in RGB.
+        color_new (numpy.array [n, 3]): Observed colors in RGB.
+        w_old (numpy.array [n, ]): Accumulated weights before the observation.
+        observation_weight (float): The weight of the observation.
+        color_policy (int): Blending policy, a value of COLOR_POLICIES.
+        color_alpha (float): Weight of the observation in the exponential moving average.
+        out (numpy.array [n, 3]): Output blended colors.
+    """
+    for i in prange(color_old.shape[0]):
+        for c in range(3):
+            out[i, c] = blend_color(color_old[i, c], color_new[i, c], w_old[i], observation_weight,
+                                    color_policy, color_alpha)
+
+
+@njit(cache=True)
+def integrate_voxel(index, camera_x, camera_y, camera_z, tsdf_flat, weight_flat, color_flat,
+                    depth_image, color_image, camera_intrinsics, truncation_margin, observation_weight,
+                    color_policy, color_alpha):
+    """Fuse one observation into a single voxel in place.
+
+    Applies the same criteria as TSDFVolume.get_valid_points: the voxel must
+    project inside the image, in front of the camera, onto a pixel with valid
+    depth, and lie no further than the truncation margin behind the surface.
+
+    Args:
+        index (int): Index of the voxel into the flat storage arrays.
+        camera_x (float): x coordinate of the voxel in camera space.
+        camera_y (float): y coordinate of the voxel in camera space.
+        camera_z (float): z coordinate of the voxel in camera space.
+        tsdf_flat (numpy.array [m, ]): Flat view of the tsdf storage, see kernel_view.
+        weight_flat (numpy.array [m, ]): Flat view of the weight storage.
+        color_flat (numpy.array [m, 3]): Flat view of the color storage.
+        depth_image (numpy.array [h, w]): A z depth image.
+        color_image (numpy.array [h, w, 3]): An rgb image.
+        camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+        truncation_margin (float): Truncation on the SDF in meters.
+        observation_weight (float): The weight to assign for the current observation.
+        color_policy (int): Color blending policy, a value of COLOR_POLICIES.
+        color_alpha (float): Weight of the observation in the exponential moving average of colors.
+
+    Returns:
+        bool: True if the voxel was updated.
+    """
+    if camera_z <= 0:
+        return False
+
+    image_height, image_width = depth_image.shape
+    u = np.round(camera_x * camera_intrinsics[0, 0] / camera_z + camera_intrinsics[0, 2])
+    v = np.round(camera_y * camera_intrinsics[1, 1] / camera_z + camera_intrinsics[1, 2])
+    if u < 0 or u >= image_width or v < 0 or v >= image_height:
+        return False
+
+    pixel_u = int(u)
+    pixel_v = int(v)
+    depth = depth_image[pixel_v, pixel_u]
+    if depth <= 0:
+        return False
+
+    diff_depth = depth - camera_z
+    if diff_depth < -truncation_margin:
+        return False
+    margin_distance = min(1., diff_depth / truncation_margin)
+
+    # stored values are decoded and encoded according to the storage type
+    w_old = np.float64(weight_flat[index])
+    w_new = w_old + observation_weight
+    tsdf_old = load_tsdf(tsdf_flat[index])
+    store_tsdf(tsdf_flat, index, (w_old * tsdf_old + observation_weight * margin_distance) / w_new)
+    store_weight(weight_flat, index, w_new)
+    for c in range(3):
+        color_flat[index, c] = blend_color(color_flat[index, c], color_image[pixel_v, pixel_u, c],
+                                           w_old, observation_weight, color_policy, color_alpha)
+    return True
+
+
+# voxel storage that the raycast kernel samples, as a dense grid. Each backend gives the
+# kernel its own storage type and overloads load_block for it
+DenseVoxels = namedtuple('DenseVoxels', ['tsdf', 'weight', 'color'])
+
+
+def is_voxels_type(voxels, voxels_class):
+    """Check if a numba type is the type of a raycast storage class, inside an overload.
+
+    Args:
+        voxels (numba.types.Type): Type of the storage argument.
+        voxels_class (type): Raycast storage namedtuple class, such as DenseVoxels.
+
+    Returns:
+        bool: True if the argument is an instance of the class.
+    """
+    return isinstance(voxels, types.BaseNamedTuple) and voxels.instance_class is voxels_class
+
+
+def load_block(voxels, i, j, k):
+    """Find the storage arrays of the block that holds a voxel in raycast storage, such as
+        DenseVoxels. Storage is allocated in whole blocks, so rays skip the block of a voxel
+        that is not held. Backends overload this for their storage type.
+
+    Args:
+        voxels (tuple): Raycast storage of a volume.
+        i (int): x voxel grid coordinate.
+        j (int): y voxel grid coordinate.
+        k (int): z voxel grid coordinate.
+
+    Returns:
+        bool: True if the voxel is held. The arrays are those of another block if not.
+        numpy.array [s, s, s]: tsdf of the block, see kernel_view.
+        numpy.array [s, s, s]: Weights of the block.
+        numpy.array [s, s, s, 3]: Colors of the block.
+        int: x coordinate of the voxel in the block.
+        int: y coordinate of the voxel in the block.
+        int: z coordinate of the voxel in the block.
+    """
+    return _load_block(voxels, i, j, k)
+
+
+# python entry point of the overloads
+@njit(cache=True)
+def _load_block(voxels, i, j, k):
+    return load_block(voxels, i, j, k)
+
+
+@overload(load_block, inline='always')
+def _load_dense_block(voxels, i, j, k):
+    if is_voxels_type(voxels, DenseVoxels):
+        def impl(voxels, i, j, k):
+            size_x, size_y, size_z = voxels.tsdf.shape
+            found = 0 <= i < size_x and 0 <= j < size_y and 0 <= k < size_z
+            return found, voxels.tsdf, voxels.weight, voxels.color, i, j, k
+        return impl
+
+
+@njit(cache=True)
+def load_voxel(voxels, i, j, k):
+    """Load the tsdf and weight of a voxel from raycast storage, such as DenseVoxels.
+
+    Args:
+        voxels (tuple): Raycast storage of a volume.
+        i (int): x voxel grid coordinate.
+        j (int): y voxel grid coordinate.
+        k (int): z voxel grid coordinate.
+
+    Returns:
+        float: Decoded tsdf value, 1 if the voxel is not held.
+        float: Weight, 0 if the voxel is not held.
+    """
+    found, tsdf_block, weight_block, _, li, lj, lk = load_block(voxels, i, j, k)
+    if not found:
+        return 1., 0.
+    return np.float64(load_tsdf(tsdf_block[li, lj, lk])), np.float64(weight_block[li, lj, lk])
+
+
+@njit(cache=True)
+def load_voxel_color(voxels, i, j, k, c):
+    """Load a color channel of a voxel from raycast storage, such as DenseVoxels.
+
+    Args:
+        voxels (tuple): Raycast storage of a volume.
+        i (int): x voxel grid coordinate.
+        j (int): y voxel grid coordinate.
+        k (int): z voxel grid coordinate.
+        c (int): Channel in the order r, g, then b.
+
+    Returns:
+        float: Color channel, 0 if the voxel is not held.
+    """
+    found, _, _, color_block, li, lj, lk = load_block(voxels, i, j, k)
+    if not found:
+        return 0.
+    return np.float64(color_block[li, lj, lk, c])
+
+
+@njit(cache=True)
+def interpolate_tsdf(voxels, x, y, z):
+    """Trilinearly interpolate the tsdf at a point in voxel grid coordinates.
+
+    Args:
+        voxels (tuple): Raycast storage of a volume, such as DenseVoxels.
+        x (float): x voxel grid coordinate.
+        y (float): y voxel grid coordinate.
+        z (float): z voxel grid coordinate.
+
+    Returns:
+        float: Interpolated tsdf value, 1 if it is not valid.
+        bool: False if the point is next to a voxel that is unobserved or not stored.
+    """
+    i, j, k = int(np.floor(x)), int(np.floor(y)), int(np.floor(z))
+    fx, fy, fz = x - i, y - j, z - k
+    found, tsdf_block, weight_block, _, li, lj, lk = load_block(voxels, i, j, k)
+    if not found:
+        return 1., False
+
+    # corners in the block of the first one are read from it without further lookups
+    size_x, size_y, size_z = tsdf_block.shape
+    value = 0.
+    for di in range(2):
+        for dj in range(2):
+            for dk in range(2):
+                if li + di < size_x and lj + dj < size_y and lk + dk < size_z:
+                    weight = weight_block[li + di, lj + dj, lk + dk]
+                    tsdf = load_tsdf(tsdf_block[li + di, lj + dj, lk + dk])
+                else:
+                    tsdf, weight = load_voxel(voxels, i + di, j + dj, k + dk)
+                if weight == 0:
+                    return 1., False
+                w = (fx if di else 1. - fx) * (fy if dj else 1. - fy) * (fz if dk else 1. - fz)
+                value += w * tsdf
+    return value, True
+
+
+@njit(cache=True)
+def tsdf_gradient(voxels, x, y, z, out):
+    """Estimate the tsdf gradient at a point in voxel grid coordinates by central differences
+        half a voxel apart, which stay inside the truncation band behind the surface.
+
+    Args:
+        voxels (tuple): Raycast storage of a volume, such as DenseVoxels.
+        x (float): x voxel grid coordinate.
+        y (float): y voxel grid coordinate.
+        z (float): z voxel grid coordinate.
+        out (numpy.array [3, ]): Output gradient.
+
+    Returns:
+        bool: False if a difference reaches outside the observed voxels.
+    """
+    for a in range(3):
+        dx, dy, dz = 0.5 * (a == 0), 0.5 * (a == 1), 0.5 * (a == 2)
+        forward, forward_valid = interpolate_tsdf(voxels, x + dx, y + dy, z + dz)
+        backward, backward_valid = interpolate_tsdf(voxels, x - dx, y - dy, z - dz)
+        if not (forward_valid and backward_valid):
+            return False
+        out[a] = forward - backward
+    return True
+
+
+@njit(cache=True)
+def interpolate_color(voxels, x, y, z, out):
+    """Trilinearly interpolate the color at a point between stored voxels.
+
+    Args:
+        voxels (tuple): Raycast storage of a volume, such as DenseVoxels.
+        x (float): x voxel grid coordinate.
+        y (float): y voxel grid coordinate.
+        z (float): z voxel grid coordinate.
+        out (numpy.array [3, ]): Output rgb color.
+    """
+    i, j, k = int(np.floor(x)), int(np.floor(y)), int(np.floor(z))
+    fx, fy, fz = x - i, y - j, z - k
+    out[:] = 0.
+    for di in range(2):
+        for dj in range(2):
+            for dk in range(2):
+                w = (fx if di else 1. - fx) * (fy if dj else 1. - fy) * (fz if dk else 1. - fz)
+                for c in range(3):
+                    out[c] += w * load_voxel_color(voxels, i + di, j + dj, k + dk, c)
 
 
 class TSDFVolume:
     """Volumetric TSDF Fusion of RGB-D Images.
     """
 
-    def __init__(self, volume_bounds, voxel_size):
+    def __init__(self, volume_bounds, voxel_size, fused=True, block_size=8,
+                 tsdf_dtype=np.float32, weight_dtype=np.float32, color_dtype=np.float32,
+                 memory_budget=None, color_policy='mean', color_alpha=0.2):
         """Initialize tsdf volume instance variables.
 
         Args:
             volume_bounds (numpy.array [3, 2]): rows index [x, y, z] and cols index [min_bound, max_bound].
                 Note: units are in meters.
+            voxel_size (float): The side length of each voxel in meters. None to use the
+                finest voxel size that fits in the memory budget.
+            fused (bool, optional): Integrate with the single-pass numba kernel. If False,
+                use the step-by-step numpy pipeline. Defaults to True.
+            block_size (int, optional): The side length in voxels of the blocks that are
+                culled against the camera frustum together. Defaults to 8.
+            tsdf_dtype (numpy.dtype, optional): Storage type of the tsdf: float32, float16,
+                or int16 fixed point. Defaults to float32.
+            weight_dtype (numpy.dtype, optional): Storage type of the weights: float32, or
+                uint8 or uint16 saturating at their maximum. Defaults to float32.
+            color_dtype (numpy.dtype, optional): Storage type of the colors: float32 or uint8.
+                Defaults to float32.
+            memory_budget (int, optional): Maximum bytes of voxel storage, see
+                estimate_storage_bytes. Defaults to None for no budget.
+            color_policy (str, optional): How observed colors are blended into voxels:
+                'mean' for the weighted mean of all observations, 'max_weight' to keep the
+                color unless an observation outweighs all the previous ones together, or
+                'ema' for an exponential moving average. Defaults to 'mean'.
+            color_alpha (float, optional): Weight of each observation in the exponential
+                moving average, in (0, 1]. Defaults to 0.2.
+
+        Raises:
+            ValueError: If volume bounds are not the correct shape.
+            ValueError: If voxel size is not positive, or None without a memory budget.
+            ValueError: If block size is not positive.
+            ValueError: If a storage type is not supported.
+            ValueError: If the storage does not fit in the memory budget.
+            ValueError: If the color policy or alpha is not supported.
+        """
+        if memory_budget is not None:
+            voxel_size = self.check_memory_budget(volume_bounds, voxel_size, memory_budget, block_size,
+                                                  tsdf_dtype, weight_dtype, color_dtype)
+        elif voxel_size is None:
+            raise ValueError('voxel size must be given without a memory budget.')
+
+        self._init_geometry(volume_bounds, voxel_size, fused, block_size,
+                            tsdf_dtype, weight_dtype, color_dtype)
+        self._set_color_policy(color_policy, color_alpha)
+        self._allocate_volumes()
+
+    def _set_color_policy(self, color_policy, color_alpha):
+        """Validate and set how observed colors are blended into voxels.
+
+        Args:
+            color_policy (str): One of COLOR_POLICIES.
+            color_alpha (float): Weight of each observation in the exponential moving average.
+
+        Raises:
+            ValueError: If the color policy or alpha is not supported.
+        """
+        if color_policy not in COLOR_POLICIES:
+            raise ValueError('color policy must be one of {}.'.format(', '.join(COLOR_POLICIES)))
+        if not 0. < color_alpha <= 1.:
+            raise ValueError('color alpha must be in (0, 1].')
+
+        self._color_policy_name = color_policy
+        self._color_policy = COLOR_POLICIES[color_policy]
+        self._color_alpha = float(color_alpha)
+
+    @staticmethod
+    def estimate_storage_bytes(volume_bounds, voxel_size, block_size=8,
+                               tsdf_dtype=np.float32, weight_dtype=np.float32, color_dtype=np.float32):
+        """Estimate the bytes of the voxel storage a dense volume allocates up front:
+            the tsdf, weight and color volumes and the dirty block flags.
+
+        Args:
+            volume_bounds (numpy.array [3, 2]): rows index [x, y, z] and cols index [min_bound, max_bound].
             voxel_size (float): The side length of each voxel in meters.
+            block_size (int, optional): The side length of each voxel block in voxels. Defaults to 8.
+            tsdf_dtype (numpy.dtype, optional): Storage type of the tsdf. Defaults to float32.
+            weight_dtype (numpy.dtype, optional): Storage type of the weights. Defaults to float32.
+            color_dtype (numpy.dtype, optional): Storage type of the colors. Defaults to float32.
+
+        Returns:
+            int: Storage bytes.
+        """
+        volume_bounds = np.asarray(volume_bounds)
+        voxel_bounds = np.ceil((volume_bounds[:, 1] - volume_bounds[:, 0]) / voxel_size).astype(int)
+        block_bounds = -(-voxel_bounds // block_size)
+        return (int(np.prod(voxel_bounds)) * get_voxel_bytes(tsdf_dtype, weight_dtype, color_dtype)
+                + int(np.prod(block_bounds)))
+
+    @classmethod
+    def check_memory_budget(cls, volume_bounds, voxel_size, memory_budget, block_size=8,
+                            tsdf_dtype=np.float32, weight_dtype=np.float32, color_dtype=np.float32):
+        """Pick the voxel size of a volume under a memory budget: the finest voxel size
+            whose storage fits, or the given one if it fits.
+
+        Args:
+            volume_bounds (numpy.array [3, 2]): rows index [x, y, z] and cols index [min_bound, max_bound].
+            voxel_size (float): The requested side length of each voxel in meters, or None
+                for the finest one that fits.
+            memory_budget (int): Maximum bytes of voxel storage.
+            block_size (int, optional): The side length of each voxel block in voxels. Defaults to 8.
+            tsdf_dtype (numpy.dtype, optional): Storage type of the tsdf. Defaults to float32.
+            weight_dtype (numpy.dtype, optional): Storage type of the weights. Defaults to float32.
+            color_dtype (numpy.dtype, optional): Storage type of the colors. Defaults to float32.
 
         Raises:
             ValueError: If volume bounds are not the correct shape.
-            ValueError: If voxel size is not positive.
+            ValueError: If the requested voxel size does not fit in the budget, or no voxel size does.
+
+        Returns:
+            float: The voxel size.
+        """
+        volume_bounds = np.asarray(volume_bounds, dtype=float)
+        if volume_bounds.shape != (3, 2):
+            raise ValueError('volume_bounds should be of shape (3, 2).')
+        storage_args = (block_size, tsdf_dtype, weight_dtype, color_dtype)
+
+        if voxel_size is not None:
+            num_bytes = cls.estimate_storage_bytes(volume_bounds, voxel_size, *storage_args)
+            if num_bytes > memory_budget:
+                raise ValueError('voxel size {} needs {:,} bytes of storage, over the memory budget of {:,} bytes.'.format(
+                    voxel_size, num_bytes, int(memory_budget)))
+            return voxel_size
+
+        # a single voxel spanning the whole volume is the coarsest grid
+        extent = volume_bounds[:, 1] - volume_bounds[:, 0]
+        if cls.estimate_storage_bytes(volume_bounds, extent.max(), *storage_args) > memory_budget:
+            raise ValueError('memory budget of {:,} bytes does not fit a single voxel.'.format(int(memory_budget)))
+
+        # the number of voxels is about the volume over the cubed voxel size; grow it
+        # from that estimate until rounding the grid up to whole voxels fits as well
+        voxel_bytes = get_voxel_bytes(tsdf_dtype, weight_dtype, color_dtype)
+        voxel_size = max(float(np.cbrt(np.prod(extent) * voxel_bytes / memory_budget)), 1e-6)
+        while cls.estimate_storage_bytes(volume_bounds, voxel_size, *storage_args) > memory_budget:
+            voxel_size *= 1.001
+        return voxel_size
+
+    def _init_geometry(self, volume_bounds, voxel_size, fused, block_size,
+                       tsdf_dtype, weight_dtype, color_dtype):
+        """Validate the arguments of __init__ and set up the voxel grid geometry.
         """
         volume_bounds = np.asarray(volume_bounds)
         if volume_bounds.shape != (3, 2):
@@ -26,11 +548,22 @@ class TSDFVolume:
         if voxel_size <= 0.0:
             raise ValueError('voxel size must be positive.')
 
+        if block_size <= 0:
+            raise ValueError('block size must be positive.')
+
+        self._tsdf_dtype, self._weight_dtype, self._color_dtype = check_storage_dtypes(
+            tsdf_dtype, weight_dtype, color_dtype)
+
         # Define voxel volume parameters
         self._volume_bounds = volume_bounds
         self._voxel_size = float(voxel_size)
+        self._fused = fused
+        self._block_size = int(block_size)
         self._truncation_margin = 2 * self._voxel_size  # truncation on SDF (max alowable distance away from a surface)
 
+        # integration stats, recorded only after enable_stats
+        self._stats = None
+
         # Adjust volume bounds and ensure C-order contiguous
         # and calculate voxel bounds taking the voxel size into consideration
         self._voxel_bounds = np.ceil(
@@ -41,33 +574,83 @@ class TSDFVolume:
         # volume min bound is the origin of the volume in world coordinates
         self._volume_origin = self._volume_bounds[:, 0].copy(order='C').astype(np.float32)
 
+        # blocks of voxels are culled against the camera frustum together
+        self._block_bounds = -(-self._voxel_bounds // self._block_size)
+
         print('Voxel volume size: {} x {} x {} - # voxels: {:,}'.format(
             self._voxel_bounds[0],
             self._voxel_bounds[1],
             self._voxel_bounds[2],
             self._voxel_bounds[0] * self._voxel_bounds[1] * self._voxel_bounds[2]))
 
-        # Initialize pointers to voxel volume in memory
-        self._tsdf_volume = np.ones(self._voxel_bounds).astype(np.float32)
+    def _allocate_volumes(self):
+        """Allocate the voxel storage for the whole volume bounds.
+        """
+        self._check_dense_allocation()
+
+        # Initialize pointers to voxel volume in memory. Voxel grid coordinates are
+        # derived from the loop or flat indices wherever they are needed.
+        self._tsdf_volume = np.full(self._voxel_bounds, encode_tsdf(1., self._tsdf_dtype), dtype=self._tsdf_dtype)
 
         # for computing the cumulative moving average of observations per voxel
-        self._weight_volume = np.zeros(self._voxel_bounds).astype(np.float32)
+        self._weight_volume = np.zeros(self._voxel_bounds, dtype=self._weight_dtype)
         color_bounds = np.append(self._voxel_bounds, 3)
-        self._color_volume = np.zeros(color_bounds).astype(np.float32)  # rgb order
-
-        # Get voxel grid coordinates
-        xv, yv, zv = np.meshgrid(
-            range(self._voxel_bounds[0]),
-            range(self._voxel_bounds[1]),
-            range(self._voxel_bounds[2]),
-            indexing='ij')
-        self._voxel_coords = np.concatenate([
-            xv.reshape(1, -1),
-            yv.reshape(1, -1),
-            zv.reshape(1, -1)], axis=0).astype(int).T
+        self._color_volume = np.zeros(color_bounds, dtype=self._color_dtype)  # rgb order
+
+        # blocks updated since their mesh was last extracted, and the cached block meshes
+        self._dirty_blocks = np.zeros(self._block_bounds, dtype=bool)
+        self._block_meshes = {}
+
+    def _check_dense_allocation(self):
+        """Print the bytes of voxel storage about to be allocated for the whole volume bounds,
+            and warn if they exceed the memory available to the process.
+        """
+        num_bytes = (int(np.prod(self._voxel_bounds)) * get_voxel_bytes(
+            self._tsdf_dtype, self._weight_dtype, self._color_dtype) + int(np.prod(self._block_bounds)))
+        print('Voxel storage: {:.1f} MB'.format(num_bytes / 2 ** 20))
+        self._check_available_memory(num_bytes)
+
+    @staticmethod
+    def _check_available_memory(num_bytes):
+        """Warn if an allocation exceeds the memory available to the process.
+
+        Args:
+            num_bytes (int): Bytes about to be allocated.
+        """
+        available = get_available_bytes()
+        if available is not None and num_bytes > available:
+            warnings.warn('allocating {:,} bytes of voxel storage with only {:,} bytes of memory '
+                          'available.'.format(int(num_bytes), available), RuntimeWarning, stacklevel=3)
+
+    def _get_storage_bytes(self):
+        """Get the bytes of the arrays holding the voxel storage of the volume.
+
+        Returns:
+            dict: Bytes of each storage array by name.
+        """
+        return {name: int(array.nbytes) for name, array in [
+            ('tsdf', self._tsdf_volume), ('weight', self._weight_volume), ('color', self._color_volume),
+            ('dirty_blocks', self._dirty_blocks)]}
+
+    def get_memory_report(self):
+        """Report the memory used by the volume and by this process. Arrays memory-mapped
+            by load count in full, although only the pages read are resident.
+
+        Returns:
+            dict: 'arrays' with the bytes of each storage array and of the cached block
+                meshes, their 'total', and the 'resident' and 'peak_resident' bytes of the
+                process. Resident bytes are None where /proc is not available.
+        """
+        arrays = self._get_storage_bytes()
+        arrays['block_meshes'] = int(sum(array.nbytes for mesh in self._block_meshes.values() for array in mesh))
+        return {'arrays': arrays,
+                'total': sum(arrays.values()),
+                'resident': get_resident_bytes(),
+                'peak_resident': get_peak_resident_bytes()}
 
     def get_volume(self):
         """Get the tsdf and color volumes.
+            Compact storage types are decoded to float32 copies.
 
         Returns:
             numpy.array [l, w, h]: l, w, h are the dimensions of the voxel grid in voxel space.
@@ -75,17 +658,292 @@ class TSDFVolume:
             numpy.array [l, w, h, 3]: l, w, h are the dimensions of the voxel grid in voxel space.
                 3 is the channel number in the order r, g, then b.
         """
-        return self._tsdf_volume, self._color_volume
+        return decode_tsdf(self._tsdf_volume), self._color_volume.astype(np.float32, copy=False)
 
-    def get_mesh(self):
+    def enable_stats(self, history_size=1000):
+        """Start recording integration stats: wall time per stage, numbers of voxels
+            projected, valid and updated, and the latency of each frame. Previous
+            stats are discarded. While disabled, integrate only checks a flag per stage.
+
+        Args:
+            history_size (int, optional): Number of most recent frame latencies kept
+                for the percentiles. Defaults to 1000.
+
+        Raises:
+            ValueError: If history size is not positive.
+        """
+        self._stats = IntegrationStats(history_size)
+
+    def disable_stats(self):
+        """Stop recording integration stats and discard them.
+        """
+        self._stats = None
+
+    def get_stats(self):
+        """Get the integration stats recorded since enable_stats.
+            The staged pipeline records the voxel_to_world, transform, projection,
+            valid_points, tsdf_update and color_update stages; the fused kernel updates
+            every voxel in a single pass, recorded as the fused_kernel stage, and does not
+            count valid voxels separately. Culling the blocks in the frustum is recorded
+            as the culling stage.
+
+        Returns:
+            dict: Number of frames, total seconds per stage, voxel counters, and p50, p95
+                and p99 frame latencies in seconds. None if stats are disabled.
+        """
+        if self._stats is None:
+            return None
+        return self._stats.get_summary()
+
+    def _time_stage(self, stage):
+        """Context manager that times a stage of integrate if stats are enabled.
+        """
+        if self._stats is None:
+            return _NO_STATS
+        return self._stats.time_stage(stage)
+
+    def _time_frame(self):
+        """Context manager that records the latency of a frame if stats are enabled.
+        """
+        if self._stats is None:
+            return _NO_STATS
+        return self._stats.time_frame()
+
+    def _count_block_voxels(self, block_coords, num_updated):
+        """Count the voxels of integrated blocks and the voxels updated, if stats are enabled.
+            Used where the voxels are not projected by the staged pipeline, which counts its own.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the integrated voxel blocks.
+            num_updated (int): Number of voxels updated.
+        """
+        if self._stats is None:
+            return
+        block_min = block_coords * self._block_size
+        block_max = np.minimum(block_min + self._block_size, self._voxel_bounds)
+        self._stats.count('voxels_projected', np.prod(block_max - block_min, axis=1).sum())
+        self._stats.count('voxels_updated', num_updated)
+
+    def save(self, path):
+        """Save the volume to a directory of .npy files and a meta.json with the
+            grid geometry, so it can be memory-mapped back by load.
+
+        Args:
+            path (str): Output directory. It is created if it does not exist.
+        """
+        os.makedirs(path, exist_ok=True)
+        self._save_volumes(path)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(self._get_metadata(), f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r+', fused=True):
+        """Load a volume saved by save without reading the voxel storage into memory.
+            All blocks are marked dirty, so the first incremental mesh extraction
+            covers the whole volume.
+
+        Args:
+            path (str): Directory written by save.
+            mmap_mode (str, optional): numpy.memmap mode: 'r+' writes further integration
+                through to the files, 'c' keeps it in memory, 'r' is read-only and only
+                allows inspection. None reads the files into memory. Defaults to 'r+'.
+            fused (bool, optional): Integrate with the single-pass numba kernel. Defaults to True.
+
+        Raises:
+            ValueError: If the directory holds a different kind of volume, or its storage
+                does not match meta.json.
+
+        Returns:
+            TSDFVolume: The loaded volume.
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['type'] != cls.__name__:
+            raise ValueError('{} holds a {}, not a {}.'.format(path, meta['type'], cls.__name__))
+
+        # the saved bounds are already a whole number of voxels; shrink them by half
+        # a voxel so that rounding up cannot add a voxel
+        volume_bounds = np.array(meta['volume_bounds'])
+        volume_bounds[:, 1] -= meta['voxel_size'] / 2
+
+        volume = cls.__new__(cls)
+        volume._init_geometry(volume_bounds, meta['voxel_size'], fused, meta['block_size'],
+                              meta['tsdf_dtype'], meta['weight_dtype'], meta['color_dtype'])
+        volume._truncation_margin = meta['truncation_margin']
+        volume._set_color_policy(meta.get('color_policy', 'mean'), meta.get('color_alpha', 0.2))
+        volume._load_volumes(path, meta, mmap_mode)
+        return volume
+
+    @classmethod
+    def warmup(cls, mesh=False, raycast=False, **kwargs):
+        """Compile the numba kernels a volume of this type uses, or load them from numba's
+            on-disk cache, by fusing a tiny synthetic frame. Call this while the camera
+            starts up so that the first real frame does not pay for compilation.
+            Frames are assumed to be uint8 rgb and float64 depth images, as read by image.py.
+
+        Args:
+            mesh (bool, optional): Also warm up incremental mesh extraction. Defaults to False.
+            raycast (bool, optional): Also warm up raycasting. Defaults to False.
+            **kwargs: Constructor arguments of the volumes to warm up for, such as fused,
+                block_size and the storage types.
+        """
+        size = 8
+        color_image = np.zeros((size, size, 3), dtype=np.uint8)
+        depth_image = np.ones((size, size))
+        camera_intrinsics = np.array([[size, 0., size / 2], [0., size, size / 2], [0., 0., 1.]])
+        camera_pose = np.eye(4)
+
+        volume = cls(np.array([[-0.1, 0.1], [-0.1, 0.1], [0.9, 1.1]]), 0.05, **kwargs)
+        volume.integrate(color_image, depth_image, camera_intrinsics, camera_pose)
+        if mesh:
+            volume.get_mesh(incremental=True)
+        if raycast:
+            volume.raycast(camera_intrinsics, camera_pose, size, size)
+
+    def _get_metadata(self):
+        """Get the description of the volume that save writes to meta.json.
+
+        Returns:
+            dict: Volume type, grid geometry, storage types and color policy.
+        """
+        return {
+            'type': type(self).__name__,
+            'volume_bounds': self._volume_bounds.tolist(),
+            'voxel_size': self._voxel_size,
+            'truncation_margin': self._truncation_margin,
+            'block_size': self._block_size,
+            'tsdf_dtype': self._tsdf_dtype.name,
+            'weight_dtype': self._weight_dtype.name,
+            'color_dtype': self._color_dtype.name,
+            'color_policy': self._color_policy_name,
+            'color_alpha': self._color_alpha,
+        }
+
+    def _save_volumes(self, path):
+        """Save the voxel storage to .npy files in a directory.
+        """
+        save_voxel_array(os.path.join(path, 'tsdf.npy'), self._tsdf_volume)
+        save_voxel_array(os.path.join(path, 'weight.npy'), self._weight_volume)
+        save_voxel_array(os.path.join(path, 'color.npy'), self._color_volume)
+
+    def _load_volumes(self, path, meta, mmap_mode):
+        """Map the voxel storage saved by _save_volumes.
+        """
+        self._tsdf_volume = load_voxel_array(os.path.join(path, 'tsdf.npy'), mmap_mode)
+        self._weight_volume = load_voxel_array(os.path.join(path, 'weight.npy'), mmap_mode)
+        self._color_volume = load_voxel_array(os.path.join(path, 'color.npy'), mmap_mode)
+        if self._tsdf_volume.shape != tuple(self._voxel_bounds):
+            raise ValueError('{} does not match the volume bounds in meta.json.'.format(path))
+
+        self._dirty_blocks = np.ones(self._block_bounds, dtype=bool)
+        self._block_meshes = {}
+
+    def merge(self, other):
+        """Merge a volume fused from other observations into this one. The tsdf is a
+            weighted running average and is merged by weight. Colors are blended with the
+            color policy of the volumes, taking each voxel of the other volume as a single
+            observation with its accumulated weight. With the 'mean' policy, the result
+            matches fusing both sets of observations into one volume, up to rounding of
+            the stored values. The 'max_weight' policy keeps the color of the volume that
+            observed a voxel with more weight, and 'ema' moves the color towards the other
+            volume's by the alpha of the average once, so their results depend on the order
+            of the observations.
+
+        Args:
+            other (TSDFVolume): Volume with the same grid geometry, truncation margin and
+                color policy.
+
+        Raises:
+            ValueError: If the volumes do not share the same grid, or their storage layouts
+                cannot be merged.
+            ValueError: If the volumes do not blend colors with the same policy and alpha.
+        """
+        if (not np.allclose(self._volume_bounds, other._volume_bounds)
+                or not np.array_equal(self._voxel_bounds, other._voxel_bounds)
+                or self._voxel_size != other._voxel_size
+                or self._truncation_margin != other._truncation_margin):
+            raise ValueError('merged volumes must have the same grid and truncation margin.')
+        if self._color_policy != other._color_policy or (
+                self._color_policy_name == 'ema' and self._color_alpha != other._color_alpha):
+            raise ValueError('merged volumes must have the same color policy and alpha.')
+        self._merge_storage(other)
+
+    def _merge_storage(self, other):
+        """Merge the voxel storage of a volume with the same grid into this one.
+        """
+        other_tsdf, other_weight, other_color = other._get_dense_storage()
+        self.merge_kernel(
+            kernel_view(self._tsdf_volume).reshape(1, -1),
+            self._weight_volume.reshape(1, -1),
+            self._color_volume.reshape(1, -1, 3),
+            kernel_view(other_tsdf).reshape(1, -1),
+            other_weight.reshape(1, -1),
+            other_color.reshape(1, -1, 3),
+            np.zeros(1, dtype=np.int64), self._color_policy, self._color_alpha)
+
+        # mark the blocks that received observations
+        s = self._block_size
+        observed = np.zeros(self._block_bounds * s, dtype=bool)
+        observed[tuple(slice(0, n) for n in self._voxel_bounds)] = other_weight != 0
+        bx, by, bz = self._block_bounds
+        self._dirty_blocks |= observed.reshape(bx, s, by, s, bz, s).any(axis=(1, 3, 5))
+
+    @staticmethod
+    @njit(parallel=True, nogil=True, cache=True)
+    def merge_kernel(tsdf_rows, weight_rows, color_rows, other_tsdf_rows, other_weight_rows,
+                     other_color_rows, row_map, color_policy, color_alpha):
+        """ Merge voxel storage by weight, row by row. Colors are blended as one observation
+            with the weight of the merged voxel, see blend_color.
+
+        Args:
+            tsdf_rows (numpy.array [r, n]): tsdf storage to merge into, see kernel_view.
+            weight_rows (numpy.array [r, n]): Weight storage to merge into.
+            color_rows (numpy.array [r, n, 3]): Color storage to merge into.
+            other_tsdf_rows (numpy.array [q, n]): tsdf storage to merge, see kernel_view.
+            other_weight_rows (numpy.array [q, n]): Weight storage to merge.
+            other_color_rows (numpy.array [q, n, 3]): Color storage to merge.
+            row_map (numpy.array [q, ]): Row of the storage to merge into for each merged row.
+            color_policy (int): Color blending policy, a value of COLOR_POLICIES.
+            color_alpha (float): Weight of the merged colors in the exponential moving average.
+        """
+        n = tsdf_rows.shape[1]
+        for q in range(row_map.shape[0]):
+            r = row_map[q]
+            for i in prange(n):
+                w_other = np.float64(other_weight_rows[q, i])
+                if w_other == 0:
+                    continue
+                w_old = np.float64(weight_rows[r, i])
+                w_new = w_old + w_other
+                tsdf_new = (w_old * load_tsdf(tsdf_rows[r, i]) + w_other * load_tsdf(other_tsdf_rows[q, i])) / w_new
+                store_tsdf(tsdf_rows[r], i, tsdf_new)
+                store_weight(weight_rows[r], i, w_new)
+                for c in range(3):
+                    color_rows[r, i, c] = blend_color(color_rows[r, i, c], other_color_rows[q, i, c],
+                                                      w_old, w_other, color_policy, color_alpha)
+
+    def get_mesh(self, incremental=False):
         """ Run marching cubes over the constructed tsdf volume to get a mesh representation.
 
+        Args:
+            incremental (bool, optional): Re-mesh only the blocks updated since the last
+                incremental extraction, reusing cached meshes of the other blocks. Vertices
+                are the same as for a full extraction, up to order. Defaults to False.
+
         Returns:
             numpy.array [n, 3]: each row represents a 3D point.
             numpy.array [k, 3]: each row is a list of point indices used to render triangles.
             numpy.array [n, 3]: each row represents the normal vector for the corresponding 3D point.
             numpy.array [n, 3]: each row represents the color of the corresponding 3D point.
         """
+        if incremental:
+            self.update_block_meshes()
+            voxel_points, triangles, normals, colors = weld_meshes(list(self._block_meshes.values()))
+            points = self.voxel_to_world(self._volume_origin, voxel_points, self._voxel_size)
+            return points, triangles, normals, np.floor(colors).astype(np.uint8)
+
+        from skimage import measure
+
         tsdf_volume, color_vol = self.get_volume()
 
         # Marching cubes
@@ -103,6 +961,401 @@ class TSDFVolume:
 
         return points, triangles, normals, colors
 
+    def get_dirty_blocks(self):
+        """ Get the blocks whose meshes are out of date. Besides the updated blocks,
+            these include the blocks whose meshes reach into an updated neighbor.
+
+        Returns:
+            numpy.array [b, 3]: Coordinates of the voxel blocks to re-mesh.
+        """
+        dirty = self._dirty_blocks.copy()
+        bx, by, bz = self._block_bounds
+        for ox, oy, oz in itertools.product((0, 1), repeat=3):
+            dirty[:bx - ox, :by - oy, :bz - oz] |= self._dirty_blocks[ox:, oy:, oz:]
+        return np.argwhere(dirty)
+
+    @staticmethod
+    @njit(parallel=True, cache=True)
+    def blocks_crossing_surface(tsdf_volume, block_coords, block_size):
+        """ Test which voxel blocks, padded with the first voxel layer of their
+            +x, +y and +z neighbors, cross the zero level set.
+
+        Args:
+            tsdf_volume (numpy.array [l, w, h]): The tsdf volume, see kernel_view.
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks.
+            block_size (int): The side length of each voxel block in voxels.
+
+        Returns:
+            numpy.array [b, ]: True for the blocks that may contain a surface.
+        """
+        size_x, size_y, size_z = tsdf_volume.shape
+        crossing = np.zeros(block_coords.shape[0], dtype=np.bool_)
+        for b in prange(block_coords.shape[0]):
+            i_start = block_coords[b, 0] * block_size
+            j_start = block_coords[b, 1] * block_size
+            k_start = block_coords[b, 2] * block_size
+            has_positive = False
+            has_negative = False
+            for i in range(i_start, min(i_start + block_size + 1, size_x)):
+                for j in range(j_start, min(j_start + block_size + 1, size_y)):
+                    for k in range(k_start, min(k_start + block_size + 1, size_z)):
+                        value = load_tsdf(tsdf_volume[i, j, k])
+                        has_positive = has_positive or value >= 0
+                        has_negative = has_negative or value <= 0
+            crossing[b] = has_positive and has_negative
+        return crossing
+
+    def update_block_meshes(self):
+        """ Re-mesh the dirty blocks and update the block mesh cache.
+        """
+        s = self._block_size
+        block_coords = self.get_dirty_blocks()
+
+        # most updated blocks are free space and have no mesh
+        crossing = self.blocks_crossing_surface(kernel_view(self._tsdf_volume), block_coords, s)
+        for block in map(tuple, block_coords[~crossing]):
+            self._block_meshes.pop(block, None)
+        block_coords = block_coords[crossing]
+
+        tsdf_blocks = []
+        color_blocks = []
+        for i, j, k in block_coords * s:
+            tsdf_blocks.append(decode_tsdf(self._tsdf_volume[i:i + s + 1, j:j + s + 1, k:k + s + 1]))
+            color_blocks.append(self._color_volume[i:i + s + 1, j:j + s + 1, k:k + s + 1])
+
+        meshes = marching_cubes_blocks(tsdf_blocks, color_blocks, block_coords * s)
+        for block, mesh in zip(map(tuple, block_coords), meshes):
+            if mesh is None:
+                self._block_meshes.pop(block, None)
+            else:
+                self._block_meshes[block] = mesh
+        self._dirty_blocks[:] = False
+
+    def _get_mesh_block_coords(self, keys):
+        """Get the voxel block coordinates of keys of the block mesh cache.
+
+        Args:
+            keys (list of tuple): Keys of the block mesh cache.
+
+        Returns:
+            numpy.array [b, 3]: Coordinates of the voxel blocks.
+        """
+        return np.array(keys, dtype=np.int64).reshape(-1, 3)
+
+    def get_mesh_chunks(self, chunk_size=None):
+        """ Extract the mesh in cubic chunks of voxel blocks, re-meshing the blocks updated
+            since the last extraction. Vertices are welded as in get_mesh: each chunk yields
+            only the vertices that no earlier chunk yielded, and its triangles index the
+            vertices of all the chunks so far.
+
+        Args:
+            chunk_size (int, optional): The side length of the chunks in voxel blocks.
+                Defaults to None for MESH_CHUNK_BLOCKS.
+
+        Yields:
+            tuple: (points, triangles, normals, colors) of each chunk, as returned by get_mesh.
+        """
+        chunk_size = MESH_CHUNK_BLOCKS if chunk_size is None else chunk_size
+        self.update_block_meshes()
+        keys = list(self._block_meshes)
+        if len(keys) == 0:
+            return
+
+        chunk_coords = self._get_mesh_block_coords(keys) // chunk_size
+        chunks, chunk_index = np.unique(chunk_coords, axis=0, return_inverse=True)
+        chunk_index = chunk_index.reshape(-1)
+        order = np.argsort(chunk_index, kind='stable')
+
+        # vertices on the faces between chunks, by weld key, with their index and the last
+        # chunk along x that has them. Chunks come in x order, so only the seams of the
+        # current and the next slab of chunks are kept
+        chunk_key_size = chunk_size * self._block_size * 10 ** WELD_DECIMALS
+        seam_vertices = {}
+        slab = chunks[0, 0]
+        num_vertices = 0
+        for chunk, chunk_keys in zip(chunks, np.split(order, np.cumsum(np.bincount(chunk_index))[:-1])):
+            if chunk[0] != slab:
+                slab = chunk[0]
+                seam_vertices = {key: value for key, value in seam_vertices.items() if value[1] >= slab}
+
+            voxel_points, triangles, normals, colors = weld_meshes(
+                [self._block_meshes[keys[i]] for i in chunk_keys])
+            weld_keys = get_weld_keys(voxel_points)
+            vertex_index = np.full(len(voxel_points), -1, dtype=np.int64)
+            on_seam = np.nonzero((weld_keys % chunk_key_size == 0).any(axis=1))[0]
+            for i in on_seam:
+                vertex_index[i] = seam_vertices.get(tuple(weld_keys[i]), (-1, 0))[0]
+            is_new = vertex_index < 0
+            vertex_index[is_new] = num_vertices + np.arange(np.count_nonzero(is_new))
+            num_vertices += np.count_nonzero(is_new)
+            for i in on_seam[is_new[on_seam]]:
+                seam_vertices[tuple(weld_keys[i])] = (vertex_index[i], weld_keys[i, 0] // chunk_key_size)
+
+            points = self.voxel_to_world(self._volume_origin, voxel_points[is_new], self._voxel_size)
+            yield points, vertex_index[triangles], normals[is_new], np.floor(colors[is_new]).astype(np.uint8)
+
+    def write_mesh(self, ply_path, ply_format='ascii', has_triangles=True, chunk_size=None):
+        """ Stream the mesh into a ply chunk by chunk, see get_mesh_chunks, without
+            assembling the whole mesh in memory. The ply holds the vertices and triangles
+            of get_mesh, up to order.
+
+        Args:
+            ply_path (str): Output ply path.
+            ply_format (str, optional): Body format, one of ply.PLY_FORMATS. Defaults to 'ascii'.
+            has_triangles (bool, optional): Whether to write the triangles, or only the
+                vertices as a point cloud. Defaults to True.
+            chunk_size (int, optional): The side length of the chunks in voxel blocks.
+                Defaults to None, see get_mesh_chunks.
+
+        Raises:
+            ValueError: If the format is not supported.
+
+        Returns:
+            int: Number of vertices written.
+            int: Number of triangles written.
+        """
+        with PlyWriter(ply_path, ply_format, has_triangles=has_triangles) as writer:
+            for points, triangles, normals, colors in self.get_mesh_chunks(chunk_size):
+                writer.write(points, None, normals, colors)
+                if has_triangles:
+                    writer.write_triangles(triangles)
+        return writer.num_vertices, writer.num_triangles
+
+    def _get_dense_storage(self):
+        """Get dense tsdf, weight and color storage over the volume bounds, e.g. to merge
+            the volume into a dense one. Backends without a dense grid assemble one.
+
+        Returns:
+            numpy.array [l, w, h]: The tsdf storage.
+            numpy.array [l, w, h]: The weight storage.
+            numpy.array [l, w, h, 3]: The color storage in RGB.
+        """
+        return self._tsdf_volume, self._weight_volume, self._color_volume
+
+    def get_raycast_frustum(self, camera_intrinsics, camera_pose, width, height, max_depth=None):
+        """ Compute the region of world space the rays of a rendered image can reach: the
+            camera frustum over the whole image, out to the maximum depth.
+
+        Args:
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            width (int): Image width.
+            height (int): Image height.
+            max_depth (float, optional): z depth of the far plane. Defaults to None for the
+                depth of the furthest corner of the volume bounds.
+
+        Returns:
+            numpy.array [5, 4]: Frustum planes in world coordinates, see camera_frustum_planes.
+                None if the volume is behind the camera.
+            numpy.array [3, 2]: World space bounding box of the frustum. None if the volume
+                is behind the camera.
+            float: z depth of the far plane.
+        """
+        if max_depth is None:
+            corners = np.array(list(itertools.product(*self._volume_bounds)))
+            max_depth = transform_point3s(transform_inverse(camera_pose), corners)[:, 2].max()
+        if max_depth <= 0:
+            return None, None, max_depth
+
+        image_bounds = np.array([[-0.5, width - 0.5], [-0.5, height - 0.5]])
+        world_planes, world_bounds = self.get_image_frustum(image_bounds, max_depth, camera_intrinsics, camera_pose)
+        return world_planes, world_bounds, max_depth
+
+    def get_voxel_box(self, block_coords, block_size=None):
+        """ Get the voxel grid box that the rays through a set of voxel blocks sample,
+            out to the neighboring voxels of the next blocks for the interpolation.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks.
+            block_size (int, optional): The side length of the blocks in voxels. Defaults to
+                the block size of the volume.
+
+        Returns:
+            numpy.array [3, 2]: rows index [x, y, z] and cols index [min_bound, max_bound]
+                of the box in voxel grid coordinates.
+        """
+        block_size = self._block_size if block_size is None else block_size
+        box_min = np.maximum(block_coords.min(axis=0) * block_size - 1, 0)
+        box_max = np.minimum((block_coords.max(axis=0) + 1) * block_size, self._voxel_bounds - 1)
+        return np.stack([box_min, box_max], axis=1).astype(np.float64)
+
+    def _get_raycast_voxels(self, world_planes, world_bounds):
+        """Get the storage the raycast kernel samples, and the box of the voxel blocks in
+            a frustum that it holds. Backends that cannot hold all of them at once yield
+            them in batches with disjoint boxes.
+
+        Args:
+            world_planes (numpy.array [p, 4]): Frustum planes in world coordinates.
+            world_bounds (numpy.array [3, 2]): World space bounding box of the frustum.
+
+        Yields:
+            DenseVoxels: The raycast storage. Nothing is yielded if no block is in the frustum.
+            numpy.array [3, 2]: Box of the blocks in the frustum, see get_voxel_box.
+        """
+        block_coords = self.get_frustum_blocks(world_planes, world_bounds)
+        if len(block_coords) == 0:
+            return
+        voxels = DenseVoxels(kernel_view(self._tsdf_volume), self._weight_volume, self._color_volume)
+        yield voxels, self.get_voxel_box(block_coords)
+
+    def raycast(self, camera_intrinsics, camera_pose, width, height, max_depth=None):
+        """ Render the volume from a camera by marching a ray through every pixel
+            to the first zero crossing of the tsdf. Rays only march through the voxel
+            blocks in the camera frustum that hold storage, so the cost does not grow
+            with the volume bounds.
+
+        Args:
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            width (int): Image width.
+            height (int): Image height.
+            max_depth (float, optional): z depth at which rays stop. Defaults to None for
+                the depth of the furthest corner of the volume bounds.
+
+        Returns:
+            numpy.array [h, w]: z depth image, 0 where the ray hits no surface.
+            numpy.array [h, w, 3]: rgb image.
+            numpy.array [h, w, 3]: Unit surface normals in world coordinates, 0 where
+                the ray hits no surface or the normal is undefined.
+        """
+        depth_image = np.zeros((height, width), dtype=np.float32)
+        color_image = np.zeros((height, width, 3), dtype=np.uint8)
+        normal_image = np.zeros((height, width, 3), dtype=np.float32)
+
+        world_planes, world_bounds, max_depth = self.get_raycast_frustum(
+            camera_intrinsics, camera_pose, width, height, max_depth)
+        if world_planes is None:
+            return depth_image, color_image, normal_image
+
+        camera_intrinsics = np.asarray(camera_intrinsics, dtype=np.float64)
+        camera_pose = np.asarray(camera_pose, dtype=np.float64)
+        for batch, (voxels, voxel_box) in enumerate(self._get_raycast_voxels(world_planes, world_bounds)):
+            if batch == 0:
+                self.raycast_kernel(
+                    voxels, voxel_box, self._volume_origin, self._voxel_size, self._truncation_margin,
+                    float(max_depth), camera_intrinsics, camera_pose, depth_image, color_image, normal_image)
+                continue
+
+            # later batches keep the hits in front of the ones found so far
+            batch_depth, batch_color, batch_normal = [np.zeros_like(image) for image in
+                                                      [depth_image, color_image, normal_image]]
+            self.raycast_kernel(
+                voxels, voxel_box, self._volume_origin, self._voxel_size, self._truncation_margin,
+                float(max_depth), camera_intrinsics, camera_pose, batch_depth, batch_color, batch_normal)
+            closer = (batch_depth > 0) & ((depth_image == 0) | (batch_depth < depth_image))
+            depth_image[closer] = batch_depth[closer]
+            color_image[closer] = batch_color[closer]
+            normal_image[closer] = batch_normal[closer]
+        return depth_image, color_image, normal_image
+
+    @staticmethod
+    @njit(parallel=True, cache=True)
+    def raycast_kernel(voxels, voxel_box, volume_origin, voxel_size, truncation_margin,
+                       max_depth, camera_intrinsics, camera_pose, depth_image, color_image, normal_image):
+        """ March the ray of every pixel through the voxel grid and write the first
+            positive to negative zero crossing into the output images.
+
+            Rays step by the distance to the surface that the tsdf guarantees, at
+            least one voxel, so free space is crossed in strides of the truncation
+            margin. Blocks without storage are crossed in a single step. Crossings
+            next to unobserved voxels are ignored.
+
+        Args:
+            voxels (tuple): Raycast storage of the volume, such as DenseVoxels.
+            voxel_box (numpy.array [3, 2]): Box in voxel grid coordinates that rays are clipped to.
+            volume_origin (numpy.array [3, ]): World coordinates of voxel (0, 0, 0).
+            voxel_size (float): The side length of each voxel in meters.
+            truncation_margin (float): Truncation on the SDF in meters.
+            max_depth (float): z depth at which rays stop.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            depth_image (numpy.array [h, w]): Output z depth image.
+            color_image (numpy.array [h, w, 3]): Output rgb image.
+            normal_image (numpy.array [h, w, 3]): Output normals in world coordinates.
+        """
+        height, width = depth_image.shape
+        fu, fv = camera_intrinsics[0, 0], camera_intrinsics[1, 1]
+        u0, v0 = camera_intrinsics[0, 2], camera_intrinsics[1, 2]
+        truncation_voxels = truncation_margin / voxel_size
+
+        # ray origin in voxel grid coordinates
+        origin = np.empty(3)
+        for a in range(3):
+            origin[a] = (camera_pose[a, 3] - volume_origin[a]) / voxel_size
+
+        for v in prange(height):
+            direction = np.empty(3)
+            point = np.empty(3)
+            color = np.empty(3)
+            gradient = np.empty(3)
+            for u in range(width):
+                # ray direction in voxel grid coordinates per meter of camera z
+                x, y = (u - u0) / fu, (v - v0) / fv
+                for a in range(3):
+                    direction[a] = (camera_pose[a, 0] * x + camera_pose[a, 1] * y + camera_pose[a, 2]) / voxel_size
+
+                # clip the ray to the box and the maximum depth
+                t_near, t_far = 0., max_depth
+                for a in range(3):
+                    if abs(direction[a]) < 1e-12:
+                        if origin[a] < voxel_box[a, 0] or origin[a] > voxel_box[a, 1]:
+                            t_far = -1.
+                        continue
+                    t0 = (voxel_box[a, 0] - origin[a]) / direction[a]
+                    t1 = (voxel_box[a, 1] - origin[a]) / direction[a]
+                    t_near = max(t_near, min(t0, t1))
+                    t_far = min(t_far, max(t0, t1))
+                if t_near >= t_far:
+                    continue
+
+                ray_length = np.sqrt(direction[0] ** 2 + direction[1] ** 2 + direction[2] ** 2)
+                t = t_near
+                previous_t, previous_value, previous_valid = t, 1., False
+                while t <= t_far:
+                    for a in range(3):
+                        point[a] = origin[a] + t * direction[a]
+
+                    found, tsdf_block, _, _, _, _, _ = load_block(
+                        voxels, int(np.floor(point[0])), int(np.floor(point[1])), int(np.floor(point[2])))
+                    if not found:
+                        # step just past the far side of the block, which holds no storage,
+                        # with the size of the block arrays that load_block gives instead
+                        t_exit = np.inf
+                        for a in range(3):
+                            block_size = tsdf_block.shape[a]
+                            block_start = np.floor(point[a] / block_size) * block_size
+                            if direction[a] > 1e-12:
+                                t_exit = min(t_exit, (block_start + block_size - origin[a]) / direction[a])
+                            elif direction[a] < -1e-12:
+                                t_exit = min(t_exit, (block_start - origin[a]) / direction[a])
+                        previous_t, previous_value, previous_valid = t, 1., False
+                        t = max(t_exit, t) + 1e-3 / ray_length
+                        continue
+
+                    value, valid = interpolate_tsdf(voxels, point[0], point[1], point[2])
+                    if valid and previous_valid and previous_value > 0 and value <= 0:
+                        t_hit = previous_t + (t - previous_t) * previous_value / (previous_value - value)
+                        for a in range(3):
+                            point[a] = origin[a] + t_hit * direction[a]
+                        depth_image[v, u] = t_hit
+                        interpolate_color(voxels, point[0], point[1], point[2], color)
+                        for c in range(3):
+                            color_image[v, u, c] = min(255., np.floor(color[c]))
+
+                        # the tsdf gradient points out of the surface
+                        if tsdf_gradient(voxels, point[0], point[1], point[2], gradient):
+                            norm = np.sqrt(gradient[0] ** 2 + gradient[1] ** 2 + gradient[2] ** 2)
+                            if norm > 0:
+                                for a in range(3):
+                                    normal_image[v, u, a] = gradient[a] / norm
+                        break
+
+                    previous_t, previous_value, previous_valid = t, value, valid
+                    t += max(1., value * truncation_voxels) / ray_length
+                    # take the last sample where the ray leaves the box, not past it
+                    if t > t_far and previous_t < t_far:
+                        t = t_far
+
     """
     *******************************************************************************
     ****************************** ASSIGNMENT BEGINS ******************************
@@ -110,7 +1363,7 @@ class TSDFVolume:
     """
 
     @staticmethod
-    @njit(parallel=True)
+    @njit(parallel=True, cache=True)
     def voxel_to_world(volume_origin, voxel_coords, voxel_size):
         """ Convert from voxel coordinates to world coordinates
             (in effect scaling voxel_coords by voxel_size).
@@ -137,7 +1390,7 @@ class TSDFVolume:
         return world_points
 
     @staticmethod
-    @njit(parallel=True)
+    @njit(parallel=True, cache=True)
     def get_new_tsdf_and_weights(tsdf_old, margin_distance, w_old, observation_weight):
         """[summary]
 
@@ -165,6 +1418,276 @@ class TSDFVolume:
             #pass
         return tsdf_new, w_new
 
+    @staticmethod
+    @njit(parallel=True, nogil=True, cache=True)
+    def integrate_kernel(tsdf_volume, weight_volume, color_volume, block_coords, block_size,
+                         camera_origin, camera_steps, camera_intrinsics, depth_image, color_image,
+                         truncation_margin, observation_weight, color_policy=0, color_alpha=0.2):
+        """ Fuse an RGB-D observation into blocks of a dense voxel grid in a single pass.
+            Every voxel is transformed, projected, validated and updated in place,
+            without any temporaries proportional to the number of voxels.
+
+            The voxel to camera mapping is affine in the voxel coordinates, so camera
+            coordinates are swept along each row of voxels with additions only.
+
+        Args:
+            tsdf_volume (numpy.array [l, w, h]): The tsdf volume.
+            weight_volume (numpy.array [l, w, h]): The weight volume.
+            color_volume (numpy.array [l, w, h, 3]): The color volume in RGB.
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks to update.
+            block_size (int): The side length of each voxel block in voxels.
+            camera_origin (numpy.array [3, ]): Camera coordinates of voxel (0, 0, 0).
+            camera_steps (numpy.array [3, 3]): Row a is the change in camera coordinates
+                per voxel step along voxel axis a.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            depth_image (numpy.array [h, w]): A z depth image.
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            truncation_margin (float): Truncation on the SDF in meters.
+            observation_weight (float): The weight to assign for the current observation.
+            color_policy (int, optional): Color blending policy, a value of COLOR_POLICIES.
+                Defaults to the weighted mean.
+            color_alpha (float, optional): Weight of the observation in the exponential
+                moving average of colors. Defaults to 0.2.
+
+        Returns:
+            int: Number of voxels updated.
+        """
+        size_x, size_y, size_z = tsdf_volume.shape
+        tsdf_flat = tsdf_volume.reshape(-1)
+        weight_flat = weight_volume.reshape(-1)
+        color_flat = color_volume.reshape((-1, 3))
+        step_x, step_y, step_z = camera_steps[0], camera_steps[1], camera_steps[2]
+
+        num_updated = 0
+        for b in prange(block_coords.shape[0]):
+            i_start = block_coords[b, 0] * block_size
+            j_start = block_coords[b, 1] * block_size
+            k_start = block_coords[b, 2] * block_size
+            k_end = min(k_start + block_size, size_z)
+            for i in range(i_start, min(i_start + block_size, size_x)):
+                for j in range(j_start, min(j_start + block_size, size_y)):
+                    # camera coordinates of the first voxel in the row
+                    camera_x = camera_origin[0] + i * step_x[0] + j * step_y[0] + k_start * step_z[0]
+                    camera_y = camera_origin[1] + i * step_x[1] + j * step_y[1] + k_start * step_z[1]
+                    camera_z = camera_origin[2] + i * step_x[2] + j * step_y[2] + k_start * step_z[2]
+                    index = (i * size_y + j) * size_z + k_start
+                    for k in range(k_start, k_end):
+                        if integrate_voxel(index, camera_x, camera_y, camera_z,
+                                           tsdf_flat, weight_flat, color_flat, depth_image, color_image,
+                                           camera_intrinsics, truncation_margin, observation_weight,
+                                           color_policy, color_alpha):
+                            num_updated += 1
+                        camera_x += step_z[0]
+                        camera_y += step_z[1]
+                        camera_z += step_z[2]
+                        index += 1
+        return num_updated
+
+    def get_camera_steps(self, camera_pose):
+        """ Express the voxel to camera mapping of an observation as an origin and per-axis steps.
+
+        Args:
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+
+        Returns:
+            numpy.array [3, ]: Camera coordinates of voxel (0, 0, 0).
+            numpy.array [3, 3]: Row a is the change in camera coordinates per voxel step along voxel axis a.
+        """
+        world_to_camera = transform_inverse(camera_pose)
+        rotation = world_to_camera[:3, :3]
+        camera_origin = rotation @ self._volume_origin + world_to_camera[:3, 3]
+        camera_steps = np.ascontiguousarray(rotation.T * self._voxel_size)
+        return camera_origin, camera_steps
+
+    def get_frustum_planes(self, depth_image, camera_intrinsics, camera_pose):
+        """ Compute the region of world space an observation can update.
+            This is the camera frustum over the pixels with valid depth, out to the truncation
+            margin behind the furthest depth. Its near plane is the camera center, since
+            free space in front of the observed surface is updated as well.
+
+        Args:
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+
+        Returns:
+            numpy.array [5, 4]: Frustum planes in world coordinates, see camera_frustum_planes.
+                None if the depth image has no valid depth.
+            numpy.array [3, 2]: World space bounding box of the frustum, rows index [x, y, z]
+                and cols index [min_bound, max_bound]. None if the depth image has no valid depth.
+        """
+        valid_v, valid_u = np.nonzero(depth_image > 0)
+        if len(valid_u) == 0:
+            return None, None
+
+        # voxels are assigned to the pixel they round to
+        image_bounds = np.array([[valid_u.min() - 0.5, valid_u.max() + 0.5],
+                                 [valid_v.min() - 0.5, valid_v.max() + 0.5]])
+        max_depth = depth_image[valid_v, valid_u].max() + self._truncation_margin
+        return self.get_image_frustum(image_bounds, max_depth, camera_intrinsics, camera_pose)
+
+    def get_image_frustum(self, image_bounds, max_depth, camera_intrinsics, camera_pose):
+        """ Compute the camera frustum over a region of the image in world space.
+
+        Args:
+            image_bounds (numpy.array [2, 2]): rows index [u, v] and cols index [min_bound, max_bound]
+                of the image region in (continuous) pixel coordinates.
+            max_depth (float): z depth of the far plane.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+
+        Returns:
+            numpy.array [5, 4]: Frustum planes in world coordinates, see camera_frustum_planes.
+            numpy.array [3, 2]: World space bounding box of the frustum, rows index [x, y, z]
+                and cols index [min_bound, max_bound].
+        """
+        camera_planes = camera_frustum_planes(camera_intrinsics, image_bounds, max_depth)
+
+        # a plane n . p + d = 0 in camera space is (R n) . p + d - (R n) . t = 0 in world space
+        rotation = camera_pose[:3, :3]
+        translation = camera_pose[:3, 3]
+        normals = camera_planes[:, :3] @ rotation.T
+        world_planes = np.hstack([normals, (camera_planes[:, 3] - normals @ translation)[:, None]])
+
+        # the frustum is spanned by the camera center and the corners of the far plane
+        corners = np.array([[u, v, 1.] for u in image_bounds[0] for v in image_bounds[1]])
+        corners[:, 0] = (corners[:, 0] - camera_intrinsics[0, 2]) / camera_intrinsics[0, 0] * max_depth
+        corners[:, 1] = (corners[:, 1] - camera_intrinsics[1, 2]) / camera_intrinsics[1, 1] * max_depth
+        corners[:, 2] = max_depth
+        corners = transform_point3s(camera_pose, np.vstack([np.zeros((1, 3)), corners]))
+        world_bounds = np.stack([corners.min(axis=0), corners.max(axis=0)], axis=1)
+
+        return world_planes, world_bounds
+
+    def blocks_in_frustum(self, world_planes, block_coords, block_size=None):
+        """ Test which voxel blocks intersect a frustum.
+            Blocks are tested conservatively by their bounding boxes.
+
+        Args:
+            world_planes (numpy.array [p, 4]): Frustum planes in world coordinates.
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks.
+            block_size (int, optional): The side length of the blocks in voxels. Defaults to
+                the block size of the volume.
+
+        Returns:
+            numpy.array [b, ]: True for the blocks that intersect the frustum.
+        """
+        block_size = self._block_size if block_size is None else block_size
+
+        # the block spans the voxels from its first to its last voxel
+        box_min = self._volume_origin + block_coords * block_size * self._voxel_size
+        box_half = np.full(3, (block_size - 1) * self._voxel_size / 2.)
+        box_center = box_min + box_half
+
+        # a box is outside a plane if even its furthest corner along the normal is
+        distances = box_center @ world_planes[:, :3].T + np.abs(world_planes[:, :3]) @ box_half + world_planes[:, 3]
+        return (distances >= 0).all(axis=1)
+
+    def get_visible_blocks(self, depth_image, camera_intrinsics, camera_pose):
+        """ Find the voxel blocks inside the camera frustum of an observation.
+
+        Args:
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+
+        Returns:
+            numpy.array [b, 3]: Coordinates of the voxel blocks inside the frustum.
+        """
+        world_planes, world_bounds = self.get_frustum_planes(depth_image, camera_intrinsics, camera_pose)
+        if world_planes is None:
+            return np.zeros((0, 3), dtype=np.int64)
+        return self.get_frustum_blocks(world_planes, world_bounds)
+
+    def get_frustum_blocks(self, world_planes, world_bounds):
+        """ Find the voxel blocks inside a frustum.
+
+        Args:
+            world_planes (numpy.array [p, 4]): Frustum planes in world coordinates.
+            world_bounds (numpy.array [3, 2]): World space bounding box of the frustum.
+
+        Returns:
+            numpy.array [b, 3]: Coordinates of the voxel blocks inside the frustum.
+        """
+        # candidate blocks overlap the bounding box of the frustum
+        block_extent = self._block_size * self._voxel_size
+        block_min = np.floor((world_bounds[:, 0] - self._volume_origin) / block_extent).astype(int)
+        block_max = np.floor((world_bounds[:, 1] - self._volume_origin) / block_extent).astype(int) + 1
+        block_min = np.clip(block_min, 0, self._block_bounds)
+        block_max = np.clip(block_max, 0, self._block_bounds)
+        block_coords = np.stack(np.meshgrid(
+            range(block_min[0], block_max[0]),
+            range(block_min[1], block_max[1]),
+            range(block_min[2], block_max[2]),
+            indexing='ij'), axis=-1).reshape(-1, 3)
+
+        return block_coords[self.blocks_in_frustum(world_planes, block_coords)]
+
+    @staticmethod
+    @njit(parallel=True, cache=True)
+    def get_block_voxel_index(block_coords, block_size, voxel_bounds):
+        """ Get the flat indices of the voxels inside a set of voxel blocks.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks.
+            block_size (int): The side length of each voxel block in voxels.
+            voxel_bounds (numpy.array [3, ]): Dimensions of the voxel grid.
+
+        Returns:
+            numpy.array [n, ]: Index into the flattened volumes of each voxel inside the volume bounds.
+        """
+        size_x, size_y, size_z = voxel_bounds[0], voxel_bounds[1], voxel_bounds[2]
+
+        # blocks on the far edges of the volume may stick out of the volume bounds
+        counts = np.empty(block_coords.shape[0] + 1, dtype=np.int64)
+        counts[0] = 0
+        for b in range(block_coords.shape[0]):
+            extent = 1
+            for axis in range(3):
+                start = block_coords[b, axis] * block_size
+                extent *= min(block_size, voxel_bounds[axis] - start)
+            counts[b + 1] = counts[b] + extent
+
+        voxel_index = np.empty(counts[-1], dtype=np.int64)
+        for b in prange(block_coords.shape[0]):
+            n = counts[b]
+            i_start = block_coords[b, 0] * block_size
+            j_start = block_coords[b, 1] * block_size
+            k_start = block_coords[b, 2] * block_size
+            for i in range(i_start, min(i_start + block_size, size_x)):
+                for j in range(j_start, min(j_start + block_size, size_y)):
+                    for k in range(k_start, min(k_start + block_size, size_z)):
+                        voxel_index[n] = (i * size_y + j) * size_z + k
+                        n += 1
+        return voxel_index
+
+    @staticmethod
+    @njit(parallel=True, cache=True)
+    def voxel_index_to_world(volume_origin, voxel_bounds, voxel_index, voxel_size):
+        """ Convert from flat voxel indices to world coordinates, deriving the
+            voxel coordinates from the index on the fly.
+
+        Args:
+            volume_origin (numpy.array [3, ]): The origin of the voxel
+                grid in world coordinate space.
+            voxel_bounds (numpy.array [3, ]): Dimensions of the voxel grid.
+            voxel_index (numpy.array [n, ]): Index of each voxel into the flattened volumes.
+            voxel_size (float): The side length of each voxel in meters.
+
+        Returns:
+            numpy.array [n, 3]: World coordinate representation of each of the n voxels.
+        """
+        volume_origin = volume_origin.astype(np.float32)
+        size_y, size_z = voxel_bounds[1], voxel_bounds[2]
+        world_points = np.empty((voxel_index.shape[0], 3), dtype=np.float32)
+
+        for n in prange(voxel_index.shape[0]):
+            index = voxel_index[n]
+            world_points[n, 0] = volume_origin[0] + np.float32(index // (size_y * size_z)) * voxel_size
+            world_points[n, 1] = volume_origin[1] + np.float32((index // size_z) % size_y) * voxel_size
+            world_points[n, 2] = volume_origin[2] + np.float32(index % size_z) * voxel_size
+        return world_points
+
     def get_valid_points(self, depth_image, voxel_u, voxel_v, voxel_z):
         """ Compute a boolean array for indexing the voxel volume and other variables.
         Note that every time the method integrate(...) is called, not every voxel in
@@ -209,6 +1732,74 @@ class TSDFVolume:
         return np.logical_and(valid_d, valid_uv)
 
 
+    @staticmethod
+    @njit(parallel=True, cache=True)
+    def get_valid_voxels(depth_image, voxel_u, voxel_v, voxel_z, truncation_margin):
+        """ Compact the voxels an observation updates into a list, in a single pass
+            over the projected voxels. A voxel is updated if it is valid by the criteria
+            of get_valid_points and lies no further than the truncation margin behind
+            the surface. The later stages of integration only touch the listed voxels.
+
+            The voxels are scanned in fixed-size chunks in parallel, twice: to count
+            the updated voxels of each chunk, then to write them at the chunk's offset.
+
+        Args:
+            depth_image (numpy.array [h, w]): A z depth image.
+            voxel_u (numpy.array [v, ]): Voxel coordinate projected into image coordinate, axis is u
+            voxel_v (numpy.array [v, ]): Voxel coordinate projected into image coordinate, axis is v
+            voxel_z (numpy.array [v, ]): Voxel coordinate projected into camera coordinate axis z
+            truncation_margin (float): Truncation on the SDF in meters.
+
+        Returns:
+            numpy.array [k, ]: int32 positions of the updated voxels in the input arrays, in order.
+            numpy.array [k, ]: int32 u pixel coordinate of each updated voxel.
+            numpy.array [k, ]: int32 v pixel coordinate of each updated voxel.
+            numpy.array [k, ]: float32 margin distance of each updated voxel, in [-1, 1].
+            int: Number of valid voxels by the criteria of get_valid_points.
+        """
+        image_height, image_width = depth_image.shape
+        num_voxels = voxel_u.shape[0]
+        chunk_size = 65536
+        num_chunks = (num_voxels + chunk_size - 1) // chunk_size
+
+        num_valid = 0
+        chunk_counts = np.zeros(num_chunks, dtype=np.int64)
+        for c in prange(num_chunks):
+            for i in range(c * chunk_size, min(num_voxels, (c + 1) * chunk_size)):
+                u = voxel_u[i]
+                v = voxel_v[i]
+                if voxel_z[i] <= 0 or u < 0 or u >= image_width or v < 0 or v >= image_height:
+                    continue
+                depth = depth_image[v, u]
+                if depth == 0:
+                    continue
+                num_valid += 1
+                if depth > 0 and depth - voxel_z[i] >= -truncation_margin:
+                    chunk_counts[c] += 1
+
+        chunk_offsets = np.zeros(num_chunks + 1, dtype=np.int64)
+        chunk_offsets[1:] = np.cumsum(chunk_counts)
+        num_updated = chunk_offsets[num_chunks]
+        valid = np.empty(num_updated, dtype=np.int32)
+        pixel_u = np.empty(num_updated, dtype=np.int32)
+        pixel_v = np.empty(num_updated, dtype=np.int32)
+        margin_distance = np.empty(num_updated, dtype=np.float32)
+        for c in prange(num_chunks):
+            n = chunk_offsets[c]
+            for i in range(c * chunk_size, min(num_voxels, (c + 1) * chunk_size)):
+                u = voxel_u[i]
+                v = voxel_v[i]
+                if voxel_z[i] <= 0 or u < 0 or u >= image_width or v < 0 or v >= image_height:
+                    continue
+                diff_depth = depth_image[v, u] - voxel_z[i]
+                if depth_image[v, u] > 0 and diff_depth >= -truncation_margin:
+                    valid[n] = i
+                    pixel_u[n] = u
+                    pixel_v[n] = v
+                    margin_distance[n] = min(1., diff_depth / truncation_margin)
+                    n += 1
+        return valid, pixel_u, pixel_v, margin_distance, num_valid
+
     def get_new_colors_with_weights(self, color_old, color_new, w_old, w_new, observation_weight=1.0):
         """ Compute the new RGB values for the color volume given the current values
         in the color volume, the RGB image pixels, and the old and new weights.
@@ -221,23 +1812,20 @@ class TSDFVolume:
             observation_weight (float, optional):  The weight to assign for the current
                 observation. Defaults to 1.
         Returns:
-            valid_points numpy.array [n, 3]: The newly computed colors in RGB. Note that
-            the input color and output color should have the same dimensions.
+            valid_points numpy.array [n, 3]: The newly computed colors in RGB, blended by the
+            color policy of the volume. Note that the input color and output color should
+            have the same dimensions.
         """
 
         # TODO: Compute the new R, G, and B value by summing the old color
         #  value weighted by the old weight, and the new color weighted by
         #  observation weight. Finally normalize the sum by the new weight.
-        #tsdf_new, w_new = self.get_new_tsdf_and_weights(self._tsdf_volume, self._margin_distance, w_old, observation_weight)
-        valid_points = np.array(color_old)
-        for i in range(len(color_old)):
-            valid_points[i][0] = np.minimum(255, np.round((color_old[i][0]*w_old[i] + color_new[i][0]*observation_weight)/w_new[i]))
-            valid_points[i][1] = np.minimum(255, np.round((color_old[i][1]*w_old[i] + color_new[i][1]*observation_weight)/w_new[i]))
-            valid_points[i][2] = np.minimum(255, np.round((color_old[i][2]*w_old[i] + color_new[i][2]*observation_weight)/w_new[i]))
-        
-        return valid_points
-
-        #pass
+        # w_old + observation_weight is w_new before any weight storage saturates
+        new_colors = np.empty((len(color_old), 3), dtype=np.float32)
+        blend_colors_kernel(np.asarray(color_old, dtype=np.float32), np.asarray(color_new, dtype=np.float32),
+                            np.asarray(w_old, dtype=np.float32), observation_weight,
+                            self._color_policy, self._color_alpha, new_colors)
+        return new_colors
 
     def integrate(self, color_image, depth_image, camera_intrinsics, camera_pose, observation_weight=1.):
         """Integrate an RGB-D observation into the TSDF volume, by updating the weight volume,
@@ -247,72 +1835,135 @@ class TSDFVolume:
             color_image (numpy.array [h, w, 3]): An rgb image.
             depth_image (numpy.array [h, w]): A z depth image.
             camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
-            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            camera_pose (numpy.array [4, 4] or SE3): SE3 transform representing pose (camera to world)
             observation_weight (float, optional):  The weight to assign for the current
                 observation. Defaults to 1.
         """
+        # validate the pose once; the stages below use it and its cached inverse as is
+        camera_pose = to_se3(camera_pose)
+        with self._time_frame():
+            # only the voxels inside the camera frustum can be updated
+            with self._time_stage('culling'):
+                block_coords = self.get_visible_blocks(depth_image, camera_intrinsics, camera_pose)
+            self._dirty_blocks[tuple(block_coords.T)] = True
+            self._integrate_blocks(block_coords, color_image, depth_image, camera_intrinsics,
+                                   camera_pose, observation_weight)
+
+    def _integrate_blocks(self, block_coords, color_image, depth_image, camera_intrinsics,
+                          camera_pose, observation_weight):
+        """Integrate an RGB-D observation into a set of voxel blocks.
+
+        Args:
+            block_coords (numpy.array [b, 3]): Coordinates of the voxel blocks to update.
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            observation_weight (float): The weight to assign for the current observation.
+
+        Returns:
+            int: Number of voxels updated.
+        """
+        if self._fused:
+            camera_origin, camera_steps = self.get_camera_steps(camera_pose)
+            with self._time_stage('fused_kernel'):
+                num_updated = self.integrate_kernel(
+                    kernel_view(self._tsdf_volume), self._weight_volume, self._color_volume,
+                    block_coords, self._block_size, camera_origin, camera_steps,
+                    camera_intrinsics, depth_image, color_image,
+                    self._truncation_margin, observation_weight, self._color_policy, self._color_alpha)
+            self._count_block_voxels(block_coords, num_updated)
+            return num_updated
+
+        voxel_index = self.get_block_voxel_index(block_coords, self._block_size, self._voxel_bounds)
+        return self._integrate_voxels(
+            None,
+            voxel_index,
+            self._tsdf_volume.reshape(-1),
+            self._weight_volume.reshape(-1),
+            self._color_volume.reshape(-1, 3),
+            color_image, depth_image, camera_intrinsics, camera_pose, observation_weight)
+
+    def _integrate_voxels(self, voxel_coords, voxel_index, tsdf_flat, weight_flat, color_flat,
+                          color_image, depth_image, camera_intrinsics, camera_pose, observation_weight):
+        """Integrate an RGB-D observation into an arbitrary set of voxels.
+
+        Args:
+            voxel_coords (numpy.array [n, 3]): Voxel grid coordinates of the voxels to update.
+                None to derive them from voxel_index, which then indexes the dense volumes.
+            voxel_index (numpy.array [n, ]): Index of each voxel into the flat storage arrays.
+            tsdf_flat (numpy.array [m, ]): Flat view of the tsdf storage.
+            weight_flat (numpy.array [m, ]): Flat view of the weight storage.
+            color_flat (numpy.array [m, 3]): Flat view of the color storage.
+            color_image (numpy.array [h, w, 3]): An rgb image.
+            depth_image (numpy.array [h, w]): A z depth image.
+            camera_intrinsics (numpy.array [3, 3]): given as [[fu, 0, u0], [0, fv, v0], [0, 0, 1]]
+            camera_pose (numpy.array [4, 4]): SE3 transform representing pose (camera to world)
+            observation_weight (float): The weight to assign for the current observation.
+
+        Returns:
+            int: Number of voxels updated.
+        """
         color_image = color_image.astype(np.float32)
 
         # TODO: 1. Project the voxel grid coordinates to the world
         #  space by calling `voxel_to_world`. Then, transform the points
         #  in world coordinate to camera coordinates, which are in (u, v).
         #  You might want to save the voxel z coordinate for later use.
-        world_points = self.voxel_to_world(self._volume_origin, self._voxel_coords, self._voxel_size)
-        camera_points = transform_point3s(transform_inverse(camera_pose), world_points)
+        with self._time_stage('voxel_to_world'):
+            if voxel_coords is None:
+                world_points = self.voxel_index_to_world(
+                    self._volume_origin, self._voxel_bounds, voxel_index, self._voxel_size)
+            else:
+                world_points = self.voxel_to_world(self._volume_origin, voxel_coords, self._voxel_size)
+        with self._time_stage('transform'):
+            camera_points = transform_point3s(transform_inverse(camera_pose), world_points)
         voxel_z = camera_points[:, 2]
-        image_points = camera_to_image(camera_intrinsics, camera_points)
+        with self._time_stage('projection'):
+            image_points = camera_to_image(camera_intrinsics, camera_points)
         u = image_points[:, 0]
         v = image_points[:, 1]
- 
-
-        # TODO: 2.
-        #  Get all of the valid points in the voxel grid by implementing
-        #  the helper get_valid_points. Be sure to pass in the correct parameters.
-        valid_points = self.get_valid_points(depth_image, u, v, voxel_z)
-
-        # TODO: 3.
-        #  With the valid_points array as your indexing array, index into
-        #  the self._voxel_coords variable to get the valid voxel x, y, and z.
-       
-        #x = self._voxel_coords[valid_points, 0]
-        #y = self._voxel_coords[valid_points, 1]
-        #z = self._voxel_coords[valid_points, 2]
-
-        # TODO: 4. With the valid_points array as your indexing array,
-        #  get the valid pixels. Use those valid pixels to index into
-        #  the depth_image, and find the valid margin distance.
-
-        valid_d = np.zeros(u.shape)
-        valid_d[valid_points] = depth_image[v[valid_points], u[valid_points]]
-        diff_depths = valid_d - voxel_z
-        #margin_distance = np.minimum(1, diff_depths/self._truncation_margin)
-        margin_distance = np.clip(diff_depths/self._truncation_margin, -1, 1)
-        margin_distance = margin_distance[valid_points]
-        valid_points = np.logical_and(valid_d > 0, diff_depths >= -self._truncation_margin)
-        x = self._voxel_coords[valid_points, 0]
-        y = self._voxel_coords[valid_points, 1]
-        z = self._voxel_coords[valid_points, 2]
-        w_old = self._weight_volume[x, y, z]
-        tsdf_old = self._tsdf_volume[x, y, z]
-
-        # TODO: 5.
-        #  Compute the new weight volume and tsdf volume by calling
-        #  `get_new_tsdf_and_weights`. Then update the weight volume
-        #  and tsdf volume.
-        tsdf_new, w_new = self.get_new_tsdf_and_weights(tsdf_old, margin_distance, w_old, observation_weight)
-        self._weight_volume[x, y, z] = w_new
-        self._tsdf_volume[x, y, z] = tsdf_new
-
-        # TODO: 6.
-        #  Compute the new colors for only the valid voxels by using
-        #  get_new_colors_with_weights, and update the current color volume
-        #  with the new colors. The color_old and color_new parameters can
-        #  be obtained by indexing the valid voxels in the color volume and
-        #  indexing the valid pixels in the rgb image.
-        color_old = self._color_volume[x, y, z]
-        color_new = color_image[v[valid_points], u[valid_points]]
-        valid_points = self.get_new_colors_with_weights(color_old, color_new, w_old, w_new, observation_weight=1.0)
-        self._color_volume[x, y, z] = valid_points
+
+        with self._time_stage('valid_points'):
+            # TODO: 2. and 4.
+            #  Get the voxels to update, with their pixels and margin distances,
+            #  as a compact list by the criteria of get_valid_points and the
+            #  truncation margin. The later steps only index the listed voxels.
+            valid, pixel_u, pixel_v, margin_distance, num_valid = self.get_valid_voxels(
+                depth_image, u, v, voxel_z, self._truncation_margin)
+            if self._stats is not None:
+                self._stats.count('voxels_projected', len(voxel_index))
+                self._stats.count('voxels_valid', num_valid)
+
+        with self._time_stage('tsdf_update'):
+            # TODO: 3.
+            #  With the list of valid voxels, index into the storage to get them.
+            valid_index = voxel_index[valid]
+            w_old = weight_flat[valid_index].astype(np.float32)
+            tsdf_old = decode_tsdf(tsdf_flat[valid_index])
+
+            # TODO: 5.
+            #  Compute the new weight volume and tsdf volume by calling
+            #  `get_new_tsdf_and_weights`. Then update the weight volume
+            #  and tsdf volume.
+            tsdf_new, w_new = self.get_new_tsdf_and_weights(tsdf_old, margin_distance, w_old, observation_weight)
+            weight_flat[valid_index] = encode_weights(w_new, weight_flat.dtype)
+            tsdf_flat[valid_index] = encode_tsdf(tsdf_new, tsdf_flat.dtype)
+
+        with self._time_stage('color_update'):
+            # TODO: 6.
+            #  Compute the new colors for only the valid voxels by using
+            #  get_new_colors_with_weights, and update the current color volume
+            #  with the new colors. The color_old and color_new parameters can
+            #  be obtained by indexing the valid voxels in the color volume and
+            #  indexing the valid pixels in the rgb image.
+            color_old = color_flat[valid_index].astype(np.float32)
+            color_new = color_image[pixel_v, pixel_u]
+            color_flat[valid_index] = encode_colors(self.get_new_colors_with_weights(
+                color_old, color_new, w_old, w_new, observation_weight=observation_weight), color_flat.dtype)
+        if self._stats is not None:
+            self._stats.count('voxels_updated', len(valid_index))
+        return len(valid_index)
 
     """
     *******************************************************************************
@@ -1,7 +1,7 @@
-from image import read_rgb, read_depth
+from frames import prefetch_frames, read_frame
+import functools
 import numpy as np
 import os
-from ply import Ply
 import time
 import tsdf
 
@@ -16,29 +16,26 @@ if __name__ == "__main__":
     print("Initializing voxel volume...")
     tsdf_volume = tsdf.TSDFVolume(volume_bounds, voxel_size=0.01)
 
-    # Loop through RGB-D images and fuse them together
+    # Compile the numba kernels, or load them from the on-disk cache, before timing
+    tsdf.TSDFVolume.warmup()
+
+    # Loop through RGB-D images and fuse them together. Frames are decoded on
+    # background threads while the previous ones are integrated.
     start_time = time.time()
-    for i in range(image_count):
+    frames = prefetch_frames(functools.partial(read_frame, "./data"), range(image_count), prefetch_depth=4)
+    for i, (color_image, depth_image, camera_pose) in enumerate(frames):
         print("Fusing frame %d/%d"%(i+1, image_count))
 
-        # Read RGB-D image and camera pose
-        color_image = read_rgb("./data/frame-%06d.color.png"%(i))
-        depth_image = read_depth("./data/frame-%06d.depth.png"%(i))
-        camera_pose = np.loadtxt("./data/frame-%06d.pose.txt"%(i))
-
         # Integrate observation into voxel volume (assume color aligned with depth)
         tsdf_volume.integrate(color_image, depth_image, camera_intrensics, camera_pose, observation_weight=1.)
 
     fps = image_count / (time.time() - start_time)
     print("Average FPS: {:.2f}".format(fps))
 
-    # Get mesh from voxel volume and save to disk (can be viewed with Meshlab)
+    # Stream mesh from voxel volume to disk chunk by chunk (can be viewed with Meshlab)
     print("Saving mesh to mesh.ply...")
-    points, faces, normals, colors = tsdf_volume.get_mesh()
-    mesh = Ply(triangles=faces, points=points, normals=normals, colors=colors)
-    mesh.write(os.path.join('supplemental', 'mesh.ply'))
+    tsdf_volume.write_mesh(os.path.join('supplemental', 'mesh.ply'))
 
-    # Get point cloud from voxel volume and save to disk (can be viewed with Meshlab)
+    # Stream point cloud from voxel volume to disk (can be viewed with Meshlab)
     print("Saving point cloud to point_cloud.ply...")
-    pc = Ply(points=points, normals=normals, colors=colors)
-    pc.write(os.path.join('supplemental', 'point_cloud.ply'))
+    tsdf_volume.write_mesh(os.path.join('supplemental', 'point_cloud.ply'), has_triangles=False)
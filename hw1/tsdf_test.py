@@ -0,0 +1,611 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from parallel_tsdf import SharedTSDFVolume
+from ply import Ply
+from sparse_tsdf import SparseTSDFVolume
+from tiled_tsdf import TiledTSDFVolume
+from tsdf import TSDFVolume
+
+
+def make_plane_frame(depth=1.0, width=64, height=48):
+    """Create a synthetic RGB-D frame of a fronto-parallel plane.
+
+    Args:
+        depth (float, optional): z depth of the plane in meters. Defaults to 1.0.
+        width (int, optional): Image width. Defaults to 64.
+        height (int, optional): Image height. Defaults to 48.
+
+    Returns:
+        numpy.array [h, w, 3]: An rgb image.
+        numpy.array [h, w]: A z depth image.
+        numpy.array [3, 3]: Pinhole intrinsics.
+        numpy.array [4, 4]: Camera pose (identity).
+    """
+    color_image = np.zeros((height, width, 3), dtype=np.uint8)
+    color_image[..., 0] = np.arange(width)[None, :] * 4
+    color_image[..., 1] = 100
+    color_image[..., 2] = np.arange(height)[:, None] * 5
+    depth_image = np.full((height, width), depth)
+    intrinsics = np.array([[60., 0., width / 2.],
+                           [0., 60., height / 2.],
+                           [0., 0., 1.]])
+    return color_image, depth_image, intrinsics, np.eye(4)
+
+
+class TestTSDFVolume(unittest.TestCase):
+    """Unit test tsdf.py.
+    """
+
+    volume_bounds = np.array([[-0.3, 0.3], [-0.2, 0.2], [0.8, 1.2]])
+
+    def test_integrate_plane(self):
+        """Test tsdf.TSDFVolume.integrate on a plane.
+        """
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        volume.integrate(*make_plane_frame())
+        tsdf_volume, color_volume = volume.get_volume()
+
+        # the plane at z = 1 m sits at voxel z index 10
+        center = tsdf_volume[15, 10]
+        self.assertTrue(np.isclose(center[10], 0., atol=1e-5))
+        self.assertTrue(np.isclose(center[9], 0.5, atol=1e-5))
+        self.assertTrue(np.isclose(center[11], -0.5, atol=1e-5))
+        self.assertTrue(np.all(center[:8] == 1.))
+
+        # voxels beyond the truncation margin behind the plane are not updated
+        self.assertTrue(np.all(volume._weight_volume[15, 10, 13:] == 0.))
+        self.assertTrue(np.all(color_volume[15, 10, 10] == [128., 100., 120.]))
+
+        points, triangles, normals, colors = volume.get_mesh()
+        self.assertTrue(np.isclose(points[:, 2], 1., atol=1e-5).any())
+        self.assertEqual(len(points), len(colors))
+
+    def test_fused_matches_staged(self):
+        """Test tsdf.TSDFVolume.integrate_kernel against the step-by-step pipeline.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        angle = np.deg2rad(10.)
+        camera_pose[:3, :3] = [[np.cos(angle), 0., np.sin(angle)],
+                               [0., 1., 0.],
+                               [-np.sin(angle), 0., np.cos(angle)]]
+        camera_pose[:3, 3] = [-0.05, 0.02, 0.03]
+
+        for volume_type in [TSDFVolume, SparseTSDFVolume]:
+            fused = volume_type(self.volume_bounds.copy(), voxel_size=0.02, fused=True)
+            staged = volume_type(self.volume_bounds.copy(), voxel_size=0.02, fused=False)
+            for observation_weight in [1., 0.5]:
+                fused.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+                staged.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+
+            fused_tsdf, fused_color = fused.get_volume()
+            staged_tsdf, staged_color = staged.get_volume()
+            self.assertTrue(np.allclose(fused_tsdf, staged_tsdf, atol=1e-5))
+            self.assertTrue(np.allclose(fused_color, staged_color))
+
+    def test_get_valid_voxels(self):
+        """Test tsdf.TSDFVolume.get_valid_voxels against get_valid_points.
+        """
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        rng = np.random.default_rng(0)
+        depth_image = rng.uniform(0.5, 1.5, (48, 64))
+        depth_image[:, :10] = 0.
+        voxel_u = rng.integers(-10, 74, 200000)
+        voxel_v = rng.integers(-10, 58, 200000)
+        voxel_z = rng.uniform(-0.5, 2., 200000)
+
+        valid, pixel_u, pixel_v, margin_distance, num_valid = volume.get_valid_voxels(
+            depth_image, voxel_u, voxel_v, voxel_z, volume._truncation_margin)
+        valid_points = volume.get_valid_points(depth_image, voxel_u, voxel_v, voxel_z)
+        self.assertEqual(num_valid, np.count_nonzero(valid_points))
+
+        valid_d = np.zeros(len(voxel_z))
+        valid_d[valid_points] = depth_image[voxel_v[valid_points], voxel_u[valid_points]]
+        updated = np.flatnonzero(valid_points & (valid_d - voxel_z >= -volume._truncation_margin))
+        self.assertEqual(valid.dtype, np.int32)
+        self.assertTrue(np.array_equal(valid, updated))
+        self.assertTrue(np.array_equal(pixel_u, voxel_u[updated]))
+        self.assertTrue(np.array_equal(pixel_v, voxel_v[updated]))
+        self.assertTrue(np.allclose(margin_distance, np.clip(
+            (valid_d[updated] - voxel_z[updated]) / volume._truncation_margin, -1, 1)))
+
+    def test_color_policies(self):
+        """Test the color blending policies of tsdf.TSDFVolume.integrate.
+        """
+        _, depth_image, intrinsics, camera_pose = make_plane_frame()
+        observations = [(100, 1.), (200, 1.), (50, 3.)]
+        expected = {'mean': [100., 150., 90.], 'max_weight': [100., 100., 50.], 'ema': [100., 150., 100.]}
+
+        for color_policy, colors in expected.items():
+            for volume_type in [TSDFVolume, SparseTSDFVolume]:
+                for fused in [True, False]:
+                    volume = volume_type(self.volume_bounds.copy(), voxel_size=0.02, fused=fused,
+                                         color_policy=color_policy, color_alpha=0.5)
+                    for (value, observation_weight), color in zip(observations, colors):
+                        color_image = np.full(depth_image.shape + (3,), value, dtype=np.uint8)
+                        volume.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+                        self.assertTrue(np.all(volume.get_volume()[1][15, 10, 10] == color))
+
+        with self.assertRaises(ValueError):
+            TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, color_policy='median')
+        with self.assertRaises(ValueError):
+            TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, color_policy='ema', color_alpha=0.)
+
+    def test_stats(self):
+        """Test tsdf.TSDFVolume.get_stats for the fused and staged pipelines.
+        """
+        frame = make_plane_frame()
+        projected = []
+        for fused in [True, False]:
+            volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, fused=fused)
+            volume.integrate(*frame)
+            self.assertIsNone(volume.get_stats())
+
+            volume.enable_stats(history_size=2)
+            for _ in range(3):
+                volume.integrate(*frame)
+            stats = volume.get_stats()
+            self.assertEqual(stats['frames'], 3)
+            self.assertEqual(sorted(stats['latency']), ['p50', 'p95', 'p99'])
+            self.assertLessEqual(stats['latency']['p50'], stats['latency']['p99'])
+
+            # every frame updates the same voxels, from the camera side out to the truncation margin behind the plane
+            counters = stats['counters']
+            self.assertLessEqual(counters['voxels_projected'], 3 * np.prod(volume._voxel_bounds))
+            self.assertEqual(counters['voxels_updated'], 3 * np.count_nonzero(volume._weight_volume))
+            projected.append(counters['voxels_projected'])
+            if fused:
+                self.assertIn('fused_kernel', stats['stage_seconds'])
+            else:
+                self.assertGreaterEqual(counters['voxels_valid'], counters['voxels_updated'])
+                self.assertEqual(sorted(stats['stage_seconds']), sorted([
+                    'culling', 'voxel_to_world', 'transform', 'projection',
+                    'valid_points', 'tsdf_update', 'color_update']))
+
+            volume.disable_stats()
+            self.assertIsNone(volume.get_stats())
+        self.assertEqual(projected[0], projected[1])
+
+    def test_memory_budget(self):
+        """Test tsdf.TSDFVolume.get_memory_report and the memory_budget option.
+        """
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, color_dtype=np.uint8)
+        report = volume.get_memory_report()
+        self.assertEqual(report['arrays']['tsdf'], 30 * 20 * 20 * 4)
+        self.assertEqual(report['arrays']['color'], 30 * 20 * 20 * 3)
+        self.assertEqual(report['total'], TSDFVolume.estimate_storage_bytes(
+            self.volume_bounds, 0.02, color_dtype=np.uint8))
+        self.assertGreaterEqual(report['peak_resident'], report['total'])
+
+        volume.integrate(*make_plane_frame())
+        volume.get_mesh(incremental=True)
+        self.assertGreater(volume.get_memory_report()['arrays']['block_meshes'], 0)
+
+        # the finest voxel size within the budget, which a slightly finer one exceeds
+        budget = 10 ** 6
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=None, memory_budget=budget)
+        self.assertLessEqual(volume.get_memory_report()['total'], budget)
+        self.assertGreater(TSDFVolume.estimate_storage_bytes(
+            self.volume_bounds, volume._voxel_size * 0.99), budget)
+
+        TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, memory_budget=budget)
+        with self.assertRaises(ValueError):
+            TSDFVolume(self.volume_bounds.copy(), voxel_size=0.005, memory_budget=budget)
+        with self.assertRaises(ValueError):
+            TSDFVolume(self.volume_bounds.copy(), voxel_size=None, memory_budget=10)
+        with self.assertRaises(ValueError):
+            TSDFVolume(self.volume_bounds.copy(), voxel_size=None)
+
+        sparse = SparseTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, initial_capacity=16)
+        self.assertEqual(sparse.get_memory_report()['arrays']['tsdf'], 16 * 8 ** 3 * 4)
+
+    def test_frustum_culling(self):
+        """Test tsdf.TSDFVolume.get_visible_blocks keeps every voxel the observation updates.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        depth_image[:, :20] = 0.
+        camera_pose[:3, 3] = [0.1, 0., -0.2]
+
+        culled = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4)
+        culled.integrate(color_image, depth_image, intrinsics, camera_pose)
+        visible_blocks = culled.get_visible_blocks(depth_image, intrinsics, camera_pose)
+        self.assertLess(len(visible_blocks), np.prod(culled._block_bounds))
+
+        full = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4)
+        all_blocks = np.stack(np.unravel_index(np.arange(np.prod(full._block_bounds)), full._block_bounds), axis=1)
+        full.integrate_kernel(
+            full._tsdf_volume, full._weight_volume, full._color_volume, all_blocks, 4,
+            *full.get_camera_steps(camera_pose), intrinsics,
+            depth_image, color_image, full._truncation_margin, 1.)
+
+        self.assertTrue(np.array_equal(culled._weight_volume, full._weight_volume))
+        self.assertTrue(np.array_equal(culled._tsdf_volume, full._tsdf_volume))
+
+    def test_voxel_index_to_world(self):
+        """Test tsdf.TSDFVolume.get_block_voxel_index and voxel_index_to_world.
+        """
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=8)
+        block_coords = np.array([[0, 0, 0], [3, 2, 2]])
+        voxel_index = volume.get_block_voxel_index(block_coords, 8, volume._voxel_bounds)
+
+        # the last block is clipped by the volume bounds of 30 x 20 x 20 voxels
+        self.assertEqual(len(voxel_index), 8 ** 3 + 6 * 4 * 4)
+        voxel_coords = np.stack(np.unravel_index(voxel_index, volume._voxel_bounds), axis=1)
+        self.assertTrue(np.array_equal(voxel_coords[-1], [29, 19, 19]))
+
+        world_points = volume.voxel_index_to_world(
+            volume._volume_origin, volume._voxel_bounds, voxel_index, volume._voxel_size)
+        self.assertTrue(np.array_equal(
+            world_points, volume.voxel_to_world(volume._volume_origin, voxel_coords, volume._voxel_size)))
+
+    def test_compact_storage(self):
+        """Test quantized tsdf, weight and color storage against float32 storage.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        camera_pose[:3, 3] = [0.01, -0.02, 0.005]
+        reference = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        for observation_weight in [1., 2.]:
+            reference.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+        reference_tsdf, reference_color = reference.get_volume()
+
+        for volume_type, fused, tsdf_dtype in [(TSDFVolume, True, np.int16),
+                                               (TSDFVolume, True, np.float16),
+                                               (TSDFVolume, False, np.int16),
+                                               (SparseTSDFVolume, True, np.float16),
+                                               (SparseTSDFVolume, False, np.float16)]:
+            volume = volume_type(self.volume_bounds.copy(), voxel_size=0.02, fused=fused,
+                                 tsdf_dtype=tsdf_dtype, weight_dtype=np.uint8, color_dtype=np.uint8)
+            for observation_weight in [1., 2.]:
+                volume.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+            tsdf_volume, color_volume = volume.get_volume()
+
+            self.assertEqual(tsdf_volume.dtype, np.float32)
+            near_surface = np.abs(reference_tsdf) < 1.
+            self.assertTrue(np.allclose(tsdf_volume[near_surface], reference_tsdf[near_surface], atol=1e-3))
+            self.assertTrue(np.array_equal(color_volume[near_surface], reference_color[near_surface]))
+
+        # integer weights saturate instead of wrapping around
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, weight_dtype=np.uint8)
+        for _ in range(2):
+            volume.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight=200.)
+        self.assertEqual(volume._weight_volume.max(), 255)
+
+        with self.assertRaises(ValueError):
+            TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, tsdf_dtype=np.int8)
+
+    def test_incremental_mesh(self):
+        """Test tsdf.TSDFVolume.get_mesh(incremental=True) against a full extraction.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        depth_image[:, 32:] = 1.1
+        volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4)
+        sparse = SparseTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4)
+
+        for shift in [0., 0.05]:
+            camera_pose[0, 3] = shift
+            volume.integrate(color_image, depth_image, intrinsics, camera_pose)
+            sparse.integrate(color_image, depth_image, intrinsics, camera_pose)
+
+            points, triangles, _, colors = volume.get_mesh()
+            incremental_points, incremental_triangles, _, incremental_colors = volume.get_mesh(incremental=True)
+            self.assertFalse(volume._dirty_blocks.any())
+            self.assertEqual(len(triangles), len(incremental_triangles))
+
+            # marching cubes over the full grid may repeat vertices that sit exactly on a voxel
+            _, first = np.unique(np.round(points, 4), axis=0, return_index=True)
+            _, order = np.unique(np.round(incremental_points, 4), axis=0, return_index=True)
+            self.assertEqual(len(order), len(incremental_points))
+            self.assertTrue(np.allclose(points[first], incremental_points[order], atol=1e-5))
+            self.assertTrue(np.array_equal(colors[first], incremental_colors[order]))
+
+            sparse_points, sparse_triangles, _, _ = sparse.get_mesh(incremental=True)
+            full_points, full_triangles, _, _ = sparse.get_mesh(incremental=False)
+            self.assertTrue(np.array_equal(sparse_points, full_points))
+            self.assertTrue(np.array_equal(sparse_triangles, full_triangles))
+
+    def test_write_mesh(self):
+        """Test tsdf.TSDFVolume.write_mesh streams the mesh of get_mesh in chunks.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        depth_image[:, 32:] = 1.1
+        for volume_type, kwargs in [(TSDFVolume, {'block_size': 4}),
+                                    (SparseTSDFVolume, {'block_size': 4}),
+                                    (TiledTSDFVolume, {'block_size': 4, 'tile_size': 8, 'max_tiles': 2})]:
+            volume = volume_type(self.volume_bounds.copy(), voxel_size=0.02, **kwargs)
+            volume.integrate(color_image, depth_image, intrinsics, camera_pose)
+            points, triangles, normals, colors = volume.get_mesh(incremental=True)
+
+            with tempfile.TemporaryDirectory() as path:
+                ply_path = os.path.join(path, 'mesh.ply')
+                num_vertices, num_triangles = volume.write_mesh(ply_path, 'binary_little_endian', chunk_size=2)
+                mesh = Ply(ply_path)
+                self.assertEqual((len(mesh.points), len(mesh.triangles)), (num_vertices, num_triangles))
+
+                # the same vertices and triangles, up to order. The ply holds float32 points
+                self.assertEqual((num_vertices, num_triangles), (len(points), len(triangles)))
+                order = np.lexsort(points.astype(np.float32).T[::-1])
+                mesh_order = np.lexsort(mesh.points.T[::-1])
+                self.assertTrue(np.array_equal(mesh.points[mesh_order], points[order].astype(np.float32)))
+                self.assertTrue(np.array_equal(mesh.colors[mesh_order], colors[order]))
+                rank, mesh_rank = np.empty_like(order), np.empty_like(mesh_order)
+                rank[order], mesh_rank[mesh_order] = np.arange(len(order)), np.arange(len(mesh_order))
+                self.assertTrue(np.array_equal(np.unique(np.sort(mesh_rank[mesh.triangles], axis=1), axis=0),
+                                               np.unique(np.sort(rank[triangles], axis=1), axis=0)))
+
+                # the point cloud has no repeated points either
+                volume.write_mesh(ply_path, has_triangles=False)
+                cloud = Ply(ply_path)
+                self.assertIsNone(cloud.triangles)
+                self.assertEqual(len(np.unique(np.round(cloud.points, 4), axis=0)), len(points))
+                self.assertEqual(len(cloud.points), len(points))
+
+    def test_raycast(self):
+        """Test tsdf.TSDFVolume.raycast renders the integrated plane back.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        dense = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        sparse = SparseTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4)
+        dense.integrate(color_image, depth_image, intrinsics, camera_pose)
+        sparse.integrate(color_image, depth_image, intrinsics, camera_pose)
+
+        camera_pose[:2, 3] = [0.02, -0.01]
+        depth, color, normal = dense.raycast(intrinsics, camera_pose, 64, 48)
+        self.assertEqual(depth.shape, (48, 64))
+        self.assertEqual(color.shape, (48, 64, 3))
+
+        # rays through the part of the plane inside the volume hit it at z = 1 m facing the camera
+        hit = depth > 0
+        self.assertTrue(hit[16:32, 18:44].all())
+        self.assertTrue(np.allclose(depth[hit], 1., atol=1e-4))
+        self.assertTrue(np.allclose(normal[16:32, 18:44], [0., 0., -1.], atol=1e-4))
+        self.assertTrue(np.all(np.abs(color[24, 18:44, 0].astype(int) - color_image[24, 19:45, 0]) <= 4))
+
+        # the sparse volume has no observed free space, so rays sample the plane at other steps
+        sparse_depth, sparse_color, sparse_normal = sparse.raycast(intrinsics, camera_pose, 64, 48)
+        self.assertTrue(np.allclose(sparse_depth, depth, atol=1e-5))
+        self.assertTrue(np.allclose(sparse_normal, normal, atol=1e-5))
+        self.assertTrue(np.all(np.abs(sparse_color.astype(int) - color) <= 1))
+
+    def test_raycast_large_bounds(self):
+        """Test sparse and tiled raycasts of volumes far too large for a dense grid.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        dense = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        dense.integrate(color_image, depth_image, intrinsics, camera_pose)
+
+        # 2000 x 2000 x 1000 voxels, 4e9 of them
+        volume_bounds = np.array([[-20., 20.], [-20., 20.], [0., 20.]])
+        volumes = [SparseTSDFVolume(volume_bounds.copy(), voxel_size=0.02, block_size=8),
+                   TiledTSDFVolume(volume_bounds.copy(), voxel_size=0.02, block_size=8, tile_size=16, max_tiles=4)]
+        for volume in volumes:
+            volume.integrate(color_image, depth_image, intrinsics, camera_pose)
+
+        camera_pose[:2, 3] = [0.02, -0.01]
+        depth, color, normal = dense.raycast(intrinsics, camera_pose, 64, 48)
+        for volume in volumes:
+            large_depth, large_color, large_normal = volume.raycast(intrinsics, camera_pose, 64, 48)
+            # the large volumes also hold the plane outside the dense bounds
+            self.assertTrue(np.allclose(large_depth[large_depth > 0], 1., atol=1e-4))
+            self.assertGreater(np.sum(large_depth > 0), np.sum(depth > 0))
+            self.assertTrue(np.allclose(large_depth[16:32, 18:44], depth[16:32, 18:44], atol=1e-5))
+            self.assertTrue(np.allclose(large_normal[16:32, 18:44], normal[16:32, 18:44], atol=1e-5))
+            self.assertTrue(np.all(np.abs(large_color[16:32, 18:44].astype(int) - color[16:32, 18:44]) <= 1))
+
+        # the tiled volume pools at most max_tiles tiles of voxels at a time, in several
+        # batches here, and leaves the tile cache as it was
+        tiled = volumes[1]
+        cached_tiles = list(tiled._tiles)
+        world_planes, world_bounds, _ = tiled.get_raycast_frustum(intrinsics, camera_pose, 64, 48)
+        batches = list(tiled._get_raycast_voxels(world_planes, world_bounds))
+        self.assertGreater(len(batches), 1)
+        for voxels, _ in batches:
+            self.assertLessEqual(voxels.weight.size, 4 * 16 ** 3)
+        tiled.raycast(intrinsics, camera_pose, 64, 48)
+        self.assertEqual(list(tiled._tiles), cached_tiles)
+
+    def test_merge(self):
+        """Test tsdf.TSDFVolume.merge against fusing every frame into one volume.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        depth_image[:, 32:] = 1.1
+        poses = []
+        for shift in [0., 0.03, -0.02]:
+            pose = camera_pose.copy()
+            pose[0, 3] = shift
+            poses.append(pose)
+
+        for volume_type, kwargs in [(TSDFVolume, {}),
+                                    (TSDFVolume, {'tsdf_dtype': np.float16, 'weight_dtype': np.uint16}),
+                                    (SparseTSDFVolume, {'block_size': 4, 'initial_capacity': 2}),
+                                    (TiledTSDFVolume, {'block_size': 4, 'tile_size': 8, 'max_tiles': 2})]:
+            volumes = [volume_type(self.volume_bounds.copy(), voxel_size=0.02, **kwargs) for _ in range(3)]
+            for pose in poses:
+                volumes[0].integrate(color_image, depth_image, intrinsics, pose)
+            volumes[1].integrate(color_image, depth_image, intrinsics, poses[0])
+            for pose in poses[1:]:
+                volumes[2].integrate(color_image, depth_image, intrinsics, pose)
+            volumes[1].merge(volumes[2])
+
+            sequential_tsdf, sequential_color = volumes[0].get_volume()
+            merged_tsdf, merged_color = volumes[1].get_volume()
+            self.assertTrue(np.allclose(sequential_tsdf, merged_tsdf, atol=1e-3))
+            self.assertTrue(np.all(np.abs(sequential_color - merged_color) <= 1))
+            self.assertEqual(len(volumes[0].get_mesh(incremental=True)[1]),
+                             len(volumes[1].get_mesh(incremental=True)[1]))
+
+        # a dense volume can merge any backend
+        dense = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        dense.merge(volumes[2])
+        self.assertTrue(np.allclose(dense.get_volume()[0], volumes[2].get_volume()[0]))
+
+        with self.assertRaises(ValueError):
+            dense.merge(TSDFVolume(self.volume_bounds.copy(), voxel_size=0.01))
+        with self.assertRaises(ValueError):
+            volumes[2].merge(dense)
+
+    def test_merge_color_policies(self):
+        """Test tsdf.TSDFVolume.merge blends colors with the color policy of the volumes.
+        """
+        _, depth_image, intrinsics, camera_pose = make_plane_frame()
+        # the first volume saw the voxel with weight 1 in red 100, the second with weight 3 in red 50
+        expected = {'max_weight': 50., 'ema': 75.}
+        for color_policy, color in expected.items():
+            for volume_type, kwargs in [(TSDFVolume, {}),
+                                        (SparseTSDFVolume, {'block_size': 4}),
+                                        (TiledTSDFVolume, {'block_size': 4, 'tile_size': 8})]:
+                volumes = [volume_type(self.volume_bounds.copy(), voxel_size=0.02, color_policy=color_policy,
+                                       color_alpha=0.5, **kwargs) for _ in range(2)]
+                for volume, (value, observation_weight) in zip(volumes, [(100, 1.), (50, 3.)]):
+                    color_image = np.full(depth_image.shape + (3,), value, dtype=np.uint8)
+                    volume.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+                volumes[0].merge(volumes[1])
+                self.assertTrue(np.all(volumes[0].get_volume()[1][15, 10, 10] == color))
+
+        # colors blended with different policies or alphas cannot be merged
+        for first, second in [({'color_policy': 'mean'}, {'color_policy': 'max_weight'}),
+                              ({'color_policy': 'ema', 'color_alpha': 0.5}, {'color_policy': 'ema', 'color_alpha': 0.2})]:
+            volume = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, **first)
+            with self.assertRaises(ValueError):
+                volume.merge(TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, **second))
+
+    def test_warmup(self):
+        """Test tsdf.TSDFVolume.warmup for every backend.
+        """
+        for volume_type in [TSDFVolume, SparseTSDFVolume, TiledTSDFVolume]:
+            volume_type.warmup(mesh=True, raycast=True, tsdf_dtype=np.int16, color_dtype=np.uint8)
+        SharedTSDFVolume.warmup(num_workers=2)
+
+    def test_save_load(self):
+        """Test tsdf.TSDFVolume.save and load, and resuming integration on the mapped volume.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        for volume_type, kwargs in [(TSDFVolume, {'tsdf_dtype': np.int16}),
+                                    (SparseTSDFVolume, {'block_size': 4, 'initial_capacity': 2})]:
+            volume = volume_type(self.volume_bounds.copy(), voxel_size=0.02, **kwargs)
+            volume.integrate(color_image, depth_image, intrinsics, camera_pose)
+            with tempfile.TemporaryDirectory() as path:
+                volume.save(path)
+                loaded = volume_type.load(path)
+                self.assertTrue(np.array_equal(loaded._voxel_bounds, volume._voxel_bounds))
+                self.assertTrue(np.array_equal(loaded.get_volume()[0], volume.get_volume()[0]))
+
+                # integration writes through to the files
+                camera_pose[0, 3] = 0.05
+                volume.integrate(color_image, depth_image, intrinsics, camera_pose)
+                loaded.integrate(color_image, depth_image, intrinsics, camera_pose)
+                loaded.save(path)
+                resumed = volume_type.load(path, mmap_mode='r')
+                self.assertIsInstance(resumed._tsdf_volume if volume_type is TSDFVolume
+                                      else resumed._tsdf_blocks, np.memmap)
+                for expected, actual in zip(volume.get_volume(), resumed.get_volume()):
+                    self.assertTrue(np.array_equal(expected, actual))
+                self.assertTrue(np.array_equal(volume.get_mesh()[0], resumed.get_mesh()[0]))
+                camera_pose[0, 3] = 0.
+
+                with self.assertRaises(ValueError):
+                    (SparseTSDFVolume if volume_type is TSDFVolume else TSDFVolume).load(path)
+
+    def test_tiled_matches_dense(self):
+        """Test tiled_tsdf.TiledTSDFVolume against the dense volume with tiles evicted to disk.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        depth_image[:, 32:] = 1.1
+        for fused in [True, False]:
+            dense = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, fused=fused, block_size=4)
+            tiled = TiledTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, fused=fused,
+                                    block_size=4, tile_size=8, max_tiles=2)
+            for shift in [0., 0.05]:
+                camera_pose[0, 3] = shift
+                dense.integrate(color_image, depth_image, intrinsics, camera_pose)
+                tiled.integrate(color_image, depth_image, intrinsics, camera_pose)
+            self.assertEqual(len(tiled._tiles), 2)
+            self.assertGreater(len(tiled._stored_tiles), 2)
+
+            for expected, actual in zip(dense.get_volume(), tiled.get_volume()):
+                self.assertTrue(np.allclose(expected, actual, atol=1e-5))
+            points, triangles, _, _ = tiled.get_mesh()
+            dense_points, dense_triangles, _, _ = dense.get_mesh(incremental=True)
+            self.assertEqual(len(dense_triangles), len(triangles))
+            self.assertTrue(np.allclose(dense_points, points, atol=1e-5))
+
+            with tempfile.TemporaryDirectory() as path:
+                tiled.save(path)
+                loaded_points, loaded_triangles, _, _ = TiledTSDFVolume.load(path).get_mesh()
+
+                # only mmap mode 'r+' writes evicted tiles back to the saved directory
+                def read_files():
+                    return {name: open(os.path.join(path, name), 'rb').read() for name in os.listdir(path)}
+                saved = read_files()
+                for mmap_mode in ['r', 'c', None]:
+                    loaded = TiledTSDFVolume.load(path, mmap_mode=mmap_mode)
+                    loaded.integrate(color_image, depth_image, intrinsics, camera_pose)
+                    loaded.flush()
+                    self.assertEqual(saved, read_files())
+                loaded = TiledTSDFVolume.load(path, mmap_mode='r+')
+                loaded.integrate(color_image, depth_image, intrinsics, camera_pose)
+                loaded.flush()
+                self.assertNotEqual(saved, read_files())
+                with self.assertRaises(ValueError):
+                    TiledTSDFVolume.load(path, mmap_mode='w+')
+            self.assertTrue(np.array_equal(points, loaded_points))
+            self.assertTrue(np.array_equal(triangles, loaded_triangles))
+
+        with self.assertRaises(ValueError):
+            TiledTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4, tile_size=6)
+
+    def test_shared_matches_dense(self):
+        """Test parallel_tsdf.SharedTSDFVolume integrates slabs in worker processes like the dense volume.
+        """
+        color_image, depth_image, intrinsics, camera_pose = make_plane_frame()
+        camera_pose[:3, 3] = [0.03, -0.02, 0.01]
+        dense = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4)
+        with SharedTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4, num_workers=2) as shared:
+            self.assertEqual(list(shared._slab_bounds), [0, 4, 8])
+            for observation_weight in [1., 2.]:
+                dense.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+                shared.integrate(color_image, depth_image, intrinsics, camera_pose, observation_weight)
+                if observation_weight == 1.:
+                    frame_names = [shared_block.name for shared_block in shared._frame_blocks]
+            # frames of the same size reuse the shared frame buffer
+            self.assertEqual([shared_block.name for shared_block in shared._frame_blocks], frame_names)
+
+            # a frame of another size gets a new buffer
+            color_image, depth_image, intrinsics, _ = make_plane_frame(depth=0.9, width=32, height=24)
+            dense.integrate(color_image, depth_image, intrinsics, camera_pose)
+            shared.integrate(color_image, depth_image, intrinsics, camera_pose)
+            self.assertEqual(shared._depth_frame.shape, (24, 32))
+
+            self.assertTrue(np.array_equal(dense._tsdf_volume, shared._tsdf_volume))
+            self.assertTrue(np.array_equal(dense._weight_volume, shared._weight_volume))
+            self.assertTrue(np.array_equal(dense._color_volume, shared._color_volume))
+
+    def test_sparse_matches_dense(self):
+        """Test sparse_tsdf.SparseTSDFVolume against the dense volume near the surface.
+        """
+        frame = make_plane_frame()
+        dense = TSDFVolume(self.volume_bounds.copy(), voxel_size=0.02)
+        sparse = SparseTSDFVolume(self.volume_bounds.copy(), voxel_size=0.02, block_size=4, initial_capacity=2)
+        dense.integrate(*frame)
+        sparse.integrate(*frame)
+
+        # only the blocks around the plane get allocated
+        self.assertLess(sparse.num_blocks, np.prod(sparse._block_bounds))
+
+        dense_tsdf, dense_color = dense.get_volume()
+        sparse_tsdf, sparse_color = sparse.get_volume()
+        near_surface = np.abs(dense_tsdf) < 1.
+        self.assertTrue(np.allclose(dense_tsdf[near_surface], sparse_tsdf[near_surface]))
+        self.assertTrue(np.allclose(dense_color[near_surface], sparse_color[near_surface]))
+
+        # the observed surface is meshed identically, seams between blocks included
+        dense_points = dense.get_mesh()[0]
+        sparse_points = sparse.get_mesh()[0]
+        dense_points = dense_points[np.isclose(dense_points[:, 2], 1., atol=1e-5)]
+        sparse_points = sparse_points[np.isclose(sparse_points[:, 2], 1., atol=1e-5)]
+        self.assertEqual(len(dense_points), len(sparse_points))
+        self.assertTrue(np.allclose(np.sort(dense_points, axis=0), np.sort(sparse_points, axis=0), atol=1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,284 @@
+import math
+import os
+
+from numba import njit, types
+from numba.extending import overload
+import numpy as np
+
+# Supported storage types. TSDF values in [-1, 1] are stored as float32, float16, or
+# int16 fixed point; weights as float32 or saturating integers; colors as float32 or uint8.
+TSDF_DTYPES = (np.float32, np.float16, np.int16)
+WEIGHT_DTYPES = (np.float32, np.uint8, np.uint16)
+COLOR_DTYPES = (np.float32, np.uint8)
+
+# int16 fixed point scale of the tsdf
+TSDF_SCALE = 32767.
+
+
+def check_storage_dtypes(tsdf_dtype, weight_dtype, color_dtype):
+    """Validate and normalize the storage types of a voxel volume.
+
+    Args:
+        tsdf_dtype (numpy.dtype): Storage type of the tsdf, one of TSDF_DTYPES.
+        weight_dtype (numpy.dtype): Storage type of the weights, one of WEIGHT_DTYPES.
+        color_dtype (numpy.dtype): Storage type of the colors, one of COLOR_DTYPES.
+
+    Raises:
+        ValueError: If a storage type is not supported.
+
+    Returns:
+        tuple of numpy.dtype: tsdf, weight and color storage types.
+    """
+    dtypes = []
+    for name, dtype, supported in [('tsdf', tsdf_dtype, TSDF_DTYPES),
+                                   ('weight', weight_dtype, WEIGHT_DTYPES),
+                                   ('color', color_dtype, COLOR_DTYPES)]:
+        dtype = np.dtype(dtype)
+        if dtype not in [np.dtype(d) for d in supported]:
+            raise ValueError('{} dtype must be one of {}.'.format(
+                name, ', '.join(np.dtype(d).name for d in supported)))
+        dtypes.append(dtype)
+    return tuple(dtypes)
+
+
+def get_voxel_bytes(tsdf_dtype, weight_dtype, color_dtype):
+    """Get the storage size of a single voxel.
+
+    Args:
+        tsdf_dtype (numpy.dtype): Storage type of the tsdf.
+        weight_dtype (numpy.dtype): Storage type of the weights.
+        color_dtype (numpy.dtype): Storage type of the colors.
+
+    Returns:
+        int: Bytes of the tsdf, weight and rgb color of a voxel.
+    """
+    return np.dtype(tsdf_dtype).itemsize + np.dtype(weight_dtype).itemsize + 3 * np.dtype(color_dtype).itemsize
+
+
+def kernel_view(array):
+    """Get a view of a voxel array that numba kernels can take.
+        numba has no float16 arrays, so float16 storage is passed as its raw bits.
+
+    Args:
+        array (numpy.array): Voxel storage array.
+
+    Returns:
+        numpy.array: The array itself, or a uint16 view of float16 storage.
+    """
+    return array.view(np.uint16) if array.dtype == np.float16 else array
+
+
+def encode_tsdf(values, dtype):
+    """Convert tsdf values to a storage type.
+
+    Args:
+        values (numpy.array): tsdf values in [-1, 1].
+        dtype (numpy.dtype): Storage type, one of TSDF_DTYPES.
+
+    Returns:
+        numpy.array: Stored tsdf values.
+    """
+    if np.dtype(dtype) == np.int16:
+        return np.round(np.asarray(values) * TSDF_SCALE).astype(np.int16)
+    return np.asarray(values).astype(dtype)
+
+
+def decode_tsdf(values):
+    """Convert stored tsdf values to float32.
+
+    Args:
+        values (numpy.array): Stored tsdf values.
+
+    Returns:
+        numpy.array: tsdf values in [-1, 1].
+    """
+    if values.dtype == np.int16:
+        return (values / TSDF_SCALE).astype(np.float32)
+    return values.astype(np.float32, copy=False)
+
+
+def encode_weights(values, dtype):
+    """Convert weights to a storage type, saturating integer types at their maximum.
+
+    Args:
+        values (numpy.array): Non-negative weights.
+        dtype (numpy.dtype): Storage type, one of WEIGHT_DTYPES.
+
+    Returns:
+        numpy.array: Stored weights.
+    """
+    if np.issubdtype(dtype, np.integer):
+        return np.minimum(np.round(values), np.iinfo(dtype).max).astype(dtype)
+    return np.asarray(values).astype(dtype)
+
+
+def encode_colors(values, dtype):
+    """Convert colors to a storage type.
+
+    Args:
+        values (numpy.array): Colors in [0, 255].
+        dtype (numpy.dtype): Storage type, one of COLOR_DTYPES.
+
+    Returns:
+        numpy.array: Stored colors.
+    """
+    if np.issubdtype(dtype, np.integer):
+        return np.round(values).astype(dtype)
+    return np.asarray(values).astype(dtype)
+
+
+def save_voxel_array(filename, array):
+    """Save voxel storage to a .npy file that can be memory-mapped back.
+        If the array is already mapped from that file, it is flushed instead.
+
+    Args:
+        filename (str): Path of the .npy file.
+        array (numpy.array): Voxel storage array.
+    """
+    if (isinstance(array, np.memmap) and array.filename is not None and os.path.exists(filename)
+            and os.path.samefile(array.filename, filename)):
+        array.flush()
+        return
+    np.save(filename, array)
+
+
+def load_voxel_array(filename, mmap_mode='r+'):
+    """Load voxel storage saved by save_voxel_array.
+
+    Args:
+        filename (str): Path of the .npy file.
+        mmap_mode (str, optional): numpy.memmap mode: 'r+' writes updates through to the
+            file, 'c' keeps them in memory, 'r' is read-only. None reads the file into
+            memory. Defaults to 'r+'.
+
+    Returns:
+        numpy.array: The stored array, memory-mapped unless mmap_mode is None.
+    """
+    return np.load(filename, mmap_mode=mmap_mode)
+
+
+@njit(cache=True)
+def half_to_float(bits):
+    """Decode the raw bits of an IEEE 754 half precision float.
+
+    Args:
+        bits (int): 16 bit pattern.
+
+    Returns:
+        float: Decoded value.
+    """
+    sign = -1. if bits & 0x8000 else 1.
+    exponent = (bits >> 10) & 0x1f
+    mantissa = bits & 0x3ff
+    if exponent == 0:
+        return sign * mantissa * 2. ** -24
+    if exponent == 0x1f:
+        return sign * np.inf if mantissa == 0 else np.nan
+    return sign * (1. + mantissa / 1024.) * 2. ** (exponent - 15)
+
+
+@njit(cache=True)
+def float_to_half(value):
+    """Encode a float as the raw bits of an IEEE 754 half precision float,
+        rounding to nearest even.
+
+    Args:
+        value (float): Value to encode.
+
+    Returns:
+        int: 16 bit pattern.
+    """
+    sign = 0x8000 if math.copysign(1., value) < 0 else 0
+    magnitude = abs(value)
+    if magnitude == 0:
+        return np.uint16(sign)
+    mantissa, exponent = math.frexp(magnitude)
+    exponent += 14
+    if exponent <= 0:
+        # subnormal; a mantissa rounding up to 1024 becomes the smallest normal
+        return np.uint16(sign | int(np.round(magnitude * 2. ** 24)))
+    # a mantissa rounding up to 1024 carries into the exponent
+    bits = (exponent << 10) + int(np.round((2. * mantissa - 1.) * 1024.))
+    if bits >= 0x7c00:
+        return np.uint16(sign | 0x7c00)
+    return np.uint16(sign | bits)
+
+
+def load_tsdf(value):
+    """Decode stored tsdf values. Inside numba kernels, this decodes a single value
+        of a kernel_view.
+
+    Args:
+        value (numpy.array or scalar): Stored tsdf values, or the uint16 bits of float16 storage.
+
+    Returns:
+        numpy.array or float: tsdf values in [-1, 1] as float32.
+    """
+    value = np.asarray(value)
+    if value.dtype == np.uint16:
+        value = value.view(np.float16)
+    return decode_tsdf(value)[()]
+
+
+@overload(load_tsdf)
+def _load_tsdf(value):
+    if isinstance(value, types.Float):
+        return lambda value: value
+    if value == types.uint16:
+        return lambda value: half_to_float(value)
+    if value == types.int16:
+        return lambda value: value / TSDF_SCALE
+
+
+def store_tsdf(array, index, value):
+    """Encode and store tsdf values. Inside numba kernels, this stores a single value
+        into a kernel_view.
+
+    Args:
+        array (numpy.array): tsdf storage, or the uint16 view of float16 storage.
+        index (int or numpy.array): Index of the values into the storage.
+        value (float or numpy.array): tsdf values in [-1, 1].
+    """
+    if array.dtype == np.uint16:
+        array[index] = encode_tsdf(value, np.float16).view(np.uint16)
+    else:
+        array[index] = encode_tsdf(value, array.dtype)
+
+
+@overload(store_tsdf)
+def _store_tsdf(array, index, value):
+    if isinstance(array.dtype, types.Float):
+        def impl(array, index, value):
+            array[index] = value
+    elif array.dtype == types.uint16:
+        def impl(array, index, value):
+            array[index] = float_to_half(value)
+    elif array.dtype == types.int16:
+        def impl(array, index, value):
+            array[index] = np.int16(np.round(value * TSDF_SCALE))
+    return impl
+
+
+def store_weight(array, index, value):
+    """Store weights, saturating integer types at their maximum. Inside numba kernels,
+        this stores a single weight.
+
+    Args:
+        array (numpy.array): Weight storage.
+        index (int or numpy.array): Index of the weights into the storage.
+        value (float or numpy.array): Non-negative weights.
+    """
+    array[index] = encode_weights(value, array.dtype)
+
+
+@overload(store_weight)
+def _store_weight(array, index, value):
+    if isinstance(array.dtype, types.Float):
+        def impl(array, index, value):
+            array[index] = value
+    else:
+        max_weight = float(np.iinfo(np.dtype(str(array.dtype))).max)
+
+        def impl(array, index, value):
+            array[index] = min(np.round(value), max_weight)
+    return impl
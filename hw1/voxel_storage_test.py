@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+from voxel_storage import *
+
+
+@njit
+def _store_and_load(tsdf, weight, tsdf_values, weight_values):
+    """Store and load values through the numba overloads of the storage codecs.
+    """
+    out = np.empty(len(tsdf_values))
+    for i in range(len(tsdf_values)):
+        store_tsdf(tsdf, i, tsdf_values[i])
+        store_weight(weight, i, weight_values[i])
+        out[i] = load_tsdf(tsdf[i])
+    return out
+
+
+class TestVoxelStorage(unittest.TestCase):
+    """Unit test voxel_storage.py.
+    """
+
+    def test_round_trip(self):
+        """Test voxel_storage.store_tsdf, load_tsdf and store_weight in python and in numba kernels.
+        """
+        values = np.linspace(-1., 1., 101)
+        weights = np.array([0., 0.4, 1., 254.6, 300.] * 20 + [2.])
+        for tsdf_dtype, atol in [(np.float32, 1e-7), (np.float16, 5e-4), (np.int16, 1. / TSDF_SCALE)]:
+            for weight_dtype in WEIGHT_DTYPES:
+                tsdf = np.zeros(len(values), dtype=tsdf_dtype)
+                weight = np.zeros(len(values), dtype=weight_dtype)
+                store_tsdf(tsdf, slice(None), values)
+                store_weight(weight, np.arange(len(values)), weights)
+                decoded = load_tsdf(tsdf)
+                self.assertEqual(decoded.dtype, np.float32)
+                self.assertTrue(np.allclose(decoded, values, atol=atol, rtol=0))
+                self.assertTrue(np.array_equal(weight, encode_weights(weights, weight_dtype)))
+
+                # single values, and the uint16 view kernels take of float16 storage
+                store_tsdf(kernel_view(tsdf), 3, 0.25)
+                self.assertTrue(np.isclose(load_tsdf(kernel_view(tsdf)[3]), 0.25, atol=atol))
+                self.assertTrue(np.isclose(load_tsdf(tsdf[3]), 0.25, atol=atol))
+
+                # the kernels encode exactly like python
+                kernel_tsdf = np.zeros_like(tsdf)
+                kernel_weight = np.zeros_like(weight)
+                kernel_decoded = _store_and_load(kernel_view(kernel_tsdf), kernel_weight, values, weights)
+                store_tsdf(tsdf, slice(None), values)
+                self.assertTrue(np.array_equal(kernel_tsdf, tsdf))
+                self.assertTrue(np.array_equal(kernel_weight, weight))
+                self.assertTrue(np.allclose(kernel_decoded, load_tsdf(tsdf), atol=1e-7, rtol=0))
+
+        # integer weights saturate at their maximum
+        weight = np.zeros(1, dtype=np.uint8)
+        store_weight(weight, 0, 1000.)
+        self.assertEqual(weight[0], 255)
+
+
+if __name__ == '__main__':
+    unittest.main()